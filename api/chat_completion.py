@@ -1,8 +1,8 @@
 import typing as t
-import json
 from fastapi import HTTPException
 from bentoml import api
-from models.exceptions import ModelNotFoundException, ModelLoadException
+from models.base import BaseModelWrapper
+from .generation import generate, lease_model, lookup_response, trace_generation
 from .schemas import ChatCompletionRequest, GenerationParameters
 from utils.constants import (
     DEFAULT_TEMPERATURE,
@@ -10,9 +10,12 @@ from utils.constants import (
     DEFAULT_TOP_P,
     DEFAULT_TOP_K,
     DEFAULT_STREAM,
-    DEFAULT_BATCH_SIZE,
 )
+from utils.metrics import RequestMetrics
+from utils.stream_flush import StreamFlushPolicy, flush_batches
+from utils.tracing import Trace, Tracer, current_trace, span
 import logging
+import time
 
 
 logging.basicConfig(level=logging.INFO)
@@ -22,75 +25,136 @@ logger = logging.getLogger(__name__)
 @api(route="/v1/chat/completions", input_spec=ChatCompletionRequest)
 async def create_chat_completion(self, **request: t.Any):
     model_name = request.get("model", self.model_manager.get_current_model_name())
+    request_metrics = RequestMetrics(self.metrics, model_name)
+    trace = self.tracer.start_trace("chat_completion")
     try:
-        self.model_manager.switch_model(model_name)
-    except ModelNotFoundException as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except ModelLoadException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # Cache hits are served without waiting for a scheduler slot or the model.
+        default_params = (self.model_manager.get_model_configs().get(model_name) or {}).get("default_params") or {}
+        generation_kwargs = _generation_kwargs(request, default_params)
+        cache_key, cached = await lookup_response(
+            self, model_name, request.get("messages", []), generation_kwargs, request_metrics
+        )
+        if cached is not None:
+            async for chunk in _format_response(
+                self, model_name, cached, generation_kwargs["stream"], request_metrics, trace
+            ):
+                yield chunk
+            return
+        async with self.scheduler.slot(model_name):
+            async for chunk in _generate_chat_completion(self, model_name, request, request_metrics, cache_key):
+                yield chunk
+    finally:
+        Tracer.end_trace(trace)
+
+
+async def _generate_chat_completion(
+    self,
+    model_name: str,
+    request: t.Dict[str, t.Any],
+    request_metrics: RequestMetrics = None,
+    cache_key: str = None,
+):
+    lease = await lease_model(self, model_name)
+
+    # The lease keeps the model loaded until the response has been fully produced.
+    try:
+        async for chunk in _complete(self, lease.wrapper, request, request_metrics, cache_key):
+            yield chunk
+    finally:
+        lease.release()
+    self.model_manager.update_last_use_time(model_name)
 
-    model_wrapper = self.model_manager.get_current_model()
 
-    # Reset the formatter's stream-specific attributes
-    self.formatter.current_stream_id = None
-    self.formatter.creation_timestamp = None
+async def _stream_texts(response: t.AsyncIterator[t.Dict], request_metrics: RequestMetrics) -> t.AsyncIterator[str]:
+    async for raw_response in response:
+        request_metrics.token()
+        if "speculative" in raw_response:
+            request_metrics.record_speculation(raw_response["speculative"])
+        yield raw_response["choices"][0]["text"]
 
-    model_specific_defaults = model_wrapper.default_params
 
-    logger.debug("request: " + str(request))
+def _generation_kwargs(request: t.Dict[str, t.Any], model_specific_defaults: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+    """Merge request parameters with model-specific defaults and service-wide defaults."""
+    def param(name: str, default: t.Any) -> t.Any:
+        # Explicit zeros (e.g. temperature 0) are honoured; only missing values fall back.
+        value = request.get(name)
+        return value if value is not None else model_specific_defaults.get(name, default)
 
-    # Merge request parameters with model-specific defaults and service-wide defaults
     generation_params = GenerationParameters(
-        temperature=request.get("temperature") or model_specific_defaults.get("temperature", DEFAULT_TEMPERATURE),
-        max_tokens=request.get("max_tokens") or model_specific_defaults.get("max_tokens", DEFAULT_MAX_TOKENS),
-        top_p=request.get("top_p") or model_specific_defaults.get("top_p", DEFAULT_TOP_P),
-        top_k=request.get("top_k") or model_specific_defaults.get("top_k", DEFAULT_TOP_K),
-        stream=request.get("stream", model_specific_defaults.get("stream", DEFAULT_STREAM)),
+        temperature=param("temperature", DEFAULT_TEMPERATURE),
+        max_tokens=param("max_tokens", DEFAULT_MAX_TOKENS),
+        top_p=param("top_p", DEFAULT_TOP_P),
+        top_k=param("top_k", DEFAULT_TOP_K),
+        stream=param("stream", DEFAULT_STREAM),
+        seed=param("seed", None),
+        speculative=param("speculative", None),
     )
 
-    messages = request.get("messages", [])
-    prompt = model_wrapper.create_prompt(messages)
-
-    response = model_wrapper.get_response(
-        prompt,
+    generation_kwargs = dict(
         temperature=generation_params.temperature,
         max_tokens=generation_params.max_tokens,
         top_p=generation_params.top_p,
         top_k=generation_params.top_k,
         stream=generation_params.stream,
     )
+    if generation_params.seed is not None:
+        generation_kwargs["seed"] = generation_params.seed
+    if generation_params.speculative is not None:
+        generation_kwargs["speculative"] = generation_params.speculative
+    return generation_kwargs
+
+
+async def _complete(
+    self,
+    model_wrapper: BaseModelWrapper,
+    request: t.Dict[str, t.Any],
+    request_metrics: RequestMetrics = None,
+    cache_key: str = None,
+):
+    if request_metrics is None:
+        request_metrics = RequestMetrics(None, model_wrapper.model_name)
+    # Chunks after the first are produced outside the request's context, so the trace is held here.
+    trace = current_trace()
+
+    logger.debug("request: " + str(request))
+
+    generation_kwargs = _generation_kwargs(request, model_wrapper.default_params)
+
+    messages = request.get("messages", [])
+    try:
+        with span("create_prompt", messages=len(messages)):
+            prompt = model_wrapper.create_prompt(messages, max_tokens=generation_kwargs["max_tokens"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = await generate(
+        self, model_wrapper, prompt, request_metrics=request_metrics, cache_key=cache_key, **generation_kwargs
+    )
+    async for chunk in _format_response(
+        self, model_wrapper.model_name, response, generation_kwargs["stream"], request_metrics, trace
+    ):
+        yield chunk
+
 
+async def _format_response(
+    self, model_name: str, response: t.Any, stream: bool, request_metrics: RequestMetrics, trace: t.Optional[Trace]
+):
+    """Encode a raw completion, or its stream of chunks, as the formatter's response frames."""
+    encode_secs = 0.0
     try:
-        if generation_params.stream:
-            batch = ""
-            for raw_response in response:
-                logger.debug("Streaming response")
-                batch += raw_response["choices"][0]["text"]
-                logger.debug('batch: ' + batch)
-
-                if len(batch) >= DEFAULT_BATCH_SIZE:
-                    try:
-                        formatted_response = self.formatter.format_response(
-                            {"choices": [{"text": batch}]}, streaming=True
-                        )
-                        yield f"data: {json.dumps(formatted_response)}\n\n"
-                        batch = ""  # Reset the batch after sending
-                    except AttributeError as ae:
-                        logger.error(f"AttributeError in formatting response: {str(ae)}")
-                        logger.error(f"Raw response causing error: {batch}")
-                        batch = ""  # Reset the batch even if there's an error
-                    except Exception as e:
-                        logger.error(f"Error in formatting response: {str(e)}")
-                        logger.error(f"Raw response causing error: {batch}")
-                        batch = ""  # Reset the batch even if there's an error
-
-            # Send any remaining responses in the batch
-            if batch:
+        if stream:
+            flush_policy = StreamFlushPolicy.from_config(
+                self.model_manager.get_model_configs().get(model_name, {}).get("stream_flush")
+            )
+            stream_encoder = self.formatter.new_stream()
+            async for batch in flush_batches(_stream_texts(response, request_metrics), flush_policy):
+                logger.debug("batch: " + batch)
                 try:
-                    formatted_response = self.formatter.format_response(
-                        {"choices": [{"text": batch}]}, streaming=True
-                    )
-                    yield f"data: {json.dumps(formatted_response)}\n\n"
+                    encode_started = time.perf_counter() if trace is not None else 0.0
+                    frame = stream_encoder.encode({"choices": [{"text": batch}]})
+                    if trace is not None:
+                        encode_secs += time.perf_counter() - encode_started
+                    yield frame
                 except AttributeError as ae:
                     logger.error(f"AttributeError in formatting response: {str(ae)}")
                     logger.error(f"Raw response causing error: {batch}")
@@ -112,6 +176,7 @@ async def create_chat_completion(self, **request: t.Any):
         logger.error(f"Error in formatting response: {str(e)}")
         logger.error(f"Raw response causing error: {response}")
 
-    self.model_manager.update_last_use_time()
-    if generation_params.stream:
-        yield "data: [DONE]\n\n"  # Signal that streaming is complete
+    if stream:
+        request_metrics.finish()
+        trace_generation(trace, request_metrics, encode_ms=encode_secs * 1000, **(request_metrics.speculation or {}))
+        yield b"data: [DONE]\n\n"  # Signal that streaming is complete
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import typing as t
+from fastapi import HTTPException
+from models.base import BaseModelWrapper
+from models.exceptions import ModelNotFoundException, ModelLoadException, ModelAdmissionException
+from models.lease import ModelLease
+from utils.metrics import RequestMetrics
+from utils.response_cache import ResponseCache
+from utils.tracing import Trace, span
+
+
+async def lease_model(self, model_name: str) -> ModelLease:
+    """
+    Wait for ``model_name`` to be ready and lease it.
+
+    Requests for a model that is still loading wait on its readiness future instead of
+    holding an executor thread or starting a load of their own.
+    """
+    try:
+        with span("model_ready", model=model_name):
+            ready = await self.executor.manage(self.model_manager.start_load, model_name)
+            await asyncio.wrap_future(ready)
+        with span("lease", model=model_name):
+            return await self.executor.manage(self.model_manager.acquire_model, model_name)
+    except ModelNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ModelAdmissionException as e:
+        # Not enough memory right now; the client may retry once other models are unloaded.
+        raise HTTPException(status_code=503, detail=str(e))
+    except ModelLoadException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _cache_runner(self) -> t.Optional[t.Callable[..., t.Awaitable]]:
+    """How response cache calls that may touch the disk are run: on the executor, or inline without a disk tier."""
+    return self.executor.run if self.response_cache.disk_dir else None
+
+
+async def lookup_response(
+    self,
+    model_name: str,
+    messages: t.Any,
+    generation_kwargs: t.Dict[str, t.Any],
+    request_metrics: RequestMetrics = None,
+) -> t.Tuple[t.Optional[str], t.Any]:
+    """
+    Look a request up in the response cache before a model is leased or a slot taken.
+
+    Requests are keyed by their messages rather than the prompt, which takes the
+    loaded model to build. Returns the cache key, None if the request is not
+    cacheable, and the cached response or None. A hit is returned as ``generate``
+    would return it; non-streaming hits are finished on ``request_metrics``.
+    """
+    cache: ResponseCache = self.response_cache
+    model_config = self.model_manager.get_model_configs().get(model_name)
+    if cache is None or model_config is None or not ResponseCache.is_cacheable(generation_kwargs):
+        return None, None
+    cache_key = ResponseCache.make_key(model_name, model_config, messages, generation_kwargs)
+    run = _cache_runner(self)
+    with span("response_cache", model=model_name) as lookup:
+        if run is None:
+            cached = cache.get(model_name, cache_key)
+        else:
+            cached = await run(cache.get, model_name, cache_key)
+        lookup.set("hit", cached is not None)
+    if self.metrics is not None:
+        self.metrics.record_cache_lookup("response", cached is not None)
+    if cached is None:
+        return cache_key, None
+    if generation_kwargs.get("stream"):
+        return cache_key, ResponseCache.replay_stream(cached)
+    if request_metrics is not None:
+        request_metrics.finish(completion_tokens=cached.get("usage", {}).get("completion_tokens", 0))
+    return cache_key, cached
+
+
+async def generate(
+    self,
+    model_wrapper: BaseModelWrapper,
+    prompt: str,
+    request_metrics: RequestMetrics = None,
+    cache_key: str = None,
+    **generation_kwargs: t.Any,
+):
+    """
+    Run ``get_response`` on the inference executor.
+
+    Returns an async iterator of raw chunks for streaming requests and the raw
+    completion otherwise. With ``cache_key``, from a missed ``lookup_response``, the
+    response is stored in the response cache. Non-streaming requests are finished on
+    ``request_metrics``; for streams the caller counts tokens and finishes it.
+    """
+    stream = generation_kwargs.get("stream")
+    cache: ResponseCache = self.response_cache
+    if cache is None:
+        cache_key = None
+
+    if request_metrics is not None:
+        request_metrics.start_generation()
+    # Generation runs on the inference executor so the event loop keeps serving other requests.
+    if stream:
+        response = self.executor.iterate(model_wrapper.get_response, prompt, **generation_kwargs)
+        if cache_key is not None:
+            response = cache.record_stream(model_wrapper.model_name, cache_key, response, run=_cache_runner(self))
+        return response
+
+    with span("generate", model=model_wrapper.model_name) as generation:
+        response = await self.executor.run(model_wrapper.get_response, prompt, **generation_kwargs)
+        for name, value in response.get("speculative", {}).items():
+            generation.set(name, value)
+    if request_metrics is not None:
+        request_metrics.record_speculation(response.get("speculative"))
+        request_metrics.finish(completion_tokens=response.get("usage", {}).get("completion_tokens", 0))
+    if cache_key is not None:
+        run = _cache_runner(self)
+        if run is None:
+            cache.put(model_wrapper.model_name, cache_key, response)
+        else:
+            await run(cache.put, model_wrapper.model_name, cache_key, response)
+    return response
+
+
+def trace_generation(trace: t.Optional[Trace], request_metrics: RequestMetrics, **attributes: t.Any):
+    """Record the prompt evaluation and token generation phases of a finished stream on ``trace``."""
+    if trace is None or request_metrics.first_token_at is None:
+        return
+    if request_metrics.generation_started_at is not None:
+        trace.add_span("prompt_eval", request_metrics.generation_started_at, request_metrics.first_token_at)
+    trace.add_span(
+        "token_generation", request_metrics.first_token_at, time.perf_counter(), tokens=request_metrics.tokens, **attributes
+    )
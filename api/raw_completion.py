@@ -1,6 +1,9 @@
 from fastapi import HTTPException
 from bentoml import api
-from models.exceptions import ModelNotFoundException, ModelLoadException
+from models.base import BaseModelWrapper
+from .generation import generate, lease_model, lookup_response
+from utils.metrics import RequestMetrics
+from utils.tracing import Tracer, span
 from .schemas import RawCompletionRequest, RawCompletionResponse
 import logging
 
@@ -12,29 +15,74 @@ logger = logging.getLogger(__name__)
 async def create_raw_completion(
     self, request: RawCompletionRequest
 ) -> RawCompletionResponse:
+    model_name = (
+        request.model
+        if hasattr(request, "model")
+        else self.model_manager.get_current_model_name()
+    )
+    request_metrics = RequestMetrics(self.metrics, model_name)
+    trace = self.tracer.start_trace("raw_completion")
     try:
-        model_name = (
-            request.model
-            if hasattr(request, "model")
-            else self.model_manager.get_current_model_name()
-        )
-        self.model_manager.switch_model(model_name)
-    except ModelNotFoundException as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except ModelLoadException as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    model_wrapper = self.model_manager.get_current_model()
-    model_specific_defaults = model_wrapper.default_params
-
-    prompt = model_wrapper.create_prompt(request.messages)
-    raw_output = model_wrapper.get_response(
-        prompt,
-        temperature=request.temperature or model_specific_defaults.get("temperature"),
+        # Cache hits are served without waiting for a scheduler slot or the model.
+        default_params = (self.model_manager.get_model_configs().get(model_name) or {}).get("default_params") or {}
+        generation_kwargs = _generation_kwargs(request, default_params)
+        cache_key, cached = await lookup_response(self, model_name, request.messages, generation_kwargs, request_metrics)
+        if cached is not None:
+            return RawCompletionResponse(raw_output=cached)
+        async with self.scheduler.slot(model_name):
+            return await _generate_raw_completion(self, model_name, request, request_metrics, cache_key)
+    finally:
+        Tracer.end_trace(trace)
+
+
+async def _generate_raw_completion(
+    self,
+    model_name: str,
+    request: RawCompletionRequest,
+    request_metrics: RequestMetrics = None,
+    cache_key: str = None,
+) -> RawCompletionResponse:
+    lease = await lease_model(self, model_name)
+
+    with lease as model_wrapper:
+        raw_output = await _complete(self, model_wrapper, request, request_metrics, cache_key)
+    self.model_manager.update_last_use_time(model_name)
+    logger.info("Raw completion successful")
+    return RawCompletionResponse(raw_output=raw_output)
+
+
+def _generation_kwargs(request: RawCompletionRequest, model_specific_defaults: dict) -> dict:
+    generation_kwargs = dict(
+        temperature=request.temperature if request.temperature is not None else model_specific_defaults.get("temperature"),
         max_tokens=request.max_tokens or model_specific_defaults.get("max_tokens"),
         top_p=request.top_p or model_specific_defaults.get("top_p"),
         top_k=request.top_k or model_specific_defaults.get("top_k"),
-        stream=request.stream or model_specific_defaults.get("stream"),
+        # The response is a single dict, so the completion is never streamed; streaming
+        # clients use /v1/chat/completions.
+        stream=False,
+    )
+    if request.seed is not None:
+        generation_kwargs["seed"] = request.seed
+    if request.speculative is not None:
+        generation_kwargs["speculative"] = request.speculative
+    return generation_kwargs
+
+
+async def _complete(
+    self,
+    model_wrapper: BaseModelWrapper,
+    request: RawCompletionRequest,
+    request_metrics: RequestMetrics = None,
+    cache_key: str = None,
+) -> dict:
+    if request_metrics is None:
+        request_metrics = RequestMetrics(None, model_wrapper.model_name)
+    generation_kwargs = _generation_kwargs(request, model_wrapper.default_params)
+    try:
+        with span("create_prompt", messages=len(request.messages)):
+            prompt = model_wrapper.create_prompt(request.messages, max_tokens=generation_kwargs["max_tokens"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await generate(
+        self, model_wrapper, prompt, request_metrics=request_metrics, cache_key=cache_key, **generation_kwargs
     )
-    logger.info("Raw completion successful")
-    return RawCompletionResponse(raw_output=raw_output)
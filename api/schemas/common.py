@@ -8,6 +8,9 @@ class GenerationParameters(BaseModel):
     top_p: Optional[float] = None
     top_k: Optional[int] = None
     stream: Optional[bool] = None
+    seed: Optional[int] = None
+    # Speculative decoding on or off for this request; None uses the model's setting.
+    speculative: Optional[bool] = None
 
 
 class Message(BaseModel):
@@ -1,7 +1,13 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from .common import Message, GenerationParameters, UsageInfo
-from openai.types.chat import ChatCompletionMessage
+
+
+class ChatCompletionMessage(BaseModel):
+    # The fields of openai.types.chat.ChatCompletionMessage the service produces; defined
+    # here so the schemas do not import the openai package at startup.
+    role: Literal["assistant"] = "assistant"
+    content: Optional[str] = None
 
 
 class ChatCompletionRequest(GenerationParameters):
@@ -1,14 +1,24 @@
 from fastapi import HTTPException
 from bentoml import api
-from models.exceptions import ModelNotFoundException, ModelLoadException
+from models.exceptions import ModelNotFoundException, ModelLoadException, ModelAdmissionException
+from models.load_state import LoadState
 
 
 @api(route="/switch_model")
-async def switch_model(self, model_name: str):
+async def switch_model(self, model_name: str, wait: bool = True):
+    """
+    Switch to ``model_name``. With ``wait`` false the model loads in the background and
+    the response reports its state; poll ``/service-info`` for progress.
+    """
     try:
-        self.model_manager.switch_model(model_name)
-        return {"message": f"Successfully switched to model: {model_name}"}
+        state = await self.executor.manage(self.model_manager.switch_model, model_name, wait)
     except ModelNotFoundException as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ModelAdmissionException as e:
+        # Not enough memory right now; the client may retry once other models are unloaded.
+        raise HTTPException(status_code=503, detail=str(e))
     except ModelLoadException as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if state["state"] == LoadState.READY:
+        return {"message": f"Successfully switched to model: {model_name}", **state}
+    return {"message": f"Loading model: {model_name}", **state}
@@ -0,0 +1,62 @@
+"""
+Measure how long importing the service takes and which modules dominate it.
+
+Each run imports the module in a fresh interpreter with ``-X importtime``. The
+slowest imports of the best run are listed, and the command fails if any of the
+modules that should only be imported on demand (model backends, optional schema
+dependencies) were imported.
+
+Usage:
+    python -m benchmarks.import_time [--module service] [--repeat 5] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+import typing as t
+
+# Imported when a model of that type is loaded, not at startup.
+LAZY_MODULES = ("llama_cpp", "numpy", "openai")
+
+
+def measure_import(module: str) -> t.Tuple[float, t.Dict[str, float], t.List[str]]:
+    """
+    Import ``module`` in a fresh interpreter.
+
+    Returns:
+        The total import time in seconds, the cumulative time of each imported module
+        in seconds, and the ``LAZY_MODULES`` that were imported.
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check], capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1e6
+    imported = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative.get(module, 0.0), cumulative, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="service", help="module to import")
+    parser.add_argument("--repeat", type=int, default=5, help="imports to take the best of")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    total, cumulative, imported = min(runs, key=lambda run: run[0])
+
+    print(f"import {args.module}: {total * 1000:8.1f} ms (best of {args.repeat})")
+    for name, secs in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]:
+        print(f"  {secs * 1000:8.1f} ms  {name}")
+    if imported:
+        print(f"imported at startup but should be lazy: {', '.join(imported)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare prompt construction with per-call ``str.format`` against compiled templates
+and memoized message fragments.
+
+Usage:
+    python -m benchmarks.prompt_templates [--messages 60] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from models.base import BaseModelWrapper
+from models.llama import LLaMAWrapper
+from api.schemas import Message
+
+SYSTEM_TEMPLATE = "<|start_header_id|>system<|end_header_id|>{system_prompt}<|eot_id|>\n\n"
+MESSAGE_TEMPLATE = "<|start_header_id|>{role}<|end_header_id|>{content}<|eot_id|>\n\n"
+PROMPT_TEMPLATE = "{system_prompt}{conversation_history}\n\n<|start_header_id|>assistant<|end_header_id|>"
+
+
+def format_per_call(wrapper: BaseModelWrapper, messages):
+    """The previous implementation: two scans and str.format on every fragment (without the 30-message cap)."""
+    system_prompt = next((msg.content for msg in messages if msg.role == "system"), "")
+    formatted_system_prompt = wrapper.system_message_template.format(system_prompt=system_prompt)
+    conversation_history = "\n".join(
+        wrapper.conversation_message_template.format(role=msg.role, content=msg.content)
+        for msg in messages
+        if msg.role in {"user", "assistant"}
+    )
+    return wrapper.prompt_template.format(
+        system_prompt=formatted_system_prompt, conversation_history=conversation_history
+    )
+
+
+def build_turns(n_messages: int):
+    """
+    One message list per turn of a growing conversation, as a client re-sends it.
+
+    Every turn gets fresh string objects, like a request parsed from JSON, so
+    neither implementation benefits from cached string hashes across turns.
+    """
+    history = [("system", "You are a helpful coding assistant. " * 20)]
+    for i in range(n_messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append((role, f"Message {i}: " + "def f(x): return x * 2\n" * 15))
+    return [
+        [Message(role=role, content=json.loads(json.dumps(content))) for role, content in history[: turn + 1]]
+        for turn in range(1, len(history))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=60, help="messages in the final turn of the conversation")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements to take the best of")
+    args = parser.parse_args()
+
+    wrapper = LLaMAWrapper(
+        model_name="benchmark",
+        model_path="unused.gguf",
+        n_context=8192,
+        n_gpu_layers=0,
+        prompt_template=PROMPT_TEMPLATE,
+        system_message_template=SYSTEM_TEMPLATE,
+        conversation_message_template=MESSAGE_TEMPLATE,
+    )
+    wrapper.compile_templates()
+    turns = build_turns(args.messages)
+    for messages in turns:
+        assert wrapper.create_prompt(messages) == format_per_call(wrapper, messages)
+
+    def run(create_prompt):
+        for messages in turns:
+            create_prompt(messages)
+
+    baseline = min(timeit.repeat(lambda: run(lambda m: format_per_call(wrapper, m)), number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(lambda: run(wrapper.create_prompt), number=1, repeat=args.repeat))
+
+    print(f"messages={args.messages} turns={len(turns)}")
+    print(f"str.format per call : {baseline / len(turns) * 1e6:8.1f} us/prompt")
+    print(f"compiled + memoized : {compiled / len(turns) * 1e6:8.1f} us/prompt")
+    print(f"speedup             : {baseline / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Replay a JSONL stream of chat requests against the service and summarise latency,
+time to first token, generation speed, model switches and errors.
+
+Each line is a ``/v1/chat/completions`` body. An optional ``at`` field gives its
+arrival time in seconds from the start of the replay. Lines without ``messages``
+but with a ``prompt`` or ``body`` string are sent as a single user message, so
+plain lists of prompts can be replayed as well.
+
+Requests go to a running service (``--url``) or, with ``--app module:attribute``,
+to the service or ASGI app in this process. In-process responses are buffered by
+httpx, so their time to first token equals their latency.
+
+Usage:
+    python -m benchmarks.replay requests.jsonl [--url http://localhost:3000]
+        [--app service:BentoSwitchService] [--concurrency 4] [--rate 2]
+        [--model-mix Nymeria-15B-Q8=3,Codestral-22B-v0.1=1] [--requests 100]
+        [--max-tokens 128] [--seed 0] [--output summary.json]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import sys
+import time
+import typing as t
+from collections import Counter
+
+import httpx
+
+from models.base import BaseModelWrapper
+
+CHAT_ROUTE = "/v1/chat/completions"
+SERVICE_INFO_ROUTE = "/service-info"
+
+
+class RequestResult:
+    __slots__ = ("model", "status", "error", "latency", "ttft", "tokens", "generation_secs")
+
+    def __init__(self, model: str):
+        self.model = model
+        self.status = None
+        self.error = None
+        self.latency = None
+        self.ttft = None
+        self.tokens = 0
+        self.generation_secs = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_requests(path: str) -> t.List[t.Dict]:
+    """Read replayable chat request bodies from a JSONL file, skipping lines with no prompt."""
+    requests = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "messages" not in record:
+                prompt = record.get("prompt") or record.get("body")
+                if not isinstance(prompt, str):
+                    continue
+                record = {"messages": [{"role": "user", "content": prompt}], "at": record.get("at")}
+            requests.append(record)
+    return requests
+
+
+def parse_model_mix(spec: str) -> t.Dict[str, float]:
+    """Parse ``name=weight,name=weight`` into weights; a name without a weight counts 1."""
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name:
+            mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def plan_arrivals(
+    requests: t.List[t.Dict], rate: float = None, rng: random.Random = None
+) -> t.List[t.Tuple[t.Optional[float], t.Dict]]:
+    """
+    Pair each request with its arrival offset in seconds.
+
+    With ``rate`` arrivals follow a Poisson process of that many requests per second;
+    otherwise the recorded ``at`` offsets are kept, and requests without one are sent
+    as soon as a concurrency slot frees up (offset None).
+    """
+    rng = rng or random.Random()
+    planned = []
+    clock = 0.0
+    for request in requests:
+        body = {key: value for key, value in request.items() if key != "at"}
+        if rate:
+            planned.append((clock, body))
+            clock += rng.expovariate(rate)
+        else:
+            planned.append((request.get("at"), body))
+    return planned
+
+
+def percentile(values: t.List[float], q: float) -> t.Optional[float]:
+    """The ``q``-th percentile (0-100) of ``values`` by linear interpolation."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _distribution(values: t.List[float]) -> t.Dict[str, t.Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else None,
+    }
+
+
+def count_switches(models: t.List[str]) -> int:
+    """Model changes between consecutive requests, as a scheduler serving them FIFO would see them."""
+    return sum(1 for previous, current in zip(models, models[1:]) if previous != current)
+
+
+def summarize(results: t.List[RequestResult], duration_secs: float, service_switches: int = None) -> t.Dict:
+    completed = [result for result in results if result.ok]
+    errors = Counter(result.error for result in results if not result.ok)
+    tokens = sum(result.tokens for result in completed)
+    per_model = {}
+    for model in sorted({result.model for result in results}, key=str):
+        model_results = [result for result in results if result.model == model]
+        per_model[model] = {
+            "requests": len(model_results),
+            "errors": sum(1 for result in model_results if not result.ok),
+            "latency": _distribution([result.latency for result in model_results if result.ok]),
+        }
+    return {
+        "requests": len(results),
+        "completed": len(completed),
+        "error_rate": (len(results) - len(completed)) / len(results) if results else 0.0,
+        "errors": dict(errors),
+        "duration_secs": duration_secs,
+        "throughput_rps": len(completed) / duration_secs if duration_secs else None,
+        "latency": _distribution([result.latency for result in completed]),
+        "ttft": _distribution([result.ttft for result in completed if result.ttft is not None]),
+        "tokens_per_second": _distribution(
+            [result.tokens / result.generation_secs for result in completed if result.generation_secs > 0]
+        ),
+        "completion_tokens": tokens,
+        "aggregate_tokens_per_second": tokens / duration_secs if duration_secs else None,
+        "model_switches": {
+            "arrival_order": count_switches([result.model for result in results]),
+            "service": service_switches,
+        },
+        "models": per_model,
+    }
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // BaseModelWrapper.CHARS_PER_TOKEN_ESTIMATE + (1 if text else 0)
+
+
+async def send_chat(client: httpx.AsyncClient, body: t.Dict) -> RequestResult:
+    result = RequestResult(body.get("model"))
+    started = time.perf_counter()
+    try:
+        async with client.stream("POST", CHAT_ROUTE, json=body) as response:
+            result.status = response.status_code
+            if response.status_code >= 400:
+                await response.aread()
+                result.error = f"http_{response.status_code}"
+                return result
+            # Whether a request streams can depend on the model's defaults, so tell by the body.
+            text, other_lines = [], []
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    other_lines.append(line)
+                    continue
+                if line == "data: [DONE]":
+                    continue
+                if result.ttft is None:
+                    result.ttft = time.perf_counter() - started
+                choice = json.loads(line[len("data: "):])["choices"][0]
+                text.append(choice.get("delta", {}).get("content") or choice.get("text") or "")
+            if result.ttft is not None:
+                result.tokens = _estimate_tokens("".join(text))
+            else:
+                completion = json.loads("\n".join(other_lines))
+                result.ttft = time.perf_counter() - started
+                usage = completion.get("usage") or {}
+                content = completion["choices"][0].get("message", {}).get("content") or ""
+                result.tokens = usage.get("completion_tokens") or _estimate_tokens(content)
+    except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+        result.error = type(e).__name__
+        return result
+    finally:
+        result.latency = time.perf_counter() - started
+    if result.ttft is not None:
+        result.generation_secs = result.latency - result.ttft
+    return result
+
+
+async def fetch_service_switches(client: httpx.AsyncClient) -> t.Optional[int]:
+    try:
+        response = await client.get(SERVICE_INFO_ROUTE)
+        response.raise_for_status()
+        return response.json()["scheduler"]["switches"]
+    except (httpx.HTTPError, ValueError, KeyError, TypeError):
+        return None
+
+
+async def replay(
+    client: httpx.AsyncClient, planned: t.List[t.Tuple[t.Optional[float], t.Dict]], concurrency: int
+) -> t.Dict:
+    slots = asyncio.Semaphore(concurrency)
+    switches_before = await fetch_service_switches(client)
+    started = time.perf_counter()
+
+    async def run(offset: t.Optional[float], body: t.Dict) -> RequestResult:
+        if offset is not None:
+            await asyncio.sleep(max(0.0, started + offset - time.perf_counter()))
+        async with slots:
+            return await send_chat(client, body)
+
+    results = await asyncio.gather(*(run(offset, body) for offset, body in planned))
+    duration = time.perf_counter() - started
+    switches_after = await fetch_service_switches(client)
+    service_switches = (
+        switches_after - switches_before if switches_before is not None and switches_after is not None else None
+    )
+    return summarize(list(results), duration, service_switches)
+
+
+def load_app(target: str):
+    """Import ``module:attribute``; BentoML services are turned into their ASGI app."""
+    module_name, _, attribute = target.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute)
+    to_asgi = getattr(app, "to_asgi", None)
+    return to_asgi() if to_asgi is not None else app
+
+
+class _Lifespan:
+    """Runs an ASGI app's startup and shutdown, which httpx's ASGI transport does not."""
+
+    def __init__(self, app):
+        self.app = app
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._replies: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self.app({"type": "lifespan"}, self._events.get, self._replies.put))
+        await self._exchange("lifespan.startup")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._exchange("lifespan.shutdown")
+        await self._task
+
+    async def _exchange(self, event: str):
+        await self._events.put({"type": event})
+        reply = await self._replies.get()
+        if reply["type"].endswith(".failed"):
+            raise RuntimeError(f"{event} failed: {reply.get('message')}")
+
+
+async def run_replay(args, planned) -> t.Dict:
+    timeout = httpx.Timeout(args.timeout)
+    if args.app:
+        app = load_app(args.app)
+        async with _Lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=timeout) as client:
+                return await replay(client, planned, args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+        return await replay(client, planned, args.concurrency)
+
+
+def main(argv: t.List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSONL file of chat request bodies")
+    parser.add_argument("--url", default="http://localhost:3000", help="base URL of a running service")
+    parser.add_argument("--app", help="replay in process against module:attribute instead of --url")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--rate", type=float, help="Poisson arrival rate in requests/s (default: recorded or closed loop)")
+    parser.add_argument("--model-mix", help="reassign models by weight, e.g. a=3,b=1")
+    parser.add_argument("--requests", type=int, help="number of requests to send, cycling through the file")
+    parser.add_argument("--max-tokens", type=int, help="override max_tokens of every request")
+    parser.add_argument("--no-stream", action="store_true", help="send non-streaming requests")
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for arrivals and the model mix")
+    parser.add_argument("--output", help="write the JSON summary here instead of stdout")
+    args = parser.parse_args(argv)
+
+    requests = load_requests(args.path)
+    if not requests:
+        parser.error(f"no replayable requests in {args.path}")
+    if args.requests:
+        requests = [requests[i % len(requests)] for i in range(args.requests)]
+
+    rng = random.Random(args.seed)
+    mix = parse_model_mix(args.model_mix) if args.model_mix else None
+    for i, request in enumerate(requests):
+        request = dict(request)
+        if mix:
+            request["model"] = rng.choices(list(mix), weights=list(mix.values()))[0]
+        if args.max_tokens is not None:
+            request["max_tokens"] = args.max_tokens
+        if args.no_stream:
+            request["stream"] = False
+        requests[i] = request
+
+    summary = asyncio.run(run_replay(args, plan_arrivals(requests, args.rate, rng)))
+    output = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare encoding streamed chat chunks with ``json.dumps`` per chunk against the
+pre-serialized frame encoder.
+
+Usage:
+    python -m benchmarks.sse_encoding [--chunks 10000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from response_formatters import openAI
+from response_formatters.openAI import OpenAIResponseFormatter, OpenAIStreamContext
+
+
+def encode_per_chunk(stream: OpenAIStreamContext, raw_response):
+    """The previous implementation: build the chunk dict, dump it and wrap it."""
+    return f"data: {json.dumps(stream.format(raw_response))}\n\n".encode()
+
+
+def build_chunks(n_chunks: int):
+    words = ["def", " f", "(x", "):", "\n", "    return", " x", " *", " 2", "\n", " café", ' "quoted"']
+    return [{"choices": [{"text": "".join(words[(i + j) % len(words)] for j in range(8))}]} for i in range(n_chunks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000, help="chunks in the simulated stream")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements to take the best of")
+    args = parser.parse_args()
+
+    stream = OpenAIResponseFormatter().new_stream()
+    chunks = build_chunks(args.chunks)
+    for raw_response in chunks:
+        assert stream.encode(raw_response) == encode_per_chunk(stream, raw_response)
+
+    def run(encode):
+        for raw_response in chunks:
+            encode(raw_response)
+
+    baseline = min(timeit.repeat(lambda: run(lambda r: encode_per_chunk(stream, r)), number=1, repeat=args.repeat))
+    encoder = min(timeit.repeat(lambda: run(stream.encode), number=1, repeat=args.repeat))
+
+    print(f"chunks={args.chunks} orjson={'yes' if openAI.orjson is not None else 'no'}")
+    print(f"json.dumps per chunk : {baseline / len(chunks) * 1e6:8.2f} us/chunk")
+    print(f"pre-serialized frame : {encoder / len(chunks) * 1e6:8.2f} us/chunk")
+    print(f"speedup              : {baseline / encoder:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Any, Dict
+from typing import List, Any, Callable, Dict, Optional
+from .prompt_template import CompiledTemplate, FragmentCache
 
 
 class BaseModelWrapper(ABC):
     DEFAULT_PROMPT_TEMPLATE = "{system_prompt}\n\n{conversation_history}"
     DEFAULT_SYSTEM_MESSAGE_TEMPLATE = "System: {system_prompt}"
     DEFAULT_CONVERSATION_MESSAGE_TEMPLATE = "{role}: {content}"
+    CHARS_PER_TOKEN_ESTIMATE = 4
+    MAX_TOKEN_COUNT_ENTRIES = 8192
 
     def __init__(self, model_name: str, model_path: str, default_params: Dict = None):
         self.model_name = model_name
@@ -14,6 +17,62 @@ class BaseModelWrapper(ABC):
         self.system_message_template = self.DEFAULT_SYSTEM_MESSAGE_TEMPLATE
         self.conversation_message_template = self.DEFAULT_CONVERSATION_MESSAGE_TEMPLATE
         self.default_params = default_params or {}
+        self.fragment_cache = FragmentCache()
+        self._token_counts: Dict[str, int] = {}
+        self._compiled_templates: Dict[str, CompiledTemplate] = {}
+        # Set by the model manager to publish prefix cache lookups: (hit, tokens_saved).
+        self.on_prefix_lookup: Optional[Callable[[bool, int], None]] = None
+
+    def compile_templates(self):
+        """Parse the prompt templates once and reset memoized message fragments."""
+        self._compiled_templates = {
+            "prompt": CompiledTemplate(self.prompt_template),
+            "system_message": CompiledTemplate(self.system_message_template),
+            "conversation_message": CompiledTemplate(self.conversation_message_template),
+        }
+        self.fragment_cache.clear()
+        self._token_counts.clear()
+
+    def _template(self, name: str) -> CompiledTemplate:
+        if not self._compiled_templates:
+            self.compile_templates()
+        return self._compiled_templates[name]
+
+    def format_prompt(self, system_prompt: str, conversation_history: str) -> str:
+        return self._template("prompt").render(system_prompt=system_prompt, conversation_history=conversation_history)
+
+    def format_system_message(self, system_prompt: str) -> str:
+        fragment = self.fragment_cache.get("system", system_prompt)
+        if fragment is None:
+            fragment = self._template("system_message").render(system_prompt=system_prompt)
+            self.fragment_cache.put("system", system_prompt, fragment)
+        return fragment
+
+    def format_conversation_message(self, role: str, content: str) -> str:
+        fragment = self.fragment_cache.get(role, content)
+        if fragment is None:
+            fragment = self._template("conversation_message").render(role=role, content=content)
+            self.fragment_cache.put(role, content, fragment)
+        return fragment
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens in ``text``; wrappers with a tokenizer should override this estimate."""
+        return len(text) // self.CHARS_PER_TOKEN_ESTIMATE + 1
+
+    def count_fragment_tokens(self, fragment: str) -> int:
+        """Token count of a memoized fragment, cached so a growing conversation is only counted once."""
+        count = self._token_counts.get(fragment)
+        if count is None:
+            count = self.count_tokens(fragment)
+            if len(self._token_counts) >= self.MAX_TOKEN_COUNT_ENTRIES:
+                self._token_counts.clear()
+            self._token_counts[fragment] = count
+        return count
+
+    @classmethod
+    def config_options(cls, model_config: Dict) -> Dict:
+        """Constructor arguments read from wrapper-specific keys of ``model_config``."""
+        return {}
 
     def initialize_model(self):
         """Initialize the model after all attributes are set."""
@@ -22,14 +81,27 @@ class BaseModelWrapper(ABC):
     def set_prompt_template(self, template: str):
         """Set the prompt template for the model."""
         self.prompt_template = template
+        self._compiled_templates = {}
 
     def set_system_message_template(self, template: str):
         """Set the system message template for the model."""
         self.system_message_template = template
+        self._compiled_templates = {}
 
     def set_conversation_message_template(self, template: str):
         """Set the conversation message template for the model."""
         self.conversation_message_template = template
+        self._compiled_templates = {}
+
+    def shrink_caches(self) -> int:
+        """Drop cached prompt fragments and token counts; returns the bytes freed, if known."""
+        self.fragment_cache.clear()
+        self._token_counts.clear()
+        return 0
+
+    def get_cache_stats(self) -> Dict:
+        """Return statistics for any caches the wrapper maintains."""
+        return {"prompt_fragments": self.fragment_cache.get_stats()}
 
     @abstractmethod
     def load_model(self) -> Any:
@@ -37,12 +109,14 @@ class BaseModelWrapper(ABC):
         pass
 
     @abstractmethod
-    def create_prompt(self, messages: List[dict]) -> str:
+    def create_prompt(self, messages: List[dict], max_tokens: int = None) -> str:
         """
         Generate the prompt based on the provided messages.
 
         Args:
             messages (List[dict]): List of message dictionaries.
+            max_tokens (int): Tokens reserved for the completion; history that does not
+                fit in the remaining context window is dropped, oldest first.
 
         Returns:
             str: Formatted prompt.
@@ -4,3 +4,8 @@ class ModelNotFoundException(Exception):
 
 class ModelLoadException(Exception):
     pass
+
+
+class ModelAdmissionException(ModelLoadException):
+    """A load was refused because the model does not fit in memory."""
+    pass
@@ -0,0 +1,274 @@
+from typing import BinaryIO, Dict, Iterable, Optional
+import json
+import logging
+import math
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+GGUF_MAGIC = b"GGUF"
+# Bumped whenever the fields stored per file change, so old indexes are rebuilt.
+INDEX_VERSION = 2
+
+_SCALARS = {
+    0: struct.Struct("<B"),
+    1: struct.Struct("<b"),
+    2: struct.Struct("<H"),
+    3: struct.Struct("<h"),
+    4: struct.Struct("<I"),
+    5: struct.Struct("<i"),
+    6: struct.Struct("<f"),
+    7: struct.Struct("<?"),
+    10: struct.Struct("<Q"),
+    11: struct.Struct("<q"),
+    12: struct.Struct("<d"),
+}
+_STRING = 8
+_ARRAY = 9
+_UINT32 = struct.Struct("<I")
+_UINT64 = struct.Struct("<Q")
+
+# llama_ftype values written to general.file_type.
+FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1", 10: "Q2_K",
+    11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M", 16: "Q5_K_S",
+    17: "Q5_K_M", 18: "Q6_K", 32: "BF16",
+}
+# Bytes per element of the default f16 KV cache.
+KV_CACHE_ELEMENT_BYTES = 2
+# Bytes per element of the float32 logits llama-cpp-python keeps.
+LOGITS_ELEMENT_BYTES = 4
+
+
+class _Reader:
+    def __init__(self, file: BinaryIO):
+        self.file = file
+
+    def unpack(self, fmt: struct.Struct):
+        data = self.file.read(fmt.size)
+        if len(data) != fmt.size:
+            raise ValueError("Truncated GGUF header")
+        return fmt.unpack(data)[0]
+
+    def string(self) -> str:
+        return self.file.read(self.unpack(_UINT64)).decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        self.file.seek(self.unpack(_UINT64), os.SEEK_CUR)
+
+    def value(self, value_type: int):
+        if value_type == _STRING:
+            return self.string()
+        if value_type == _ARRAY:
+            self.skip_array()
+            return None
+        if value_type not in _SCALARS:
+            raise ValueError(f"Unknown GGUF value type {value_type}")
+        return self.unpack(_SCALARS[value_type])
+
+    def skip_array(self) -> int:
+        """Skip an array, returning its length."""
+        item_type = self.unpack(_UINT32)
+        count = self.unpack(_UINT64)
+        if item_type in _SCALARS:
+            self.file.seek(_SCALARS[item_type].size * count, os.SEEK_CUR)
+        else:
+            for _ in range(count):
+                self.skip_value(item_type)
+        return count
+
+    def skip_value(self, value_type: int):
+        if value_type == _STRING:
+            self.skip_string()
+        else:
+            self.value(value_type)
+
+
+def read_gguf_metadata(path: str) -> Dict:
+    """
+    Read the architecture, size and context length of a GGUF model from its header.
+
+    Only the key-value metadata and the tensor descriptions at the start of the file
+    are read, not the weights.
+
+    Raises:
+        ValueError: If the file is not a GGUF file or its header is malformed.
+    """
+    with open(path, "rb") as file:
+        reader = _Reader(file)
+        if file.read(4) != GGUF_MAGIC:
+            raise ValueError(f"{path} is not a GGUF file")
+        version = reader.unpack(_UINT32)
+        tensor_count = reader.unpack(_UINT64)
+        kv_count = reader.unpack(_UINT64)
+
+        values = {}
+        array_lengths = {}
+        for _ in range(kv_count):
+            key = reader.string()
+            value_type = reader.unpack(_UINT32)
+            if value_type == _ARRAY:
+                # Arrays hold tokenizer vocabularies and the like; only their length is kept.
+                array_lengths[key] = reader.skip_array()
+            else:
+                values[key] = reader.value(value_type)
+
+        parameters = 0
+        for _ in range(tensor_count):
+            reader.skip_string()
+            n_dims = reader.unpack(_UINT32)
+            parameters += math.prod(reader.unpack(_UINT64) for _ in range(n_dims))
+            reader.unpack(_UINT32)  # tensor type
+            reader.unpack(_UINT64)  # data offset
+
+    architecture = values.get("general.architecture")
+
+    def arch_value(key: str):
+        return values.get(f"{architecture}.{key}")
+
+    head_count = arch_value("attention.head_count")
+    embedding_length = arch_value("embedding_length")
+    file_type = values.get("general.file_type")
+    return {
+        "gguf_version": version,
+        "name": values.get("general.name"),
+        "architecture": architecture,
+        "file_type": FILE_TYPES.get(file_type, file_type),
+        "parameters": parameters,
+        "n_layers": arch_value("block_count"),
+        "context_length": arch_value("context_length"),
+        "embedding_length": embedding_length,
+        "head_count": head_count,
+        "head_count_kv": arch_value("attention.head_count_kv") or head_count,
+        "key_length": arch_value("attention.key_length")
+        or (embedding_length // head_count if embedding_length and head_count else None),
+        "value_length": arch_value("attention.value_length")
+        or (embedding_length // head_count if embedding_length and head_count else None),
+        "n_vocab": arch_value("vocab_size") or array_lengths.get("tokenizer.ggml.tokens"),
+    }
+
+
+def estimate_kv_cache_bytes(metadata: Dict, n_context: int) -> int:
+    """Size of an f16 KV cache for ``n_context`` tokens, or 0 if the header lacks the dimensions."""
+    n_layers = metadata.get("n_layers")
+    head_count_kv = metadata.get("head_count_kv")
+    key_length = metadata.get("key_length")
+    value_length = metadata.get("value_length")
+    if not (n_layers and head_count_kv and key_length and value_length and n_context):
+        return 0
+    return n_layers * n_context * head_count_kv * (key_length + value_length) * KV_CACHE_ELEMENT_BYTES
+
+
+def estimate_logits_bytes(metadata: Dict, n_context: int) -> int:
+    """
+    Size of the float32 logits kept for every one of ``n_context`` positions, or 0 if
+    the header lacks the vocabulary size.
+
+    llama-cpp-python keeps them with ``logits_all``, which speculative decoding turns on.
+    """
+    n_vocab = metadata.get("n_vocab")
+    if not (n_vocab and n_context):
+        return 0
+    return n_context * n_vocab * LOGITS_ELEMENT_BYTES
+
+
+class GGUFIndex:
+    """
+    GGUF header metadata of the configured models, kept in a small JSON file.
+
+    Entries are keyed by path and reused across restarts as long as the file's size
+    and modification time are unchanged. ``refresh`` indexes files on a background
+    thread; ``lookup`` only returns what has been indexed and never reads a model file,
+    so it is safe to call while holding locks.
+    """
+
+    def __init__(self, index_path: str = None):
+        self.index_path = index_path
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable GGUF index {self.index_path}: {e}")
+            return
+        if index.get("version") == INDEX_VERSION:
+            self._entries = index.get("files", {})
+
+    def _save(self):
+        if not self.index_path:
+            return
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        with self._lock:
+            index = {"version": INDEX_VERSION, "files": dict(self._entries)}
+        with open(temp_path, "w") as file:
+            json.dump(index, file, indent=1)
+        os.replace(temp_path, self.index_path)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Dict]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {"file_size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """The indexed metadata of ``path`` if it is current, without reading the file."""
+        if not path:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+        signature = self._signature(path)
+        if signature is None or any(entry.get(key) != value for key, value in signature.items()):
+            return None
+        return entry
+
+    def index(self, path: str) -> Optional[Dict]:
+        """Return the metadata of ``path``, reading its header if the index is stale."""
+        entry = self.lookup(path)
+        if entry is not None:
+            return entry
+        signature = self._signature(path)
+        if signature is None:
+            return None
+        try:
+            entry = {**read_gguf_metadata(path), **signature}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read GGUF metadata of {path}: {e}")
+            return None
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def refresh(self, paths: Iterable[str], wait: bool = False):
+        """Index ``paths`` on a background thread and save the index once done."""
+        paths = [path for path in paths if path]
+
+        def run():
+            changed = False
+            for path in paths:
+                if self.lookup(path) is None:
+                    changed = self.index(path) is not None or changed
+            if changed:
+                try:
+                    self._save()
+                except OSError as e:
+                    logger.warning(f"Could not save GGUF index {self.index_path}: {e}")
+
+        thread = threading.Thread(target=run, name="gguf-index", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
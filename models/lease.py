@@ -0,0 +1,57 @@
+import threading
+from .base import BaseModelWrapper
+
+
+class LeaseCounter:
+    """
+    Counts the requests currently using one loaded wrapper.
+
+    Any number of leases can be held at once. Unloading acts as the writer: it waits
+    in ``wait_until_idle`` until every lease has been released.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._condition = threading.Condition()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def acquire(self):
+        with self._condition:
+            self._count += 1
+
+    def release(self):
+        with self._condition:
+            self._count -= 1
+            if self._count == 0:
+                self._condition.notify_all()
+
+    def wait_until_idle(self, timeout: float = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count == 0, timeout=timeout)
+
+
+class ModelLease:
+    """A request's hold on a wrapper; the wrapper is not cleaned up until it is released."""
+
+    __slots__ = ("model_name", "wrapper", "_counter", "_released")
+
+    def __init__(self, model_name: str, wrapper: BaseModelWrapper, counter: LeaseCounter):
+        self.model_name = model_name
+        self.wrapper = wrapper
+        self._counter = counter
+        self._released = False
+        counter.acquire()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._counter.release()
+
+    def __enter__(self) -> BaseModelWrapper:
+        return self.wrapper
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
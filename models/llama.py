@@ -1,9 +1,16 @@
 from typing import List, Any, Dict
 from llama_cpp import Llama
 from .base import BaseModelWrapper
+from .prefix_cache import PrefixStateCache
+from .speculative import CountingDraftModel, build_draft_model
+from .state_spill import StateSpillStore
+from utils.config_loader import parse_memory_size
+from utils.constants import DEFAULT_STATE_SPILL_CAPACITY, DEFAULT_STATE_SPILL_MAX_STATES
 from api.schemas import Message
 import logging
 import gc
+import threading
+import time
 
 logger = logging.getLogger("bentoml")
 
@@ -19,6 +26,9 @@ class LLaMAWrapper(BaseModelWrapper):
         system_message_template: str = None,
         conversation_message_template: str = None,
         default_params: Dict = None,
+        prefix_cache_bytes: int = 0,
+        state_spill: Dict = None,
+        speculative: Dict = None,
     ):
         super().__init__(
             model_name=model_name,
@@ -33,53 +43,128 @@ class LLaMAWrapper(BaseModelWrapper):
             self.set_system_message_template(system_message_template)
         if conversation_message_template:
             self.set_conversation_message_template(conversation_message_template)
+        self.prefix_cache_bytes = prefix_cache_bytes
+        self.prefix_cache: PrefixStateCache = None
+        self.state_spill = state_spill or {}
+        self.speculative = speculative or {}
+        self.draft_model: CountingDraftModel = None
         self.model = None
         self.ctx = None
+        # llama.cpp contexts are not thread-safe; generations on one model are serialized.
+        self._inference_lock = threading.Lock()
+
+    @classmethod
+    def config_options(cls, model_config: Dict) -> Dict:
+        return {"speculative": model_config.get("speculative")}
 
     def load_model(self) -> Llama:
         logger.debug(f"load_model called, self.n_gpu_layers: {self.n_gpu_layers}")
         logger.debug(f"Initializing LLaMA model with path: {self.model_path}")
         try:
             if self.model is None:
+                if self.speculative:
+                    self.draft_model = build_draft_model(self.speculative, self.n_context)
                 self.model = Llama(
                     model_path=self.model_path,
                     n_gpu_layers=self.n_gpu_layers,
                     n_ctx=self.n_context,
+                    draft_model=self.draft_model,
+                    # Verifying drafts reads the logits of every position; without logits_all
+                    # the scores buffer only has n_batch rows and longer prompts overflow it.
+                    logits_all=self.draft_model is not None,
                 )
                 self.ctx = self.model.ctx
+                # Counts cached before loading are estimates; recount with the tokenizer.
+                self._token_counts.clear()
+                if self.prefix_cache_bytes > 0:
+                    self.prefix_cache = PrefixStateCache(
+                        capacity_bytes=self.prefix_cache_bytes,
+                        spill_store=self._open_spill_store(),
+                        evaluated_tokens=lambda: self.model.input_ids[: self.model.n_tokens].tolist(),
+                        on_lookup=self.on_prefix_lookup,
+                    )
+                    self.model.set_cache(self.prefix_cache)
             return self.model
         except Exception as e:
             logger.error(f"Error initializing LLaMA model: {e}")
             raise
 
+    def _open_spill_store(self) -> StateSpillStore:
+        if not self.state_spill.get("directory"):
+            return None
+        try:
+            return StateSpillStore(
+                directory=self.state_spill["directory"],
+                capacity_bytes=parse_memory_size(self.state_spill.get("capacity", DEFAULT_STATE_SPILL_CAPACITY)),
+                fingerprint=StateSpillStore.model_fingerprint(self.model_path, self.n_context),
+            )
+        except OSError as e:
+            logger.warning(f"State spilling disabled for {self.model_name}: {e}")
+            return None
+
+    def _spill_states(self):
+        if self.prefix_cache is None or self.prefix_cache.spill_store is None:
+            return
+        try:
+            self.prefix_cache.spill(self.state_spill.get("max_states", DEFAULT_STATE_SPILL_MAX_STATES))
+        except Exception as e:
+            logger.warning(f"Failed to spill context states for {self.model_name}: {e}")
+
     def cleanup(self):
+        self._spill_states()
         if self.model is not None:
             self.model = None      # Remove reference to the model
             self.ctx = None
+            self.prefix_cache = None
+            self.draft_model = None
         gc.collect()
 
-    def create_prompt(self, messages: List[Message]) -> str:
+    def shrink_caches(self) -> int:
+        freed = super().shrink_caches()
+        # A generation in progress may be using a cached state; skip the prefix cache then.
+        if self.prefix_cache is None or not self._inference_lock.acquire(blocking=False):
+            return freed
+        try:
+            self._spill_states()
+            freed += self.prefix_cache.clear()
+        finally:
+            self._inference_lock.release()
+        return freed
+
+    def get_cache_stats(self) -> Dict:
+        stats = super().get_cache_stats()
+        if self.prefix_cache is not None:
+            stats["prefix_cache"] = self.prefix_cache.get_stats()
+        return stats
+
+    def count_tokens(self, text: str) -> int:
+        if self.model is None:
+            return super().count_tokens(text)
+        return len(self.model.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def create_prompt(self, messages: List[Message], max_tokens: int = None) -> str:
         logger.debug(f"Creating prompt from {len(messages)} messages")
         logger.debug(f"Last message content: {messages[-1].content if messages else 'No messages'}")
         try:
-            system_prompt = next(
-                (msg.content for msg in messages if msg.role == "system"), ""
-            )
-            formatted_system_prompt = self.system_message_template.format(
-                system_prompt=system_prompt
-            )
+            # Single pass: the first system message anywhere and every user/assistant turn.
+            system_prompt = None
+            conversation_fragments = []
+            for msg in messages:
+                if msg.role == "system":
+                    if system_prompt is None:
+                        system_prompt = msg.content
+                elif msg.role in {"user", "assistant"}:
+                    conversation_fragments.append(
+                        self.format_conversation_message(msg.role, msg.content)
+                    )
 
-            conversation_history = "\n".join(
-                self.conversation_message_template.format(
-                    role=msg.role, content=msg.content
-                )
-                for msg in messages[-30:]
-                if msg.role in {"user", "assistant"}
+            formatted_system_prompt = self.format_system_message(system_prompt or "")
+            conversation_fragments = self._fit_history(
+                formatted_system_prompt, conversation_fragments, max_tokens
             )
-
-            formatted_prompt = self.prompt_template.format(
+            formatted_prompt = self.format_prompt(
                 system_prompt=formatted_system_prompt,
-                conversation_history=conversation_history,
+                conversation_history="\n".join(conversation_fragments),
             )
 
             logger.debug(
@@ -90,18 +175,105 @@ class LLaMAWrapper(BaseModelWrapper):
             logger.error(f"Error in create_prompt: {str(e)}")
             raise ValueError(f"Failed to create prompt: {str(e)}")
 
+    def _fit_history(self, formatted_system_prompt: str, fragments: List[str], max_tokens: int = None) -> List[str]:
+        """
+        Keep the newest conversation fragments that fit in ``n_context - max_tokens``.
+
+        Token counts are cached per fragment, so only messages new since the last turn
+        are tokenized. The count of a joined prompt can differ from the sum of its parts
+        by a token at each boundary, which the one token per separator absorbs.
+        """
+        if max_tokens is None:
+            max_tokens = self.default_params.get("max_tokens") or 0
+        budget = self.n_context - max_tokens
+        # Scaffold: the prompt template with the system prompt but no history.
+        budget -= self.count_fragment_tokens(
+            self.format_prompt(system_prompt=formatted_system_prompt, conversation_history="")
+        )
+
+        kept = 0
+        for fragment in reversed(fragments):
+            cost = self.count_fragment_tokens(fragment) + 1
+            if cost > budget:
+                break
+            budget -= cost
+            kept += 1
+
+        if fragments and kept == 0:
+            raise ValueError(
+                f"The latest message does not fit in the {self.n_context}-token context "
+                f"with {max_tokens} tokens reserved for the completion"
+            )
+        if kept < len(fragments):
+            logger.info(f"Dropped {len(fragments) - kept} oldest messages to fit the context window")
+        return fragments[len(fragments) - kept:]
+
     def get_response(self, prompt: str, **kwargs) -> Any:
         logger.debug(f"Generating response for prompt: {prompt[:50]}...")
         try:
             self.load_model()  # Ensure model is loaded
             # Merge default_params with kwargs, giving priority to kwargs
             params = {**self.default_params, **kwargs}
+            speculative = params.pop("speculative", None)
             logger.debug(f"Params: {params}")
-            return self.model(prompt=prompt, **params)
+            if params.get("stream"):
+                return self._stream_response(prompt, params, speculative)
+            with self._inference_lock:
+                speculating = self._use_draft_model(speculative)
+                started = time.perf_counter()
+                output = self.model(prompt=prompt, **params)
+                completion_tokens = output.get("usage", {}).get("completion_tokens", 0)
+                self._report_speculation(output, speculating, completion_tokens, time.perf_counter() - started)
+                return output
         except Exception as e:
             logger.error(f"Error in get_response method: {e}")
             raise
 
+    def _stream_response(self, prompt: str, params: Dict, speculative: bool = None):
+        # Holds the inference lock until the stream is exhausted or closed.
+        with self._inference_lock:
+            speculating = self._use_draft_model(speculative)
+            started = time.perf_counter()
+            tokens = 0
+            for chunk in self.model(prompt=prompt, **params):
+                if chunk["choices"][0].get("finish_reason") is None:
+                    tokens += 1
+                else:
+                    self._report_speculation(chunk, speculating, tokens, time.perf_counter() - started)
+                yield chunk
+
+    def _use_draft_model(self, speculative: bool = None) -> bool:
+        """
+        Turn speculative decoding on or off for the next generation.
+
+        ``speculative`` comes from the request; None falls back to the ``enabled``
+        setting of the model's ``speculative`` config. Returns whether it is on.
+        """
+        if self.draft_model is None:
+            return False
+        speculating = self.speculative.get("enabled", True) if speculative is None else bool(speculative)
+        self.model.draft_model = self.draft_model if speculating else None
+        self.draft_model.reset()
+        return speculating
+
+    def _report_speculation(self, output: Dict, speculating: bool, completion_tokens: int, elapsed_secs: float):
+        """Add the draft acceptance and effective speed of a generation to its output under ``speculative``."""
+        if self.draft_model is None:
+            return
+        stats = {
+            "enabled": speculating,
+            "completion_tokens": completion_tokens,
+            # Prompt evaluation included, so plain and speculative generations compare like for like.
+            "tokens_per_sec": completion_tokens / elapsed_secs if elapsed_secs > 0 else 0.0,
+        }
+        if speculating:
+            stats.update(self.draft_model.get_stats())
+            logger.info(
+                f"{self.model_name}: accepted {stats['accepted_tokens']} of {stats['drafted_tokens']} drafted tokens "
+                f"({stats['acceptance_rate']:.0%}), {stats['tokens_per_sec']:.1f} tokens/s"
+            )
+        output["speculative"] = stats
+
     def format_output(self, raw_output: Any) -> dict:
         logger.debug("Formatting model output")
         try:
@@ -0,0 +1,48 @@
+from concurrent.futures import Future
+from typing import Dict, Optional
+import time
+
+
+class LoadState:
+    """Lifecycle states reported for each configured model."""
+
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    UNLOADING = "unloading"
+    FAILED = "failed"
+
+
+class ModelLoad:
+    """
+    A background load of one model.
+
+    ``future`` resolves to the loaded wrapper, or raises ``ModelLoadException``; every
+    caller waiting for the model shares it. Progress is estimated from the duration of
+    the model's previous load, since llama.cpp does not report it through ``Llama``.
+    """
+
+    __slots__ = ("model_name", "prefetch", "future", "started_at", "expected_secs")
+
+    def __init__(self, model_name: str, prefetch: bool = False, expected_secs: float = None):
+        self.model_name = model_name
+        self.prefetch = prefetch
+        self.future: Future = Future()
+        self.started_at = time.time()
+        self.expected_secs = expected_secs
+
+    def elapsed_secs(self) -> float:
+        return time.time() - self.started_at
+
+    def progress(self) -> Optional[float]:
+        if not self.expected_secs:
+            return None
+        return min(0.99, self.elapsed_secs() / self.expected_secs)
+
+    def get_info(self) -> Dict:
+        return {
+            "state": LoadState.LOADING,
+            "progress": self.progress(),
+            "elapsed_secs": self.elapsed_secs(),
+            "prefetch": self.prefetch,
+        }
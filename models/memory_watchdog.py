@@ -0,0 +1,83 @@
+from typing import Optional
+import logging
+import threading
+
+from utils.memory_probe import available_memory
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryWatchdog:
+    """
+    Relieves memory pressure before the kernel's OOM killer does.
+
+    Every ``poll_secs`` the memory still available to the process (system memory,
+    capped by its cgroup) is sampled. While it is below ``min_available`` bytes the
+    cheapest relief is taken first: the model caches, and the response cache, are
+    dropped; if that is not enough, one idle model is unloaded per sample so the
+    effect of each unload is measured before the next.
+    """
+
+    def __init__(self, model_manager, min_available: int, poll_secs: float = 2.0, response_cache=None, metrics=None):
+        self.model_manager = model_manager
+        self.min_available = min_available
+        self.poll_secs = poll_secs
+        self.response_cache = response_cache
+        self.metrics = metrics
+        self.stats = {"samples": 0, "pressure_samples": 0, "cache_shrinks": 0, "unloads": 0}
+        self._caches_shrunk = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> Optional[str]:
+        """Sample the available memory and act on pressure; returns the action taken, if any."""
+        available = available_memory()
+        self.stats["samples"] += 1
+        if self.metrics is not None:
+            self.metrics.set_available_memory(available)
+        if available >= self.min_available:
+            self._caches_shrunk = False
+            return None
+
+        self.stats["pressure_samples"] += 1
+        # Caches refill quickly; drop them once per pressure episode, then move on to models.
+        if not self._caches_shrunk:
+            self._caches_shrunk = True
+            freed = self.model_manager.shrink_caches()
+            if self.response_cache is not None:
+                self.response_cache.clear()
+            self.stats["cache_shrinks"] += 1
+            logger.warning(f"Memory pressure ({available} bytes available): dropped caches, freeing {freed} bytes")
+            return self._record("shrink_caches")
+
+        unloaded = self.model_manager.unload_idle_model()
+        if unloaded is None:
+            logger.warning(f"Memory pressure ({available} bytes available) and no idle model to unload")
+            return None
+        self.stats["unloads"] += 1
+        logger.warning(f"Memory pressure ({available} bytes available): unloading idle model {unloaded}")
+        return self._record("unload_model")
+
+    def _record(self, action: str) -> str:
+        if self.metrics is not None:
+            self.metrics.record_pressure_action(action)
+        return action
+
+    def get_stats(self):
+        return {"min_available": self.min_available, **self.stats}
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_secs):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Memory watchdog check failed: {e}")
@@ -1,55 +1,537 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+from typing import Dict, Optional
 from .wrapper_factory import WrapperFactory
 from .base import BaseModelWrapper
 import logging
+import os
 import time
 import gc
-from .exceptions import ModelNotFoundException, ModelLoadException
+import contextvars
+from .exceptions import ModelNotFoundException, ModelLoadException, ModelAdmissionException
+from .prefetch import TransitionTracker
+from .lease import LeaseCounter, ModelLease
+from .load_state import LoadState, ModelLoad
+from .gguf_index import GGUFIndex, estimate_kv_cache_bytes, estimate_logits_bytes
+from .page_cache import PageCacheWarmer
+from utils.config_loader import parse_memory_size
+from utils.constants import DEFAULT_N_CONTEXT, DEFAULT_ADMISSION_TIMEOUT_SECS, ADMISSION_POLL_SECS
+from utils.memory_probe import available_memory, cgroup_memory_usage, process_rss, wait_for_reclaim
+from utils.tracing import span
 import threading
 
 logger = logging.getLogger(__name__)
 
 
 class ModelManager:
-    def __init__(self, model_configs, mode="dynamic", unload_delay_secs=0):
-        self.loaded_model: BaseModelWrapper = None
+    """
+    Keeps a pool of resident model wrappers within a memory budget.
+
+    Models stay loaded after use and are only evicted, least recently used first,
+    when loading another model would exceed ``memory_budget`` bytes. Models marked
+    ``pinned: true`` in their configuration are never evicted to make room. A budget
+    of 0 keeps at most one model resident.
+
+    With ``prefetch`` enabled the manager learns which model usually follows the one
+    just requested and loads it in the background when it fits into the free budget.
+    Prefetched models that are never used are the first to be evicted. With a
+    ``page_cache_warmer`` the files of models marked ``prewarm: true``, of evicted
+    models and of predicted models that do not fit the budget are read into the page
+    cache instead, which makes their next load much faster at no cost to the budget.
+
+    Requests use a model through a ``ModelLease`` from ``acquire_model``. Unloading a
+    model removes it from the pool straight away, so new requests load a fresh copy,
+    but only cleans it up once every lease on it has been released. Models evicted to
+    make room are torn down in the background; the new model starts loading right away
+    if the budget has room for both, and otherwise once the process RSS shows the
+    evicted models' memory has been given back.
+
+    Loads run on background threads. ``start_load`` returns a future that resolves once
+    the model is ready; concurrent requests for a model that is still loading wait on
+    the same future. ``get_model_state`` reports each model as cold, loading, ready,
+    unloading or failed.
+
+    Loads are admitted only if they fit: a model larger than the whole budget is
+    refused with ``ModelAdmissionException``, and one that does not fit next to the
+    pinned models (or, with ``check_available_memory``, in the memory the system can
+    still provide) waits up to ``admission_timeout_secs`` for memory to be released
+    before it is refused. The system must also keep ``min_available_memory`` bytes
+    free next to the model, the floor below which the memory watchdog unloads models,
+    so that an admitted load does not get the model unloaded again.
+    """
+
+    def __init__(
+        self,
+        model_configs,
+        mode="dynamic",
+        unload_delay_secs=0,
+        memory_budget=0,
+        prefetch=False,
+        metrics=None,
+        model_index: GGUFIndex = None,
+        admission_timeout_secs: float = DEFAULT_ADMISSION_TIMEOUT_SECS,
+        check_available_memory: bool = False,
+        min_available_memory: int = 0,
+        page_cache_warmer: PageCacheWarmer = None,
+    ):
+        self.loaded_models: "OrderedDict[str, BaseModelWrapper]" = OrderedDict()
+        self.current_model_name: str = None
         self.wrapper_factory = WrapperFactory()
         self.model_configs = model_configs
         self.model_unload_delay_secs = unload_delay_secs
+        self.memory_budget = memory_budget
+        self.model_footprints: Dict[str, int] = {}
         self.unload_timer = None
         self.last_use_time = 0
+        self.model_last_use: Dict[str, float] = {}
+        self.model_leases: Dict[str, LeaseCounter] = {}
         self.mode = mode
+        self.metrics = metrics
+        self.model_index = model_index
+        self.admission_timeout_secs = admission_timeout_secs
+        self.check_available_memory = check_available_memory
+        self.min_available_memory = min_available_memory
+        self.page_cache_warmer = page_cache_warmer
+        self.transition_tracker = TransitionTracker() if prefetch else None
+        self.prefetched_models: set[str] = set()
+        self.stats = {
+            "loads": 0,
+            "evictions": 0,
+            "resident_hits": 0,
+            "prefetch_hits": 0,
+            "prefetch_misses": 0,
+            "overlapped_loads": 0,
+            "reclaimed_bytes": 0,
+            "admission_waits": 0,
+            "admission_refusals": 0,
+        }
+        self._loads: Dict[str, ModelLoad] = {}
+        # Models removed from the pool whose memory has not been reclaimed yet (one entry per copy).
+        self._unloading: list[str] = []
+        self._load_errors: Dict[str, str] = {}
+        self._load_durations: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._memory_released = threading.Condition(self._lock)
+        self._prewarm_hot_models(model_configs)
 
     def load_model(self, model_name: str) -> tuple[bool, BaseModelWrapper]:
+        """Load ``model_name`` if needed, wait until it is ready and make it the current model."""
         if self.mode == "off":
             logger.info("Model loading is disabled (Off mode).")
             return False, None
 
-        if self.loaded_model is None or (self.loaded_model and self.loaded_model.model_name != model_name):
-            self._cancel_unload_timer()
-            if self.loaded_model:
-                self._unload_current_model()
-
-            try:
-                model_config = self.model_configs.get(model_name)
-                if not model_config:
-                    raise ValueError(f"Model {model_name} not found in configuration")
-                logger.debug(f"Attempting to load {model_name} with config: {model_config}")
-                new_model = self.wrapper_factory.get_wrapper(model_name, model_config)
-                self.loaded_model = new_model
+        try:
+            with self._lock:
+                resident = model_name in self.loaded_models
+                future = self.start_load(model_name)
+            wrapper = future.result()
+        except ModelAdmissionException:
+            raise
+        except (ModelNotFoundException, ModelLoadException) as e:
+            logger.error(str(e))
+            return False, None
+
+        with self._lock:
+            if self.loaded_models.get(model_name) is wrapper:
+                self.loaded_models.move_to_end(model_name)
+                self.current_model_name = model_name
+                if resident:
+                    self.stats["resident_hits"] += 1
+                if model_name in self.prefetched_models:
+                    self.prefetched_models.discard(model_name)
+                    self.stats["prefetch_hits"] += 1
+        return True, wrapper
+
+    def start_load(self, model_name: str, prefetch: bool = False) -> Future:
+        """
+        Start loading ``model_name`` in the background unless it is resident or already loading.
+
+        Returns a future resolving to the model's wrapper once it is ready; it raises
+        ``ModelLoadException`` if the load fails.
+        """
+        if model_name not in self.model_configs:
+            raise ModelNotFoundException(f"Model '{model_name}' not found")
+        future = Future()
+        if self.mode == "off":
+            future.set_exception(ModelLoadException("Model loading is disabled (Off mode)"))
+            return future
+
+        with self._lock:
+            wrapper = self.loaded_models.get(model_name)
+            if wrapper is not None:
+                future.set_result(wrapper)
+                return future
+            load = self._loads.get(model_name)
+            if load is not None:
+                if load.prefetch and not prefetch:
+                    # Requested while being prefetched: the prediction was right.
+                    load.prefetch = False
+                    self.stats["prefetch_hits"] += 1
+                return load.future
+            load = ModelLoad(model_name, prefetch=prefetch, expected_secs=self._load_durations.get(model_name))
+            self._loads[model_name] = load
+            self._load_errors.pop(model_name, None)
+
+        logger.info(f"{'Prefetching' if prefetch else 'Loading'} {model_name} in the background")
+        # The load is traced as part of the request that started it; prefetches belong to no request.
+        context = contextvars.Context() if prefetch else contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run_load, load), daemon=True).start()
+        return load.future
+
+    def _run_load(self, load: ModelLoad):
+        model_name = load.model_name
+        try:
+            if not load.prefetch:
+                # Prefetches only start when they fit the free budget.
+                with span("make_room", model=model_name), self._lock:
+                    self._make_room(model_name)
+            model_config = self.model_configs[model_name]
+            logger.debug(f"Attempting to load {model_name} with config: {model_config}")
+            # The load runs outside the manager lock so requests for resident models are not held up.
+            with span("load_weights", model=model_name):
+                wrapper = self.wrapper_factory.get_wrapper(model_name, model_config)
+                if self.metrics is not None:
+                    wrapper.on_prefix_lookup = partial(self.metrics.record_prefix_lookup, model_name)
+                wrapper.initialize_model()
+        except Exception as e:
+            logger.error(f"Failed to load model {model_name}: {str(e)}")
+            with self._lock:
+                self._loads.pop(model_name, None)
+                self._load_errors[model_name] = str(e)
+            if isinstance(e, ModelAdmissionException):
+                load.future.set_exception(e)
+                return
+            if self.metrics is not None:
+                self.metrics.record_load_failure(model_name)
+            load.future.set_exception(ModelLoadException(f"Failed to load model: {model_name}: {str(e)}"))
+            return
+
+        with self._lock:
+            current_config = self.model_configs.get(model_name)
+            stale = current_config is not model_config and (
+                current_config is None or self.wrapper_factory.needs_reload(model_config, current_config)
+            )
+            if stale and current_config is None:
+                self._loads.pop(model_name, None)
+        if stale:
+            # The config was reloaded while this model was loading.
+            wrapper.cleanup()
+            if current_config is None:
+                load.future.set_exception(ModelNotFoundException(f"Model '{model_name}' was removed while loading"))
+            else:
+                logger.info(f"Config of {model_name} changed while loading; loading it again")
+                self._run_load(load)
+            return
+        if current_config is not model_config:
+            # Only sampling defaults or templates changed while loading; apply them as apply_configs does.
+            self.wrapper_factory.update_wrapper(wrapper, current_config)
+
+        with self._lock:
+            self._loads.pop(model_name, None)
+            self._load_durations[model_name] = load.elapsed_secs()
+            if self.metrics is not None:
+                self.metrics.record_load(model_name, self._load_durations[model_name])
+            if self.mode == "off":
+                wrapper.cleanup()
+                load.future.set_exception(ModelLoadException("Model loading is disabled (Off mode)"))
+                return
+            self.loaded_models[model_name] = wrapper
+            self.model_leases[model_name] = LeaseCounter()
+            self.model_last_use[model_name] = time.time()
+            self.stats["loads"] += 1
+            if load.prefetch:
+                # Insert as least recently used so a wrong guess is evicted first.
+                self.loaded_models.move_to_end(model_name, last=False)
+                self.prefetched_models.add(model_name)
+            else:
+                self.current_model_name = model_name
                 logger.info(f"Successfully switched to {model_name}")
-            except Exception as e:
-                logger.error(f"Failed to load model {model_name}: {str(e)}")
-                return False, None
+        load.future.set_result(wrapper)
 
-        return True, self.loaded_model
+    def get_model_state(self, model_name: str) -> Dict:
+        """The load state of ``model_name``, with progress while it is loading."""
+        # Reads a snapshot without the manager lock, so status polls never wait behind a load or unload.
+        load = self._loads.get(model_name)
+        if load is not None:
+            return load.get_info()
+        if model_name in self.loaded_models:
+            return {"state": LoadState.READY}
+        if model_name in self._unloading:
+            return {"state": LoadState.UNLOADING}
+        error = self._load_errors.get(model_name)
+        if error is not None:
+            return {"state": LoadState.FAILED, "error": error}
+        return {"state": LoadState.COLD}
 
-    def _unload_current_model(self):
-        if self.loaded_model:
-            logger.info(f"Unloading model {self.loaded_model.model_name}")
-            self.loaded_model.cleanup()
-            self.loaded_model = None
+    def get_model_states(self) -> Dict[str, Dict]:
+        return {name: self.get_model_state(name) for name in list(self.model_configs)}
+
+    def estimate_model_memory(self, model_name: str) -> int:
+        """
+        Estimate the resident size of a model, plus its prefix cache budget.
+
+        A configured ``memory`` wins. Otherwise models in the GGUF index count their
+        weights plus a KV cache for the configured ``n_context`` and, with speculative
+        decoding configured, the logits of every context position that it makes
+        llama-cpp-python keep. Models not indexed yet count their file size until they are.
+        """
+        if model_name not in self.model_footprints:
+            model_config = self.model_configs.get(model_name) or {}
+            final = True
+            if model_config.get("memory") is not None:
+                footprint = parse_memory_size(model_config["memory"])
+            else:
+                metadata = self.model_index.lookup(model_config.get("path")) if self.model_index else None
+                if metadata is not None:
+                    n_context = model_config.get("n_context", DEFAULT_N_CONTEXT)
+                    footprint = metadata["file_size"] + estimate_kv_cache_bytes(metadata, n_context)
+                    if model_config.get("speculative"):
+                        footprint += estimate_logits_bytes(metadata, n_context)
+                else:
+                    final = self.model_index is None
+                    try:
+                        footprint = os.path.getsize(model_config.get("path", ""))
+                    except OSError:
+                        footprint = 0
+            footprint += parse_memory_size(model_config.get("prefix_cache"))
+            if not final:
+                return footprint
+            self.model_footprints[model_name] = footprint
+        return self.model_footprints[model_name]
+
+    def get_model_metadata(self, model_name: str) -> Dict:
+        """GGUF header metadata of ``model_name`` if it has been indexed, with its estimated memory."""
+        model_config = self.model_configs.get(model_name) or {}
+        metadata = self.model_index.lookup(model_config.get("path")) if self.model_index else None
+        info = dict(metadata or {})
+        info.pop("mtime_ns", None)
+        info["estimated_memory"] = self.estimate_model_memory(model_name)
+        return info
+
+    def get_used_memory(self) -> int:
+        """Estimated memory of resident, loading and not yet reclaimed models."""
+        # Reads a snapshot without the manager lock, which is held while making room.
+        names = [*(set(self.loaded_models) | set(self._loads)), *self._unloading]
+        return sum(self.estimate_model_memory(name) for name in names)
+
+    def fits_without_eviction(self, model_name: str) -> bool:
+        """
+        Whether ``model_name`` can serve a request without evicting another model: it is
+        resident or loading, or it fits the free memory budget.
+        """
+        # Lock-free like get_used_memory: the scheduler calls it from the event loop.
+        if model_name in self.loaded_models or model_name in self._loads:
+            return True
+        if self.memory_budget <= 0:
+            return not self.loaded_models and not self._loads
+        return self.get_used_memory() + self.estimate_model_memory(model_name) <= self.memory_budget
+
+    def is_pinned(self, model_name: str) -> bool:
+        return bool((self.model_configs.get(model_name) or {}).get("pinned", False))
+
+    def _make_room(self, model_name: str):
+        """
+        Evict least recently used, unpinned models until ``model_name`` fits the budget.
+
+        Evicted models are torn down in the background. Returns once the budget has room
+        for ``model_name`` next to the models still being torn down, or once they are gone.
+
+        Raises:
+            ModelAdmissionException: If the model cannot fit, or no room is made for it
+                within ``admission_timeout_secs``.
+        """
+        footprint = self.estimate_model_memory(model_name)
+        if self.memory_budget <= 0:
+            for name in list(self.loaded_models):
+                self._unload_model(name, wait=False)
+            # Without a budget, overlap the load with the teardown only if the memory is free right now.
+            if self._unloading and available_memory() >= footprint:
+                self.stats["overlapped_loads"] += 1
+            else:
+                self._memory_released.wait_for(lambda: not self._unloading)
+            self._admit(model_name, footprint)
+            return
+
+        if footprint > self.memory_budget:
+            self._refuse(model_name, f"it needs {footprint} bytes, more than the memory budget of {self.memory_budget}")
+
+        # A model being loaded already has its memory reserved.
+        required = 0 if model_name in self._loads else footprint
+
+        def fits(once_reclaimed: bool = False):
+            used = self.get_used_memory()
+            if once_reclaimed:
+                used -= sum(self.estimate_model_memory(name) for name in self._unloading)
+            return used + required <= self.memory_budget
+
+        # Unused prefetched models are the cheapest to give up, then models nobody is using,
+        # each group least recently used first.
+        candidates = sorted(
+            self.loaded_models,
+            key=lambda name: (name not in self.prefetched_models, self.get_lease_count(name) > 0),
+        )
+        for name in candidates:
+            if fits(once_reclaimed=True):
+                break
+            if not self.is_pinned(name):
+                self._unload_model(name, wait=False)
+
+        if self._unloading:
+            if fits():
+                self.stats["overlapped_loads"] += 1
+            else:
+                logger.info(f"Waiting for evicted models to release memory before loading {model_name}")
+                self._memory_released.wait_for(lambda: fits() or not self._unloading)
+
+        if not fits():
+            # What is left is pinned or still loading; wait for it to be unloaded.
+            self._record_admission(model_name, "queued")
+            logger.info(f"Loading {model_name} waits for pinned or loading models to release the memory budget")
+            if not self._memory_released.wait_for(fits, timeout=self.admission_timeout_secs):
+                self._refuse(model_name, f"it does not fit next to the pinned models in {self.memory_budget} bytes")
+        self._admit(model_name, footprint)
+
+    def _admit(self, model_name: str, footprint: int):
+        """
+        Wait, with ``check_available_memory``, until the system can provide ``footprint``
+        bytes and still keep ``min_available_memory`` free.
+        """
+        if self.check_available_memory and footprint:
+            required = footprint + self.min_available_memory
+            deadline = time.monotonic() + self.admission_timeout_secs
+            queued = False
+            while True:
+                # Models still being torn down give their memory back before the new one fills up.
+                pending = sum(self.estimate_model_memory(name) for name in self._unloading)
+                available = available_memory()
+                if available + pending >= required:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._refuse(
+                        model_name,
+                        f"it needs {footprint} bytes plus {self.min_available_memory} kept free "
+                        f"and only {available} are available",
+                    )
+                if not queued:
+                    queued = True
+                    self._record_admission(model_name, "queued")
+                    logger.info(f"Loading {model_name} waits for {required - available} more bytes to become available")
+                self._memory_released.wait(min(remaining, ADMISSION_POLL_SECS))
+        self._record_admission(model_name, "admitted")
+
+    def _refuse(self, model_name: str, reason: str):
+        self.stats["admission_refusals"] += 1
+        self._record_admission(model_name, "refused")
+        logger.warning(f"Refusing to load {model_name}: {reason}")
+        raise ModelAdmissionException(f"Not enough memory to load {model_name}: {reason}")
+
+    def _record_admission(self, model_name: str, decision: str):
+        if decision == "queued":
+            self.stats["admission_waits"] += 1
+        if self.metrics is not None:
+            self.metrics.record_admission(model_name, decision)
+
+    def _unload_model(self, model_name: str, wait: bool = True):
+        """Remove ``model_name`` from the pool and tear it down, in the background unless ``wait``."""
+        detached = self._detach_model(model_name)
+        if detached is None:
+            return
+        wrapper, leases = detached
+        if wait:
+            self._teardown_model(model_name, wrapper, leases)
+        else:
+            threading.Thread(target=self._teardown_model, args=(model_name, wrapper, leases), daemon=True).start()
+
+    def _detach_model(self, model_name: str) -> Optional[tuple[BaseModelWrapper, LeaseCounter]]:
+        """Remove ``model_name`` from the pool and mark it unloading; returns its wrapper and leases."""
+        with self._lock:
+            wrapper = self.loaded_models.pop(model_name, None)
+            if wrapper is None:
+                return None
+            leases = self.model_leases.pop(model_name)
+            if model_name in self.prefetched_models:
+                self.prefetched_models.discard(model_name)
+                self.stats["prefetch_misses"] += 1
+            self.model_last_use.pop(model_name, None)
+            if self.current_model_name == model_name:
+                self.current_model_name = next(reversed(self.loaded_models), None)
+            self.stats["evictions"] += 1
+            self._unloading.append(model_name)
+        return wrapper, leases
+
+    def _teardown_model(self, model_name: str, wrapper: BaseModelWrapper, leases: LeaseCounter):
+        reclaimed = 0
+        try:
+            if leases.count:
+                logger.info(f"Waiting for {leases.count} in-flight request(s) on {model_name} before unloading")
+                leases.wait_until_idle()
+            logger.info(f"Unloading model {model_name}")
+            rss_before = process_rss()
+            wrapper.cleanup()
             gc.collect()
-            time.sleep(1)
+            reclaimed = wait_for_reclaim(rss_before, self.estimate_model_memory(model_name))
+            logger.info(f"Unloaded {model_name}, reclaimed {reclaimed} bytes")
+            if self.metrics is not None:
+                self.metrics.record_unload(model_name)
+            self._prewarm(model_name, "evicted")
+        finally:
+            with self._lock:
+                self._unloading.remove(model_name)
+                self.stats["reclaimed_bytes"] += reclaimed
+                self._memory_released.notify_all()
+
+    def unload_idle_model(self) -> Optional[str]:
+        """
+        Unload the resident model that is cheapest to give up, to relieve memory pressure.
+
+        Unused prefetched models go first, then the least recently used; pinned models
+        and models serving a request are kept. Returns the unloaded model's name, or None.
+        """
+        with self._lock:
+            candidates = sorted(self.loaded_models, key=lambda name: name not in self.prefetched_models)
+            for name in candidates:
+                if not self.is_pinned(name) and not self.get_lease_count(name):
+                    self._unload_model(name, wait=False)
+                    return name
+        return None
+
+    def shrink_caches(self) -> int:
+        """Drop the caches of the resident models; returns the bytes freed."""
+        with self._lock:
+            wrappers = list(self.loaded_models.values())
+        return sum(wrapper.shrink_caches() for wrapper in wrappers)
+
+    def _unload_current_model(self):
+        model_name = self.current_model_name
+        if model_name:
+            self._unload_model(model_name, wait=False)
+
+    def _unload_all_models(self):
+        # Detach every model at once, then wait for their requests without holding the lock.
+        with self._lock:
+            detached = {name: self._detach_model(name) for name in list(self.loaded_models)}
+        for name, (wrapper, leases) in detached.items():
+            self._teardown_model(name, wrapper, leases)
+
+    def _unload_idle_models(self):
+        """Unload unpinned models that have been idle for the full unload delay."""
+        with self._lock:
+            self.unload_timer = None
+            now = time.time()
+            idle = [
+                name for name in self.loaded_models
+                if now - self.model_last_use.get(name, 0) >= self.model_unload_delay_secs
+                and not self.is_pinned(name) and not self.get_lease_count(name)
+            ]
+        # Teardowns run in the background so that loads are not held up waiting for the lock.
+        for name in idle:
+            self._unload_model(name, wait=False)
+        # Leased models are retried later; with no delay they go once their request calls update_last_use_time.
+        with self._lock:
+            if self.model_unload_delay_secs > 0 and any(not self.is_pinned(name) for name in self.loaded_models):
+                self.schedule_unload()
 
     def schedule_unload(self):
         if self.mode == "dynamic":
@@ -57,50 +539,176 @@ class ModelManager:
                 self.unload_timer.cancel()
 
             if self.model_unload_delay_secs > 0:
-                self.unload_timer = threading.Timer(self.model_unload_delay_secs, self._unload_current_model)
+                self.unload_timer = threading.Timer(self.model_unload_delay_secs, self._unload_idle_models)
+                self.unload_timer.daemon = True
                 self.unload_timer.start()
             else:
-                self._unload_current_model()
+                self._unload_idle_models()
 
     def _cancel_unload_timer(self):
         if self.unload_timer:
             self.unload_timer.cancel()
             self.unload_timer = None
 
-    def update_last_use_time(self):
+    def update_last_use_time(self, model_name: str = None):
         self.last_use_time = time.time()
+        model_name = model_name or self.current_model_name
+        if model_name in self.loaded_models:
+            self.model_last_use[model_name] = self.last_use_time
         self.schedule_unload()
 
     def get_current_model(self) -> BaseModelWrapper:
-        return self.loaded_model
+        return self.loaded_models.get(self.current_model_name)
 
     def get_current_model_name(self) -> str:
-        return self.loaded_model.model_name if self.loaded_model else None
+        return self.current_model_name
+
+    def get_loaded_model_names(self) -> list[str]:
+        """Names of resident models, least recently used first."""
+        return list(self.loaded_models)
 
     def is_model_loaded(self, model_name: str) -> bool:
-        return self.loaded_model and self.loaded_model.model_name == model_name
+        return model_name in self.loaded_models
 
-    def switch_model(self, model_name: str) -> None:
+    def get_lease_count(self, model_name: str) -> int:
+        leases = self.model_leases.get(model_name)
+        return leases.count if leases else 0
+
+    def acquire_model(self, model_name: str) -> ModelLease:
+        """Load ``model_name`` if needed and return a lease that keeps it from being unloaded."""
         if model_name not in self.model_configs:
             logger.error(f"Model '{model_name}' not found in configurations")
             raise ModelNotFoundException(f"Model '{model_name}' not found")
 
-        success, _ = self.load_model(model_name)
-        if not success:
-            logger.error(f"Failed to switch to model: {model_name}")
-            raise ModelLoadException(f"Failed to load model: {model_name}")
+        while True:
+            success, wrapper = self.load_model(model_name)
+            if not success:
+                logger.error(f"Failed to switch to model: {model_name}")
+                raise ModelLoadException(f"Failed to load model: {model_name}")
+            with self._lock:
+                # The model may have been evicted between loading and leasing it.
+                if self.loaded_models.get(model_name) is wrapper:
+                    lease = ModelLease(model_name, wrapper, self.model_leases[model_name])
+                    break
 
         logger.info(f"Successfully switched to model: {model_name}")
+        self._prefetch_next(model_name)
+        return lease
+
+    def switch_model(self, model_name: str, wait: bool = True) -> Dict:
+        """
+        Make ``model_name`` the current model.
+
+        With ``wait=False`` the load is only started; the returned state tells whether the
+        model is already ready.
+        """
+        if wait:
+            self.acquire_model(model_name).release()
+        else:
+            self.start_load(model_name)
+        return self.get_model_state(model_name)
+
+    def _prefetch_next(self, model_name: str):
+        """Record the switch and start loading the predicted next model if it fits the free budget."""
+        if self.transition_tracker is None or self.mode == "off":
+            return
+        self.transition_tracker.record(model_name)
+        predicted = self.transition_tracker.predict(model_name)
+        if predicted is None or predicted not in self.model_configs or self.memory_budget <= 0:
+            return
+
+        with self._lock:
+            if predicted in self.loaded_models or predicted in self._loads:
+                return
+            if self.get_used_memory() + self.estimate_model_memory(predicted) > self.memory_budget:
+                logger.debug(f"Skipping prefetch of {predicted}: not enough free memory budget")
+                self._prewarm(predicted, "predicted")
+                return
+            self.start_load(predicted, prefetch=True)
+
+    def _prewarm(self, model_name: str, reason: str):
+        """Queue the file of ``model_name`` for the page cache warmer, if there is one."""
+        model_config = self.model_configs.get(model_name)
+        if self.page_cache_warmer is not None and model_config is not None:
+            self.page_cache_warmer.warm(model_name, model_config.get("path"), reason)
+
+    def _prewarm_hot_models(self, model_configs: Dict):
+        for model_name, model_config in model_configs.items():
+            if model_config.get("prewarm"):
+                self._prewarm(model_name, "hot")
+
+    def get_page_cache_info(self) -> Dict[str, Dict]:
+        """How much of each model file is in the page cache, and the warmer's progress on it."""
+        if self.page_cache_warmer is None:
+            return {}
+        model_paths = {name: config.get("path") for name, config in list(self.model_configs.items())}
+        return self.page_cache_warmer.get_stats(model_paths)
 
     def get_model_configs(self):
         return self.model_configs
 
+    def apply_configs(self, model_configs: Dict) -> Dict[str, list]:
+        """
+        Switch to reloaded model configs, touching as few resident models as possible.
+
+        Removed models are unloaded. Resident models whose load settings (see
+        ``WrapperFactory.LOAD_KEYS``) changed are unloaded and loaded again in the
+        background, overlapping like any other switch. Other changes, such as sampling
+        defaults or prompt templates, are applied to the resident wrapper in place.
+        Requests already running keep the wrapper they leased.
+
+        Returns:
+            Dict[str, list]: Model names by outcome: added, removed, reloaded, updated
+            and unchanged.
+        """
+        for model_name, model_config in model_configs.items():
+            self.wrapper_factory.validate_config(model_name, model_config)
+
+        changes = {"added": [], "removed": [], "reloaded": [], "updated": [], "unchanged": []}
+        with self._lock:
+            old_configs = self.model_configs
+            changes["removed"] = [name for name in old_configs if name not in model_configs]
+            for model_name, model_config in model_configs.items():
+                old_config = old_configs.get(model_name)
+                if old_config is None:
+                    changes["added"].append(model_name)
+                elif old_config == model_config:
+                    changes["unchanged"].append(model_name)
+                elif self.wrapper_factory.needs_reload(old_config, model_config):
+                    changes["reloaded"].append(model_name)
+                else:
+                    changes["updated"].append(model_name)
+
+            self.model_configs = model_configs
+            for model_name in changes["removed"] + changes["reloaded"] + changes["updated"]:
+                self.model_footprints.pop(model_name, None)
+                self._load_errors.pop(model_name, None)
+            for model_name in changes["updated"]:
+                wrapper = self.loaded_models.get(model_name)
+                if wrapper is not None:
+                    self.wrapper_factory.update_wrapper(wrapper, model_configs[model_name])
+            for model_name in changes["removed"]:
+                self._unload_model(model_name, wait=False)
+            for model_name in changes["reloaded"]:
+                if model_name in self.loaded_models:
+                    self._unload_model(model_name, wait=False)
+                    if self.mode != "off":
+                        self.start_load(model_name)
+            self._prewarm_hot_models(
+                {name: model_configs[name] for name in changes["added"] + changes["reloaded"] + changes["updated"]}
+            )
+
+        summary = ", ".join(f"{outcome} {names}" for outcome, names in changes.items() if names and outcome != "unchanged")
+        logger.info(f"Applied model configs: {summary or 'no changes'}")
+        return changes
+
     def set_mode(self, mode: str, timeout: int = 0):
         self.mode = mode
         if mode == "dynamic":
             self.model_unload_delay_secs = timeout
         elif mode == "off":
-            self._unload_current_model()
+            self._cancel_unload_timer()
+            self._unload_all_models()
         logger.info(f"ModelManager mode set to {mode} with timeout {timeout} seconds.")
 
     def get_settings(self):
@@ -109,6 +717,22 @@ class ModelManager:
             "timeout": self.model_unload_delay_secs if self.mode == "dynamic" else None
         }
 
+    def get_pool_info(self):
+        # Like get_model_state, a lock-free snapshot: each collection is copied before it is read.
+        return {
+            "loaded_models": self.get_loaded_model_names(),
+            "memory_budget": self.memory_budget,
+            "memory_used": self.get_used_memory(),
+            "memory_rss": process_rss(),
+            "memory_cgroup": cgroup_memory_usage(),
+            "unloading_models": list(self._unloading),
+            "prefetched_models": sorted(self.prefetched_models),
+            "model_states": self.get_model_states(),
+            "active_leases": {name: self.get_lease_count(name) for name in list(self.model_leases)},
+            "caches": {name: wrapper.get_cache_stats() for name, wrapper in list(self.loaded_models.items())},
+            **self.stats,
+        }
+
     def get_unload_time_remaining(self):
         if self.unload_timer:
             return self.unload_timer.interval - (time.time() - self.last_use_time)
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+import ctypes
+import ctypes.util
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+
+import psutil
+
+from utils.constants import DEFAULT_PREWARM_CHUNK_BYTES
+from utils.memory_probe import available_memory
+
+logger = logging.getLogger(__name__)
+
+_MAP_FAILED = ctypes.c_void_p(-1).value
+
+
+@lru_cache(maxsize=None)
+def _libc():
+    """libc with ``mmap``, ``mincore`` and ``munmap``, or None where they are unavailable."""
+    if not hasattr(mmap, "MAP_SHARED"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte)]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def page_residency(fd: int, size: int) -> Optional[bytearray]:
+    """
+    One byte per page of the first ``size`` bytes of ``fd``, non-zero if the page is
+    in the page cache. Returns None where ``mincore`` is unavailable.
+    """
+    libc = _libc()
+    if libc is None:
+        return None
+    if size == 0:
+        return bytearray()
+    # Mapping the file only reserves address space; mincore does not fault pages in.
+    address = libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+    if address in (None, _MAP_FAILED):
+        return None
+    try:
+        vector = (ctypes.c_ubyte * ((size + mmap.PAGESIZE - 1) // mmap.PAGESIZE))()
+        if libc.mincore(address, size, vector) != 0:
+            return None
+        return bytearray(vector)
+    finally:
+        libc.munmap(address, size)
+
+
+def resident_bytes(path: str) -> Optional[int]:
+    """Bytes of the file at ``path`` held in the page cache, or None if that cannot be measured."""
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            residency = page_residency(file.fileno(), size)
+    except OSError:
+        return None
+    if residency is None:
+        return None
+    return min(size, (len(residency) - residency.count(0)) * mmap.PAGESIZE)
+
+
+def _lower_thread_priority():
+    """Give the calling thread the lowest CPU and, on Linux, idle IO priority."""
+    if not sys.platform.startswith("linux"):
+        return
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+        psutil.Process(tid).ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (OSError, psutil.Error) as e:
+        logger.debug(f"Could not lower the page cache warmer's priority: {e}")
+
+
+class PageCacheWarmer:
+    """
+    Reads model files into the OS page cache ahead of a load.
+
+    Most of a cold load is reading the weights from disk; with the file already cached
+    the load only copies memory. Files are read one at a time, in ``chunk_bytes``
+    chunks, by a background thread with idle IO priority and at most
+    ``max_bytes_per_sec``, so generations on the current model keep the disk and CPU.
+    Chunks already in the page cache are skipped, and a file is left alone when it
+    would not fit in the available memory, where it would only push out other pages.
+    """
+
+    def __init__(self, max_bytes_per_sec: int, chunk_bytes: int = DEFAULT_PREWARM_CHUNK_BYTES, metrics=None):
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self.chunk_bytes = chunk_bytes
+        self.metrics = metrics
+        self.files: Dict[str, Dict] = {}
+        self._queue: "OrderedDict[str, str]" = OrderedDict()
+        self._queued = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, model_name: str, path: str, reason: str) -> bool:
+        """Queue the file of ``model_name`` for warming; returns whether it was queued."""
+        if not path or not os.path.isfile(path):
+            return False
+        with self._queued:
+            entry = self.files.get(model_name)
+            if model_name in self._queue or (entry and entry["state"] == "warming"):
+                return False
+            self.files[model_name] = {"path": path, "reason": reason, "state": "queued", "read_bytes": 0}
+            self._queue[model_name] = path
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="page-cache-warmer", daemon=True)
+                self._thread.start()
+            self._queued.notify()
+        logger.debug(f"Queued {path} for page cache warming ({reason})")
+        return True
+
+    def stop(self):
+        with self._queued:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.notify()
+
+    def _run(self):
+        _lower_thread_priority()
+        while True:
+            with self._queued:
+                self._queued.wait_for(lambda: self._queue or self._stopped)
+                if self._stopped:
+                    return
+                model_name, path = self._queue.popitem(last=False)
+            try:
+                self.warm_file(model_name, path)
+            except OSError as e:
+                self.files[model_name]["state"] = "failed"
+                logger.warning(f"Failed to warm the page cache with {path}: {e}")
+
+    def warm_file(self, model_name: str, path: str) -> int:
+        """Read the uncached parts of ``path`` into the page cache; returns the bytes read."""
+        entry = self.files.setdefault(model_name, {"path": path, "reason": "manual", "read_bytes": 0})
+        size = os.path.getsize(path)
+        if available_memory() < size:
+            entry["state"] = "skipped"
+            logger.info(f"Not warming the page cache with {path}: it is larger than the available memory")
+            return 0
+
+        entry["state"] = "warming"
+        read_bytes = 0
+        started = time.monotonic()
+        with open(path, "rb", buffering=0) as file:
+            fd = file.fileno()
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            residency = page_residency(fd, size)
+            pages_per_chunk = max(1, self.chunk_bytes // mmap.PAGESIZE)
+            buffer = bytearray(pages_per_chunk * mmap.PAGESIZE)
+            for offset in range(0, size, len(buffer)):
+                if self._stopped:
+                    break
+                if residency is not None:
+                    first_page = offset // mmap.PAGESIZE
+                    if residency[first_page:first_page + pages_per_chunk].count(0) == 0:
+                        continue
+                file.seek(offset)
+                read_bytes += file.readinto(buffer)
+                entry["read_bytes"] = read_bytes
+                if self.max_bytes_per_sec > 0:
+                    # Sleep off any lead over the bandwidth cap.
+                    ahead = read_bytes / self.max_bytes_per_sec - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+        entry["state"] = "warm"
+        if self.metrics is not None:
+            self.metrics.record_prewarm(model_name, read_bytes)
+        logger.info(
+            f"Warmed the page cache with {path} for {model_name}: read {read_bytes} of {size} bytes "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return read_bytes
+
+    def get_stats(self, model_paths: Dict[str, str]) -> Dict[str, Dict]:
+        """How much of each model's file is in the page cache right now, and its warming state."""
+        stats = {}
+        for model_name, path in model_paths.items():
+            try:
+                size = os.path.getsize(path)
+            except (OSError, TypeError):
+                continue
+            resident = resident_bytes(path)
+            entry = self.files.get(model_name)
+            stats[model_name] = {
+                "size_bytes": size,
+                "resident_bytes": resident,
+                "resident_fraction": resident / size if resident is not None and size else None,
+                "prewarm": {key: entry[key] for key in ("reason", "state", "read_bytes")} if entry else None,
+            }
+        return stats
@@ -0,0 +1,41 @@
+from collections import defaultdict
+from typing import Dict, Optional
+import threading
+
+
+class TransitionTracker:
+    """
+    Learns which model tends to be requested after another.
+
+    Every switch from one model to a different one is counted. ``predict`` returns the
+    most frequent successor of a model once it has been observed often enough and
+    accounts for a large enough share of the switches away from that model.
+    """
+
+    def __init__(self, min_observations: int = 3, min_probability: float = 0.5):
+        self.min_observations = min_observations
+        self.min_probability = min_probability
+        self.transitions: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.last_model: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str):
+        with self._lock:
+            if self.last_model is not None and self.last_model != model_name:
+                self.transitions[self.last_model][model_name] += 1
+            self.last_model = model_name
+
+    def predict(self, model_name: str) -> Optional[str]:
+        with self._lock:
+            successors = self.transitions.get(model_name)
+            if not successors:
+                return None
+            total = sum(successors.values())
+            next_model, count = max(successors.items(), key=lambda item: item[1])
+        if count < self.min_observations or count / total < self.min_probability:
+            return None
+        return next_model
+
+    def get_transitions(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {source: dict(targets) for source, targets in self.transitions.items()}
@@ -0,0 +1,126 @@
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from llama_cpp import Llama, LlamaRAMCache, LlamaState
+from .state_spill import StateSpillStore
+
+
+class PrefixStateCache(LlamaRAMCache):
+    """
+    llama.cpp state cache keyed by token prefix, with hit-rate accounting.
+
+    ``Llama`` looks up the prompt tokens before evaluation and restores the cached
+    state sharing the longest prefix, so only the new suffix is evaluated. States are
+    evicted least recently used first once ``capacity_bytes`` is exceeded. Matches
+    shorter than ``min_prefix_tokens`` are ignored: restoring a state that only shares
+    the BOS token costs more than it saves.
+
+    ``Llama`` only restores a state that shares more of the prompt than the tokens it
+    has evaluated already, ``evaluated_tokens``; otherwise it reuses its own KV cache.
+    Such lookups are misses, so hits and ``tokens_saved`` count only restored states.
+
+    A state holds the model's KV cache for its tokens. With speculative decoding the
+    model keeps logits for every position, and each state also holds n_tokens x n_vocab
+    float32 scores: 128 KiB per token for a 32k vocabulary, so a 4k-token prompt adds
+    500 MiB to the state, in RAM and in the spill store alike.
+
+    With a ``spill_store`` the keys of states spilled to disk by an earlier instance
+    of the model are matched as well; such a state is only read from disk, and
+    promoted back into RAM, when it is the best match for a prompt.
+
+    ``on_lookup``, when set, is called with the result and tokens saved of every
+    lookup, so hits can be published as they happen.
+    """
+
+    def __init__(
+        self,
+        capacity_bytes: int,
+        min_prefix_tokens: int = 16,
+        spill_store: StateSpillStore = None,
+        evaluated_tokens: Callable[[], Sequence[int]] = None,
+        on_lookup: Callable[[bool, int], None] = None,
+    ):
+        super().__init__(capacity_bytes=capacity_bytes)
+        self.min_prefix_tokens = min_prefix_tokens
+        self.spill_store = spill_store
+        self.evaluated_tokens = evaluated_tokens
+        self.on_lookup = on_lookup
+        self.lookups = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.tokens_saved = 0
+
+    def _longest_prefix(self, key: Tuple[int, ...]) -> Tuple[Optional[Tuple[int, ...]], int]:
+        candidates = list(self.cache_state.keys())
+        if self.spill_store is not None:
+            candidates.extend(k for k in self.spill_store.keys() if k not in self.cache_state)
+        best_key, best_len = None, 0
+        for cached_key in candidates:
+            prefix_len = Llama.longest_token_prefix(cached_key, key)
+            if prefix_len > best_len:
+                best_key, best_len = cached_key, prefix_len
+        if best_len < self.min_prefix_tokens:
+            return None, 0
+        return best_key, best_len
+
+    def _find_longest_prefix_key(self, key: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+        return self._longest_prefix(key)[0]
+
+    def __getitem__(self, key: Sequence[int]) -> LlamaState:
+        self.lookups += 1
+        try:
+            state, tokens_saved = self._restore(tuple(key))
+        except KeyError:
+            if self.on_lookup is not None:
+                self.on_lookup(False, 0)
+            raise
+        self.hits += 1
+        self.tokens_saved += tokens_saved
+        if self.on_lookup is not None:
+            self.on_lookup(True, tokens_saved)
+        return state
+
+    def _restore(self, key: Tuple[int, ...]) -> Tuple[LlamaState, int]:
+        cached_key, prefix_len = self._longest_prefix(key)
+        if cached_key is None:
+            raise KeyError("Key not found")
+        evaluated_len = Llama.longest_token_prefix(self.evaluated_tokens(), key) if self.evaluated_tokens else 0
+        if prefix_len <= evaluated_len:
+            # Llama would not load the state; nor is a spilled one read from disk for it.
+            raise KeyError("The model has evaluated a longer prefix already")
+        if cached_key not in self.cache_state:
+            state = self.spill_store.load(cached_key)
+            if state is None:
+                raise KeyError("Key not found")
+            self[cached_key] = state
+            if cached_key not in self.cache_state:
+                raise KeyError("Spilled state exceeds the cache capacity")
+            self.disk_hits += 1
+        self.cache_state.move_to_end(cached_key)
+        return self.cache_state[cached_key], prefix_len - evaluated_len
+
+    def spill(self, max_states: int):
+        """Write the ``max_states`` most recently used states to the spill store."""
+        if self.spill_store is None:
+            return
+        for key in list(reversed(self.cache_state))[:max_states]:
+            self.spill_store.save(key, self.cache_state[key])
+
+    def clear(self) -> int:
+        """Drop every state held in RAM; returns the bytes freed."""
+        freed = self.cache_size
+        self.cache_state.clear()
+        return freed
+
+    def get_stats(self) -> Dict:
+        stats = {
+            "entries": len(self.cache_state),
+            "size_bytes": self.cache_size,
+            "capacity_bytes": self.capacity_bytes,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+        }
+        if self.spill_store is not None:
+            stats["disk_hits"] = self.disk_hits
+            stats["spill_store"] = self.spill_store.get_stats()
+        return stats
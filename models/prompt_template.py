@@ -0,0 +1,71 @@
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+
+class CompiledTemplate:
+    """
+    A ``str.format`` template parsed once into literal text and field names.
+
+    ``render`` joins the pieces instead of re-parsing the template on every call.
+    Templates using conversions, format specs or attribute/index access fall back to
+    ``str.format`` so the output is always identical.
+    """
+
+    __slots__ = ("template", "_parts")
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts: Optional[List[Tuple[str, bool]]] = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            if literal:
+                self._parts.append((literal, False))
+            if field is None:
+                continue
+            if format_spec or conversion or not field.isidentifier():
+                self._parts = None
+                break
+            self._parts.append((field, True))
+
+    def render(self, **values) -> str:
+        if self._parts is None:
+            return self.template.format(**values)
+        return "".join(str(values[text]) if is_field else text for text, is_field in self._parts)
+
+
+class FragmentCache:
+    """
+    Memo of formatted message fragments keyed by (role, content).
+
+    Lookups hash the content (Python caches a string's hash) and compare it on a hit,
+    so repeated turns of a conversation reuse fragments formatted on earlier turns.
+    Once ``max_entries`` is reached the oldest entries are dropped first.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], str] = {}
+
+    def get(self, role: str, content: str) -> Optional[str]:
+        fragment = self._entries.get((role, content))
+        if fragment is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fragment
+
+    def put(self, role: str, content: str, fragment: str):
+        if len(self._entries) >= self.max_entries:
+            try:
+                del self._entries[next(iter(self._entries))]
+            except (KeyError, RuntimeError, StopIteration):
+                # Another thread evicted concurrently; the memo is best-effort.
+                pass
+        self._entries[(role, content)] = fragment
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
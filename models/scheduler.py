@@ -0,0 +1,151 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List
+import asyncio
+import logging
+import time
+
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class _Ticket:
+    __slots__ = ("model_name", "arrival", "free")
+
+    def __init__(self, model_name: str, arrival: float):
+        self.model_name = model_name
+        self.arrival = arrival
+        # Admitted without a switch, because its model could serve it without evicting another.
+        self.free = False
+
+
+class RequestScheduler:
+    """
+    Orders queued requests so that model switches happen as rarely as possible.
+
+    Requests for the active model are admitted while earlier requests for other models
+    wait, so interleaved traffic (A, B, A, B) is served as (A, A, B, B). The active model
+    is only given up once its in-flight requests have drained. To bound starvation,
+    new requests for the active model are held back as soon as it has served
+    ``max_batch`` requests in a row or another model's oldest request has waited
+    ``max_wait_secs``.
+
+    Only switches that load a model over others need ordering. With
+    ``fits_without_eviction``, requests for a model that can serve them without evicting
+    another, because it is resident or fits the free memory, are admitted right away
+    and alongside any other model. They are held back only once a request that needs a
+    switch has waited ``max_wait_secs``, so that the in-flight requests can drain.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 16,
+        max_wait_secs: float = 30.0,
+        metrics=None,
+        fits_without_eviction: Callable[[str], bool] = None,
+    ):
+        self.max_batch = max_batch
+        self.max_wait_secs = max_wait_secs
+        self.fits_without_eviction = fits_without_eviction
+        self.active_model: str = None
+        self.in_flight = 0
+        self.batch_served = 0
+        self.waiting: List[_Ticket] = []
+        self.switches = 0
+        self.switches_avoided = 0
+        self.metrics = metrics
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self, model_name: str):
+        """Hold a scheduling slot for ``model_name`` for the duration of the block."""
+        await self.acquire(model_name)
+        try:
+            yield
+        finally:
+            await self.release()
+
+    async def acquire(self, model_name: str):
+        ticket = _Ticket(model_name, time.monotonic())
+        with span("schedule", model=model_name):
+            async with self._condition:
+                self.waiting.append(ticket)
+                if self.metrics is not None:
+                    self.metrics.queue_depth.labels(model_name).inc()
+                try:
+                    await self._condition.wait_for(lambda: self._can_run(ticket))
+                finally:
+                    self.waiting.remove(ticket)
+                    if self.metrics is not None:
+                        self.metrics.queue_depth.labels(model_name).dec()
+                    self._condition.notify_all()
+
+                if not ticket.free:
+                    self._track_switch(ticket)
+                self.in_flight += 1
+
+    def _track_switch(self, ticket: _Ticket):
+        model_name = ticket.model_name
+        if model_name != self.active_model:
+            logger.debug(f"Scheduler switching from {self.active_model} to {model_name}")
+            self.active_model = model_name
+            self.batch_served = 0
+            self.switches += 1
+            if self.metrics is not None:
+                self.metrics.record_switch(model_name)
+        elif any(t.arrival < ticket.arrival for t in self.waiting if t.model_name != model_name):
+            self.switches_avoided += 1
+        self.batch_served += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _is_starving_others(self) -> bool:
+        oldest_other = next((t for t in self.waiting if t.model_name != self.active_model), None)
+        if oldest_other is None:
+            return False
+        return (
+            self.batch_served >= self.max_batch
+            or time.monotonic() - oldest_other.arrival >= self.max_wait_secs
+        )
+
+    def _fits(self, model_name: str) -> bool:
+        return self.fits_without_eviction is not None and self.fits_without_eviction(model_name)
+
+    def _switch_overdue(self) -> bool:
+        """Whether a request that needs a switch has waited ``max_wait_secs``."""
+        now = time.monotonic()
+        return any(
+            now - t.arrival >= self.max_wait_secs for t in self.waiting if not self._fits(t.model_name)
+        )
+
+    def _can_run(self, ticket: _Ticket) -> bool:
+        if self._fits(ticket.model_name):
+            ticket.free = not self._switch_overdue()
+            return ticket.free
+        ticket.free = False
+        if ticket.model_name == self.active_model:
+            return not self._is_starving_others()
+        if self.in_flight > 0:
+            return False
+        active_pending = any(t.model_name == self.active_model for t in self.waiting)
+        if active_pending and not self._is_starving_others():
+            return False
+        # Hand over to the model whose request has been waiting the longest.
+        next_ticket = next(t for t in self.waiting if t.model_name != self.active_model)
+        return ticket.model_name == next_ticket.model_name
+
+    def get_queue_depths(self) -> Dict[str, int]:
+        return dict(Counter(t.model_name for t in self.waiting))
+
+    def get_stats(self):
+        return {
+            "active_model": self.active_model,
+            "in_flight": self.in_flight,
+            "queue_depth": self.get_queue_depths(),
+            "switches": self.switches,
+            "switches_avoided": self.switches_avoided,
+        }
@@ -0,0 +1,113 @@
+from typing import Any, Dict
+import numpy as np
+import llama_cpp
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+from utils.constants import DEFAULT_SPECULATIVE_DRAFT_TOKENS, DEFAULT_PROMPT_LOOKUP_MAX_NGRAM
+
+SPECULATIVE_METHODS = ("prompt_lookup", "draft_model")
+
+
+class DraftModelDecoding(LlamaDraftModel):
+    """
+    Drafts tokens greedily with a small model that shares the target model's vocabulary.
+
+    The draft model keeps its own KV cache; only the part of the input that differs
+    from what it evaluated for the previous draft is evaluated again.
+    """
+
+    def __init__(
+        self, model_path: str, n_context: int, n_gpu_layers: int = 0, num_pred_tokens: int = DEFAULT_SPECULATIVE_DRAFT_TOKENS
+    ):
+        self.model = Llama(model_path=model_path, n_ctx=n_context, n_gpu_layers=n_gpu_layers, verbose=False)
+        self.num_pred_tokens = num_pred_tokens
+
+    def _next_token(self) -> int:
+        logits = llama_cpp.llama_get_logits_ith(self.model.ctx, -1)
+        return int(np.argmax(np.ctypeslib.as_array(logits, shape=(self.model.n_vocab(),))))
+
+    def __call__(self, input_ids: np.ndarray, /, **kwargs: Any) -> np.ndarray:
+        tokens = input_ids.tolist()
+        if len(tokens) + self.num_pred_tokens > self.model.n_ctx():
+            return np.array([], dtype=np.intc)
+        # At least the last token is evaluated again, for its logits.
+        reused = Llama.longest_token_prefix(self.model.input_ids[: self.model.n_tokens].tolist(), tokens)
+        self.model.n_tokens = min(reused, len(tokens) - 1)
+        self.model.eval(tokens[self.model.n_tokens:])
+
+        draft = []
+        eos = self.model.token_eos()
+        for _ in range(self.num_pred_tokens):
+            token = self._next_token()
+            if token == eos:
+                break
+            draft.append(token)
+            self.model.eval([token])
+        return np.array(draft, dtype=np.intc)
+
+
+class CountingDraftModel(LlamaDraftModel):
+    """
+    Passes through the drafts of ``draft_model`` and counts how many of them were accepted.
+
+    ``Llama`` asks for a draft after each verification step with the input so far, so a
+    draft's accepted length is the prefix it shares with the tokens that follow it in
+    the next call's input. The draft of a generation's last step is never verified and
+    is not counted. ``reset`` starts the counts for a new generation.
+    """
+
+    def __init__(self, draft_model: LlamaDraftModel, method: str):
+        self.draft_model = draft_model
+        self.method = method
+        self.reset()
+
+    def reset(self):
+        self.drafted_tokens = 0
+        self.accepted_tokens = 0
+        self._pending = None
+        self._pending_at = 0
+
+    def __call__(self, input_ids: np.ndarray, /, **kwargs: Any) -> np.ndarray:
+        if self._pending is not None:
+            following = input_ids[self._pending_at:self._pending_at + len(self._pending)]
+            self.drafted_tokens += len(self._pending)
+            self.accepted_tokens += Llama.longest_token_prefix(self._pending.tolist(), following.tolist())
+        draft = self.draft_model(input_ids, **kwargs)
+        self._pending, self._pending_at = draft, len(input_ids)
+        return draft
+
+    def get_stats(self) -> Dict:
+        return {
+            "method": self.method,
+            "drafted_tokens": self.drafted_tokens,
+            "accepted_tokens": self.accepted_tokens,
+            "acceptance_rate": self.accepted_tokens / self.drafted_tokens if self.drafted_tokens else 0.0,
+        }
+
+
+def build_draft_model(config: Dict, n_context: int) -> CountingDraftModel:
+    """
+    Create the draft model described by a model's ``speculative`` config section.
+
+    Raises:
+        ValueError: If the method is unknown or a draft model has no path.
+    """
+    method = config.get("method", "prompt_lookup")
+    num_pred_tokens = config.get("num_pred_tokens", DEFAULT_SPECULATIVE_DRAFT_TOKENS)
+    if method == "prompt_lookup":
+        draft_model = LlamaPromptLookupDecoding(
+            max_ngram_size=config.get("max_ngram_size", DEFAULT_PROMPT_LOOKUP_MAX_NGRAM),
+            num_pred_tokens=num_pred_tokens,
+        )
+    elif method == "draft_model":
+        if not config.get("path"):
+            raise ValueError("Speculative decoding with a draft model needs its 'path'")
+        draft_model = DraftModelDecoding(
+            model_path=config["path"],
+            n_context=n_context,
+            n_gpu_layers=config.get("n_gpu_layers", 0),
+            num_pred_tokens=num_pred_tokens,
+        )
+    else:
+        raise ValueError(f"Unknown speculative decoding method '{method}'; expected one of {SPECULATIVE_METHODS}")
+    return CountingDraftModel(draft_model, method)
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+
+logger = logging.getLogger("bentoml")
+
+INDEX_FILE = "index.json"
+
+
+class StateSpillStore:
+    """
+    On-disk store of llama.cpp context states for one model.
+
+    States are pickled into ``directory`` alongside an index of their token keys, so
+    the index can be read cheaply at load time and a state is only read back once a
+    prompt actually matches it. ``fingerprint`` identifies the model file and context
+    size the states were produced with; a store written for a different fingerprint
+    is discarded. Once the stored states exceed ``capacity_bytes`` the least recently
+    used are deleted.
+    """
+
+    def __init__(self, directory: str, capacity_bytes: int, fingerprint: str):
+        self.directory = directory
+        self.capacity_bytes = capacity_bytes
+        self.fingerprint = fingerprint
+        self.entries: Dict[Tuple[int, ...], Dict] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._read_index()
+
+    @staticmethod
+    def model_fingerprint(model_path: str, n_context: int) -> str:
+        try:
+            stat = os.stat(model_path)
+            file_id = f"{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            file_id = "missing"
+        return f"{os.path.abspath(model_path)}:{file_id}:{n_context}"
+
+    def _read_index(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(index_path, "r") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if index.get("fingerprint") != self.fingerprint:
+            logger.info(f"Discarding spilled states in {self.directory}: model file or context size changed")
+            for entry in index.get("entries", []):
+                self._remove_file(entry["file"])
+            self._write_index()
+            return
+
+        for entry in index.get("entries", []):
+            if os.path.exists(os.path.join(self.directory, entry["file"])):
+                self.entries[tuple(entry["tokens"])] = entry
+
+    def _write_index(self):
+        index = {
+            "fingerprint": self.fingerprint,
+            "entries": [{**entry, "tokens": list(key)} for key, entry in self.entries.items()],
+        }
+        tmp_path = os.path.join(self.directory, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(index, file)
+        os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+
+    def _remove_file(self, file_name: str):
+        try:
+            os.remove(os.path.join(self.directory, file_name))
+        except OSError:
+            pass
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def keys(self) -> List[Tuple[int, ...]]:
+        return list(self.entries)
+
+    def save(self, key, state):
+        key = tuple(key)
+        file_name = hashlib.sha1(repr(key).encode()).hexdigest() + ".state"
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.capacity_bytes:
+            return
+        with open(os.path.join(self.directory, file_name), "wb") as file:
+            file.write(data)
+        self.entries[key] = {"file": file_name, "size": len(data), "last_used": time.time()}
+
+        while self.size_bytes > self.capacity_bytes:
+            oldest = min(self.entries, key=lambda k: self.entries[k]["last_used"])
+            self._remove_file(self.entries.pop(oldest)["file"])
+        self._write_index()
+
+    def load(self, key) -> Optional[object]:
+        entry = self.entries.get(tuple(key))
+        if entry is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, entry["file"]), "rb") as file:
+                state = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Dropping unreadable spilled state {entry['file']}: {e}")
+            self.entries.pop(tuple(key))
+            self._write_index()
+            return None
+        entry["last_used"] = time.time()
+        self._write_index()
+        return state
+
+    def get_stats(self) -> Dict:
+        return {
+            "entries": len(self.entries),
+            "size_bytes": self.size_bytes,
+            "capacity_bytes": self.capacity_bytes,
+        }
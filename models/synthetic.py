@@ -0,0 +1,178 @@
+from typing import List, Any, Dict
+from .base import BaseModelWrapper
+from utils.config_loader import parse_memory_size
+from api.schemas import Message
+import random
+import threading
+import time
+import zlib
+
+# Words the synthetic model "generates"; each one is roughly one token.
+VOCABULARY = (
+    " the", " model", " returns", " a", " value", " for", " each", " request", " and", " then",
+    " def", " x", " =", " return", "(", ")", ":", "\n", " data", " result",
+)
+
+
+class SyntheticWrapper(BaseModelWrapper):
+    """
+    A model that needs no weights and simulates the cost of a real one.
+
+    Loading sleeps ``load_secs`` and, with ``allocate_memory``, holds the model's
+    configured ``memory`` in RAM until cleanup. Prompt evaluation takes
+    ``prompt_tokens_per_sec`` and generation emits ``max_tokens`` tokens at
+    ``tokens_per_sec``. The text depends only on the prompt and ``seed``, so runs are
+    repeatable and identical requests produce identical responses.
+
+    Configured with a ``synthetic`` section on the model, e.g.::
+
+        type: synthetic
+        memory: "512Mi"
+        synthetic:
+          load_secs: 2
+          prompt_tokens_per_sec: 400
+          tokens_per_sec: 20
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_path: str = None,
+        n_context: int = 2048,
+        n_gpu_layers: int = 0,
+        prompt_template: str = None,
+        system_message_template: str = None,
+        conversation_message_template: str = None,
+        default_params: Dict = None,
+        prefix_cache_bytes: int = 0,
+        state_spill: Dict = None,
+        memory_bytes: int = 0,
+        load_secs: float = 0.0,
+        prompt_tokens_per_sec: float = 0.0,
+        tokens_per_sec: float = 0.0,
+        allocate_memory: bool = False,
+        seed: int = 0,
+    ):
+        super().__init__(
+            model_name=model_name,
+            model_path=model_path,
+            default_params=default_params
+        )
+        self.n_context = n_context
+        if prompt_template:
+            self.set_prompt_template(prompt_template)
+        if system_message_template:
+            self.set_system_message_template(system_message_template)
+        if conversation_message_template:
+            self.set_conversation_message_template(conversation_message_template)
+        self.memory_bytes = memory_bytes
+        self.load_secs = load_secs
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.tokens_per_sec = tokens_per_sec
+        self.allocate_memory = allocate_memory
+        self.seed = seed
+        self.model = None
+        # Like a llama.cpp context, one synthetic model generates for one request at a time.
+        self._inference_lock = threading.Lock()
+
+    @classmethod
+    def config_options(cls, model_config: Dict) -> Dict:
+        return {
+            "memory_bytes": parse_memory_size(model_config.get("memory")),
+            **(model_config.get("synthetic") or {}),
+        }
+
+    def load_model(self) -> bytearray:
+        if self.model is None:
+            time.sleep(self.load_secs)
+            # Filled rather than zeroed so the pages are actually resident.
+            self.model = bytearray(b"\x01") * self.memory_bytes if self.allocate_memory else bytearray()
+        return self.model
+
+    def cleanup(self):
+        self.model = None
+
+    def create_prompt(self, messages: List[Message], max_tokens: int = None) -> str:
+        system_prompt = next((msg.content for msg in messages if msg.role == "system"), "")
+        conversation_history = "\n".join(
+            self.format_conversation_message(msg.role, msg.content)
+            for msg in messages
+            if msg.role in {"user", "assistant"}
+        )
+        return self.format_prompt(
+            system_prompt=self.format_system_message(system_prompt),
+            conversation_history=conversation_history,
+        )
+
+    def get_response(self, prompt: str, **kwargs) -> Any:
+        self.load_model()
+        params = {**self.default_params, **kwargs}
+        if params.get("stream"):
+            return self._stream_response(prompt, params)
+        with self._inference_lock:
+            prompt_tokens = self._evaluate_prompt(prompt)
+            texts = list(self._generate(prompt, params))
+        return {
+            "id": f"cmpl-{self._prompt_hash(prompt):08x}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": self.model_name,
+            "choices": [{"text": "".join(texts), "index": 0, "logprobs": None, "finish_reason": "length"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(texts),
+                "total_tokens": prompt_tokens + len(texts),
+            },
+        }
+
+    def _stream_response(self, prompt: str, params: Dict):
+        completion_id = f"cmpl-{self._prompt_hash(prompt):08x}"
+        created = int(time.time())
+        with self._inference_lock:
+            self._evaluate_prompt(prompt)
+            for text in self._generate(prompt, params):
+                yield {
+                    "id": completion_id,
+                    "object": "text_completion",
+                    "created": created,
+                    "model": self.model_name,
+                    "choices": [{"text": text, "index": 0, "logprobs": None, "finish_reason": None}],
+                }
+
+    def _prompt_hash(self, prompt: str) -> int:
+        return zlib.crc32(prompt.encode("utf-8"), self.seed)
+
+    def _evaluate_prompt(self, prompt: str) -> int:
+        prompt_tokens = self.count_tokens(prompt)
+        if self.prompt_tokens_per_sec > 0:
+            time.sleep(prompt_tokens / self.prompt_tokens_per_sec)
+        return prompt_tokens
+
+    def _generate(self, prompt: str, params: Dict):
+        rng = random.Random(self._prompt_hash(prompt))
+        interval = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        next_token_at = time.perf_counter()
+        for _ in range(params.get("max_tokens") or 16):
+            if interval:
+                # Paced against a deadline so sleep overshoot does not add up.
+                next_token_at += interval
+                delay = next_token_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield rng.choice(VOCABULARY)
+
+    def format_output(self, raw_output: Any) -> dict:
+        return {
+            "id": raw_output["id"],
+            "object": "chat.completion",
+            "created": raw_output["created"],
+            "model": self.model_name,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": raw_output["choices"][0]["text"]},
+                    "finish_reason": raw_output["choices"][0]["finish_reason"],
+                }
+            ],
+            "usage": raw_output["usage"],
+        }
@@ -1,7 +1,12 @@
-from typing import Dict, Type
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Dict, Type, Union
 from .base import BaseModelWrapper
-from .llama import LLaMAWrapper
 from utils.constants import DEFAULT_N_CONTEXT, DEFAULT_N_GPU_LAYERS
+from utils.config_loader import parse_memory_size
+
+# Entry point group through which installed packages can provide wrappers for new model types.
+WRAPPER_ENTRY_POINT_GROUP = "bentoswitch.wrappers"
 
 
 class WrapperFactory:
@@ -12,23 +17,63 @@ class WrapperFactory:
     based on the model type. It also allows for registration of new wrapper classes,
     making it extensible for future model types.
 
+    Wrapper classes can be registered by ``"module:Class"`` path, which is only imported
+    when a model of that type is first built, so backends such as ``llama_cpp`` stay
+    out of service startup. Model types that are not registered are looked up among the
+    ``bentoswitch.wrappers`` entry points of installed packages.
+
     Attributes:
-        _wrappers (Dict[str, Type[BaseModelWrapper]]): A dictionary mapping model types
-            to their corresponding wrapper classes.
+        _wrappers (Dict[str, Union[str, Type[BaseModelWrapper]]]): A dictionary mapping
+            model types to their wrapper classes or the paths to import them from.
 
     Usage:
         # Get a wrapper instance
-        llama_wrapper = WrapperFactory.get_wrapper("llama", "llama-7b", "/path/to/model")
+        llama_wrapper = WrapperFactory.get_wrapper("llama-7b", {"type": "llama", "path": "/path/to/model"})
 
-        # Register a new wrapper class
+        # Register a new wrapper class, directly or by path
         WrapperFactory.register_wrapper("new_model", NewModelWrapper)
+        WrapperFactory.register_wrapper("new_model", "my_package.wrappers:NewModelWrapper")
     """
 
-    _wrappers: Dict[str, Type[BaseModelWrapper]] = {
-        "llama": LLaMAWrapper,
+    # Config keys a loaded model is built from; changing any of them requires a reload.
+    LOAD_KEYS = ("type", "path", "n_context", "n_gpu_layers", "prefix_cache", "state_spill", "synthetic", "speculative")
+
+    _wrappers: Dict[str, Union[str, Type[BaseModelWrapper]]] = {
+        "llama": "models.llama:LLaMAWrapper",
+        "synthetic": "models.synthetic:SyntheticWrapper",
         # Add more wrappers here as they are implemented
     }
 
+    @classmethod
+    def _entry_point(cls, model_type: str):
+        return next(iter(entry_points(group=WRAPPER_ENTRY_POINT_GROUP, name=model_type)), None)
+
+    @classmethod
+    def is_supported(cls, model_type: str) -> bool:
+        """Whether a wrapper is available for ``model_type``, without importing it."""
+        model_type = model_type.lower()
+        return model_type in cls._wrappers or cls._entry_point(model_type) is not None
+
+    @classmethod
+    def get_wrapper_class(cls, model_type: str) -> Type[BaseModelWrapper]:
+        """
+        Return the wrapper class for ``model_type``, importing it on first use.
+
+        Raises:
+            ValueError: If the model type is not supported.
+        """
+        model_type = model_type.lower()
+        wrapper_class = cls._wrappers.get(model_type)
+        if wrapper_class is None:
+            entry_point = cls._entry_point(model_type)
+            if entry_point is None:
+                raise ValueError(f"Unsupported model type: {model_type}")
+            wrapper_class = cls._wrappers[model_type] = entry_point.load()
+        elif isinstance(wrapper_class, str):
+            module_name, _, class_name = wrapper_class.partition(":")
+            wrapper_class = cls._wrappers[model_type] = getattr(import_module(module_name), class_name)
+        return wrapper_class
+
     @classmethod
     def get_wrapper(cls, model_name: str, model_config: Dict) -> BaseModelWrapper:
         """
@@ -44,30 +89,64 @@ class WrapperFactory:
         Raises:
             ValueError: If the model type is not supported.
         """
-        wrapper_class = cls._wrappers.get(model_config["type"].lower())
-        if not wrapper_class:
-            raise ValueError(f"Unsupported model type: {model_config['type']}")
+        wrapper_class = cls.get_wrapper_class(model_config["type"])
 
         wrapper = wrapper_class(
             model_name=model_name,
-            model_path=model_config["path"],
+            model_path=model_config.get("path"),
             n_context=model_config.get("n_context", DEFAULT_N_CONTEXT),
             n_gpu_layers=model_config.get("n_gpu_layers", DEFAULT_N_GPU_LAYERS),
             prompt_template=model_config.get("prompt_template"),
             system_message_template=model_config.get("system_message_template"),
             conversation_message_template=model_config.get("conversation_message_template"),
-            default_params=model_config.get("default_params", {})
+            default_params=model_config.get("default_params", {}),
+            prefix_cache_bytes=parse_memory_size(model_config.get("prefix_cache")),
+            state_spill=model_config.get("state_spill"),
+            **wrapper_class.config_options(model_config),
         )
+        wrapper.compile_templates()
 
         return wrapper
 
     @classmethod
-    def register_wrapper(cls, model_type: str, wrapper_class: Type[BaseModelWrapper]):
+    def validate_config(cls, model_name: str, model_config: Dict):
+        """
+        Check that ``model_config`` describes a model this factory can build.
+
+        Raises:
+            ValueError: If the config is not a mapping or its type is not supported.
+        """
+        if not isinstance(model_config, dict) or "type" not in model_config:
+            raise ValueError(f"Model '{model_name}' needs a config with a 'type'")
+        if not cls.is_supported(model_config["type"]):
+            raise ValueError(f"Unsupported model type for '{model_name}': {model_config['type']}")
+
+    @classmethod
+    def needs_reload(cls, old_config: Dict, new_config: Dict) -> bool:
+        """Whether a model loaded with ``old_config`` must be reloaded to use ``new_config``."""
+        return any(old_config.get(key) != new_config.get(key) for key in cls.LOAD_KEYS)
+
+    @staticmethod
+    def update_wrapper(wrapper: BaseModelWrapper, model_config: Dict):
+        """Apply the sampling defaults and prompt templates of ``model_config`` to a loaded wrapper."""
+        wrapper.default_params = model_config.get("default_params", {})
+        wrapper.set_prompt_template(model_config.get("prompt_template") or wrapper.DEFAULT_PROMPT_TEMPLATE)
+        wrapper.set_system_message_template(
+            model_config.get("system_message_template") or wrapper.DEFAULT_SYSTEM_MESSAGE_TEMPLATE
+        )
+        wrapper.set_conversation_message_template(
+            model_config.get("conversation_message_template") or wrapper.DEFAULT_CONVERSATION_MESSAGE_TEMPLATE
+        )
+        wrapper.compile_templates()
+
+    @classmethod
+    def register_wrapper(cls, model_type: str, wrapper_class: Union[str, Type[BaseModelWrapper]]):
         """
         Register a new wrapper class for a given model type.
 
         Args:
             model_type (str): The type of the model.
-            wrapper_class (Type[BaseModelWrapper]): The wrapper class to register.
+            wrapper_class (Union[str, Type[BaseModelWrapper]]): The wrapper class to
+                register, or its ``"module:Class"`` path to import it lazily.
         """
         cls._wrappers[model_type.lower()] = wrapper_class
@@ -1,16 +1,49 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict
+import json
+
+
+class StreamContext:
+    """
+    Per-stream state handed out by ``BaseResponseFormatter.new_stream``.
+
+    Each streamed response gets its own context, so formatters hold no per-request
+    state and concurrent streams never share it.
+    """
+
+    __slots__ = ("formatter",)
+
+    def __init__(self, formatter: "BaseResponseFormatter"):
+        self.formatter = formatter
+
+    def format(self, raw_response: Any) -> Dict:
+        """Format a streamed chunk of this stream."""
+        return self.formatter.format_response(raw_response, streaming=True, stream=self)
+
+    def encode(self, raw_response: Any) -> bytes:
+        """Encode a streamed chunk of this stream as a server-sent event frame."""
+        return f"data: {json.dumps(self.format(raw_response))}\n\n".encode()
 
 
 class BaseResponseFormatter(ABC):
+    def new_stream(self) -> StreamContext:
+        """
+        Start a streamed response.
+
+        Returns:
+            StreamContext: The context to format and encode the stream's chunks with.
+        """
+        return StreamContext(self)
+
     @abstractmethod
-    def format_response(self, raw_response: Any, streaming: bool = False) -> Dict:
+    def format_response(self, raw_response: Any, streaming: bool = False, stream: StreamContext = None) -> Dict:
         """
         Format the raw response from the model into a standardized structure.
 
         Args:
             raw_response (Any): The raw output from the model.
             streaming (bool): Whether this is a streaming response or not.
+            stream (StreamContext): The stream a streamed chunk belongs to.
 
         Returns:
             dict: Formatted response in a standardized structure.
@@ -1,22 +1,83 @@
-from .base import BaseResponseFormatter
+from .base import BaseResponseFormatter, StreamContext
+from json.encoder import encode_basestring_ascii
 from typing import Any, Dict, List
+import json
 import time
 import uuid
 
+try:
+    import orjson
+except ImportError:  # optional faster string escaping
+    orjson = None
+
+# Stands in for the delta text when pre-serializing a stream's frame.
+_CONTENT_PLACEHOLDER = "\x00"
+
+
+def encode_json_string(text: str) -> bytes:
+    """``json.dumps(text)`` as bytes, escaped with orjson when its output is identical."""
+    # orjson leaves non-ASCII characters and DEL unescaped, json.dumps does not.
+    if orjson is not None and text.isascii() and "\x7f" not in text:
+        return orjson.dumps(text)
+    return encode_basestring_ascii(text).encode()
+
+
+class OpenAIStreamContext(StreamContext):
+    """
+    Id, creation time and pre-serialized frame of one OpenAI chat completion stream.
+
+    The invariant part of the chunk frame (id, object, created, model, choice envelope)
+    is serialized on the first ``encode``; later chunks only escape their delta text.
+    """
+
+    __slots__ = ("stream_id", "created", "_frame_model", "_frame_head", "_frame_tail")
+
+    def __init__(self, formatter: "OpenAIResponseFormatter"):
+        super().__init__(formatter)
+        self.stream_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self.created = int(time.time())
+        self._frame_model = None
+        self._frame_head = b""
+        self._frame_tail = b""
+
+    def format(self, raw_response: Any) -> Dict:
+        return self.formatter.format_streaming_response(raw_response, stream=self)
+
+    def encode(self, raw_response: Any) -> bytes:
+        """
+        Byte-identical to ``f"data: {json.dumps(self.format(raw_response))}\\n\\n".encode()``.
+
+        Final chunks (empty text or a finish_reason) take the ``json.dumps`` path.
+        """
+        choice = raw_response["choices"][0]
+        content = choice["text"]
+        if content == "" or choice.get("finish_reason") is not None:
+            return super().encode(raw_response)
+
+        model = raw_response.get("model", "unknown")
+        if model != self._frame_model:
+            frame = json.dumps(self.format({"model": model, "choices": [{"text": _CONTENT_PLACEHOLDER}]}))
+            head, _, tail = frame.rpartition(json.dumps(_CONTENT_PLACEHOLDER))
+            self._frame_model = model
+            self._frame_head = f"data: {head}".encode()
+            self._frame_tail = f"{tail}\n\n".encode()
+        return b"".join((self._frame_head, encode_json_string(content), self._frame_tail))
+
 
 class OpenAIResponseFormatter(BaseResponseFormatter):
-    def __init__(self):
-        self.current_stream_id = None
-        self.creation_timestamp = None
+    """Stateless; the id and timestamp of each stream live in its OpenAIStreamContext."""
+
+    def new_stream(self) -> OpenAIStreamContext:
+        return OpenAIStreamContext(self)
 
-    def format_response(self, raw_response: Any, streaming: bool = False) -> Dict:
+    def format_response(self, raw_response: Any, streaming: bool = False, stream: StreamContext = None) -> Dict:
         if streaming:
-            return self.format_streaming_response(raw_response)
+            return self.format_streaming_response(raw_response, stream=stream)
         else:
             return self.format_non_streaming_response(raw_response)
 
     def format_non_streaming_response(self, raw_response: Dict) -> Dict:
-        return {
+        response = {
             "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
             "object": "chat.completion",
             "created": int(time.time()),
@@ -26,11 +87,15 @@ class OpenAIResponseFormatter(BaseResponseFormatter):
                 "usage", {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
             ),
         }
+        if "speculative" in raw_response:
+            # Not part of the OpenAI schema; clients ignore it.
+            response["speculative"] = raw_response["speculative"]
+        return response
 
-    def format_streaming_response(self, raw_response: Any) -> Dict:
-        if self.current_stream_id is None:
-            self.current_stream_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
-            self.creation_timestamp = int(time.time())
+    def format_streaming_response(self, raw_response: Any, stream: OpenAIStreamContext = None) -> Dict:
+        if stream is None:
+            # A chunk formatted on its own is a stream of its own.
+            stream = self.new_stream()
 
         content = (
             raw_response["choices"][0]["text"]
@@ -45,9 +110,9 @@ class OpenAIResponseFormatter(BaseResponseFormatter):
         delta = {"role": "assistant", "content": content} if not is_final_chunk else {}
 
         return {
-            "id": self.current_stream_id,
+            "id": stream.stream_id,
             "object": "chat.completion.chunk",
-            "created": self.creation_timestamp,
+            "created": stream.created,
             "model": raw_response.get("model", "unknown"),
             "choices": [
                 {
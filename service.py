@@ -6,15 +6,25 @@ import bentoml
 from fastapi import FastAPI, HTTPException
 
 from models.model_manager import ModelManager
+from models.gguf_index import GGUFIndex
+from models.memory_watchdog import MemoryWatchdog
+from models.page_cache import PageCacheWarmer
 from models.exceptions import ModelNotFoundException, ModelLoadException
+from models.scheduler import RequestScheduler
 from response_formatters.formatter_factory import FormatterFactory
 from utils.config_loader import load_model_configs
+from utils.config_watcher import ConfigWatcher
+from utils.inference_executor import InferenceExecutor
+from utils.metrics import ServiceMetrics
+from utils.response_cache import ResponseCache
+from utils.tracing import Tracer
 from api import (
     create_chat_completion,
     create_raw_completion,
     switch_model,
 )
 from api.schemas import SettingsUpdateRequest
+from utils.constants import SERVICE_MEMORY, MODEL_CONFIG_PATH, GGUF_INDEX_PATH
 
 
 app = FastAPI()
@@ -23,7 +33,7 @@ logger = logging.getLogger(__name__)
 
 
 @bentoml.service(
-    resources={"cpu": "18", "memory": "48Gi"},
+    resources={"cpu": "18", "memory": SERVICE_MEMORY},
     traffic={"timeout": 10},
     logging={
         "access": {
@@ -45,17 +55,63 @@ class BentoSwitchService:
             model_configs,
             model_mode,
             model_unload_delay_secs,
-        ) = load_model_configs()
+            service_settings,
+        ) = load_model_configs(MODEL_CONFIG_PATH)
+        self.default_model_name = default_model_name
+        self.model_mode = model_mode
+        self.model_unload_delay_secs = model_unload_delay_secs
+        self.service_settings = service_settings
+        self.metrics = ServiceMetrics()
+        # Model sizes and architectures are read from the GGUF headers in the background.
+        self.model_index = GGUFIndex(GGUF_INDEX_PATH)
+        self.model_index.refresh(model_config.get("path") for model_config in model_configs.values())
+        prewarm_settings = dict(service_settings["page_cache_prewarm"])
+        self.page_cache_warmer = (
+            PageCacheWarmer(**prewarm_settings, metrics=self.metrics) if prewarm_settings.pop("enabled") else None
+        )
         self.model_manager = ModelManager(
             model_configs,
             mode=model_mode,
             unload_delay_secs=model_unload_delay_secs,
+            memory_budget=service_settings["memory_budget"],
+            prefetch=service_settings["prefetch"],
+            metrics=self.metrics,
+            model_index=self.model_index,
+            admission_timeout_secs=service_settings["admission"]["timeout_secs"],
+            check_available_memory=service_settings["admission"]["check_available"],
+            page_cache_warmer=self.page_cache_warmer,
+        )
+        self.scheduler = RequestScheduler(
+            **service_settings["scheduler"],
+            metrics=self.metrics,
+            fits_without_eviction=self.model_manager.fits_without_eviction,
+        )
+        self.executor = InferenceExecutor(**service_settings["executor"])
+        response_cache_settings = dict(service_settings["response_cache"])
+        self.response_cache = (
+            ResponseCache(**response_cache_settings) if response_cache_settings.pop("enabled") else None
         )
+        self.tracer = Tracer(**service_settings["tracing"])
+        watchdog_settings = dict(service_settings["memory_watchdog"])
+        self.memory_watchdog = None
+        if watchdog_settings.pop("enabled"):
+            self.memory_watchdog = MemoryWatchdog(
+                self.model_manager, **watchdog_settings, response_cache=self.response_cache, metrics=self.metrics
+            )
+            self.memory_watchdog.start()
+            # Admit loads only with the watchdog's floor to spare, or it would unload them again.
+            self.model_manager.min_available_memory = self.memory_watchdog.min_available
         self.formatter = FormatterFactory.get_formatter("openai")
-        # Load the default model
+        self.config_watcher = None
+        if service_settings["config_reload"]["watch"]:
+            self.config_watcher = ConfigWatcher(
+                MODEL_CONFIG_PATH, self.reload_config, service_settings["config_reload"]["poll_secs"]
+            )
+            self.config_watcher.start()
+        # Load the default model in the background; early requests wait until it is ready
         if model_mode == "keep_loaded":
             try:
-                self.model_manager.load_model(default_model_name)
+                self.model_manager.start_load(default_model_name)
             except (ModelNotFoundException, ModelLoadException) as e:
                 logger.error(f"Failed to load default model: {str(e)}")
         else:
@@ -63,6 +119,52 @@ class BentoSwitchService:
                 "keep_model_loaded is False, skipping loading of default model."
             )
 
+    def reload_config(self):
+        """
+        Re-read the config file and apply it to the running service.
+
+        Model changes are applied by ``ModelManager.apply_configs`` and drop the changed
+        models' cached responses; the memory budget, model mode and unload delay take
+        effect immediately. Other service settings are reported under ``restart_required``
+        when they differ from the running ones.
+        """
+        (
+            default_model_name,
+            model_configs,
+            model_mode,
+            model_unload_delay_secs,
+            service_settings,
+        ) = load_model_configs(MODEL_CONFIG_PATH)
+        if default_model_name not in model_configs:
+            raise ValueError(f"Default model '{default_model_name}' is not configured")
+
+        changes = self.model_manager.apply_configs(model_configs)
+        if self.response_cache is not None:
+            # Cached responses of a removed or changed model no longer match what it would generate.
+            for model_name in changes["removed"] + changes["reloaded"] + changes["updated"]:
+                self.response_cache.invalidate_model(model_name)
+        self.model_index.refresh(model_config.get("path") for model_config in model_configs.values())
+        self.model_manager.memory_budget = service_settings["memory_budget"]
+        self.model_manager.admission_timeout_secs = service_settings["admission"]["timeout_secs"]
+        self.model_manager.check_available_memory = service_settings["admission"]["check_available"]
+        # Only a change in the file overrides a mode set through /settings.
+        if (model_mode, model_unload_delay_secs) != (self.model_mode, self.model_unload_delay_secs):
+            self.model_mode = model_mode
+            self.model_unload_delay_secs = model_unload_delay_secs
+            self.model_manager.set_mode(model_mode, model_unload_delay_secs)
+        # Load the default model only if it changed or nothing is resident; otherwise the
+        # reload would evict whatever the clients switched to in favour of the default.
+        default_changed = default_model_name != self.default_model_name
+        self.default_model_name = default_model_name
+        if model_mode == "keep_loaded" and (default_changed or not self.model_manager.get_loaded_model_names()):
+            self.model_manager.start_load(default_model_name)
+        changes["restart_required"] = sorted(
+            key
+            for key, value in service_settings.items()
+            if key not in ("memory_budget", "config_reload", "admission") and value != self.service_settings.get(key)
+        )
+        return changes
+
     create_chat_completion = create_chat_completion
     create_raw_completion = create_raw_completion
     switch_model = switch_model
@@ -76,6 +178,7 @@ class BentoSwitchService:
                 "object": "model",
                 "created": 1677610602,
                 "owned_by": "organization-owner",
+                "metadata": self.model_manager.get_model_metadata(model_name),
             }
             for model_name in model_configs.keys()
         ]
@@ -91,13 +194,28 @@ class BentoSwitchService:
     @app.get("/service-info")
     def service_info(self):
         info = {
-            "current_loaded_model": self.model_manager.get_current_model_name()
+            "current_loaded_model": self.model_manager.get_current_model_name(),
+            "model_pool": self.model_manager.get_pool_info(),
+            "scheduler": self.scheduler.get_stats(),
         }
+        if self.response_cache is not None:
+            info["response_cache"] = self.response_cache.get_stats()
+        if self.memory_watchdog is not None:
+            info["memory_watchdog"] = self.memory_watchdog.get_stats()
+        if self.page_cache_warmer is not None:
+            info["page_cache"] = self.model_manager.get_page_cache_info()
         unload_time_remaining = self.model_manager.get_unload_time_remaining()
         if unload_time_remaining:
             info["unload_time_remaining"] = unload_time_remaining
         return info
 
+    @app.post("/reload-config")
+    def reload_config_endpoint(self):
+        try:
+            return self.reload_config()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Config not applied: {e}")
+
     @app.post("/settings")
     def update_settings(self, request: SettingsUpdateRequest):
         try:
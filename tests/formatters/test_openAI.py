@@ -1,7 +1,11 @@
+import json
 import unittest
 from unittest.mock import patch
+from response_formatters import openAI
 from response_formatters.openAI import OpenAIResponseFormatter
 
+STREAM_TEXTS = ["Hello", 'say "hi"\n\tback\\', "caf\u00e9 \u2014 \U0001f600", "\x00\x1f\x7f</script>", " "]
+
 
 class TestOpenAIResponseFormatter(unittest.TestCase):
     def setUp(self):
@@ -62,6 +66,23 @@ class TestOpenAIResponseFormatter(unittest.TestCase):
         self.assertEqual(formatted_choices[1]["message"]["content"], "Response 2")
         self.assertEqual(formatted_choices[1]["finish_reason"], "length")
 
+    def test_encoded_frames_match_json_dumps(self):
+        for backend in (openAI.orjson, None):
+            with patch.object(openAI, "orjson", backend):
+                stream = self.formatter.new_stream()
+                for text in STREAM_TEXTS:
+                    for raw_response in ({"choices": [{"text": text}]}, {"model": "m\u00e9", "choices": [{"text": text}]}):
+                        expected = f"data: {json.dumps(stream.format(raw_response))}\n\n"
+                        self.assertEqual(stream.encode(raw_response), expected.encode())
+
+    def test_encoded_final_chunk(self):
+        stream = self.formatter.new_stream()
+        stream.encode({"choices": [{"text": "Hi"}]})
+        frame = stream.encode({"choices": [{"text": "", "finish_reason": "stop"}]})
+        chunk = json.loads(frame[len(b"data: "):])
+        self.assertEqual(chunk["id"], stream.stream_id)
+        self.assertEqual(chunk["choices"][0], {"index": 0, "delta": {}, "finish_reason": "stop"})
+
 
 if __name__ == "__main__":
     unittest.main()
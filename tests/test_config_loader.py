@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from utils.config_loader import load_model_configs, parse_memory_size
+
+
+class TestParseMemorySize(unittest.TestCase):
+
+    def test_binary_and_decimal_units(self):
+        self.assertEqual(parse_memory_size("48Gi"), 48 * 1024**3)
+        self.assertEqual(parse_memory_size("512M"), 512 * 1000**2)
+        self.assertEqual(parse_memory_size("2GiB"), 2 * 1024**3)
+
+    def test_plain_bytes(self):
+        self.assertEqual(parse_memory_size(1024), 1024)
+        self.assertEqual(parse_memory_size("1024"), 1024)
+
+    def test_fraction_of_total(self):
+        self.assertEqual(parse_memory_size(0.5, total_bytes=1000), 500)
+        self.assertEqual(parse_memory_size(1, total_bytes=1000), 1000)
+        self.assertEqual(parse_memory_size(0, total_bytes=1000), 0)
+
+    def test_fraction_without_total_is_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_memory_size(1)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            parse_memory_size("lots")
+
+
+class TestLoadModelConfigs(unittest.TestCase):
+
+    def _write_config(self, text):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+            file.write(text)
+        self.addCleanup(os.unlink, file.name)
+        return file.name
+
+    def test_unknown_stream_flush_setting_is_rejected(self):
+        path = self._write_config(
+            "models:\n"
+            "  m:\n"
+            "    type: llama\n"
+            "    path: /m.gguf\n"
+            "    stream_flush:\n"
+            "      max_char: 8\n"
+        )
+        with self.assertRaisesRegex(ValueError, "'m'"):
+            load_model_configs(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
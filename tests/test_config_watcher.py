@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from utils.config_watcher import ConfigWatcher
+
+
+class TestConfigWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "model_configs.yaml")
+        self._write("models: {}\n", mtime_ns=1_000_000_000)
+        self.on_change = MagicMock()
+        self.watcher = ConfigWatcher(self.path, self.on_change, poll_secs=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, content: str, mtime_ns: int):
+        with open(self.path, "w") as file:
+            file.write(content)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_change_is_reported_once(self):
+        self.assertFalse(self.watcher.check())
+
+        self._write("models: {a: {}}\n", mtime_ns=2_000_000_000)
+        self.assertTrue(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+        self.on_change.assert_called_once()
+
+    def test_failed_reload_waits_for_the_next_change(self):
+        self.on_change.side_effect = ValueError("bad config")
+        self._write("models: [\n", mtime_ns=2_000_000_000)
+
+        self.assertTrue(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+        self._write("models: {a: {}}\n", mtime_ns=3_000_000_000)
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(self.on_change.call_count, 2)
+
+    def test_missing_file_is_ignored(self):
+        os.remove(self.path)
+        self.assertFalse(self.watcher.check())
+        self.on_change.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.gguf_index import GGUFIndex, estimate_kv_cache_bytes, estimate_logits_bytes, read_gguf_metadata
+from models.model_manager import ModelManager
+
+
+def _string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("<Q", len(data)) + data
+
+
+def write_gguf(path: str, n_layers: int = 4, padding: int = 0):
+    """Write a GGUF header like a small llama model's, followed by ``padding`` bytes of weights."""
+    metadata = [
+        ("general.architecture", 8, _string("llama")),
+        ("general.name", 8, _string("tiny")),
+        ("general.file_type", 4, struct.pack("<I", 15)),
+        ("llama.block_count", 4, struct.pack("<I", n_layers)),
+        ("llama.context_length", 4, struct.pack("<I", 4096)),
+        ("llama.embedding_length", 4, struct.pack("<I", 256)),
+        ("llama.attention.head_count", 4, struct.pack("<I", 8)),
+        ("llama.attention.head_count_kv", 4, struct.pack("<I", 2)),
+        ("llama.rope.freq_base", 6, struct.pack("<f", 10000.0)),
+        ("tokenizer.ggml.tokens", 9, struct.pack("<IQ", 8, 3) + b"".join(_string(t) for t in ("<s>", "a", "b"))),
+        ("tokenizer.ggml.scores", 9, struct.pack("<IQ", 6, 3) + struct.pack("<3f", 0, 0, 0)),
+    ]
+    tensors = [("token_embd.weight", (256, 32)), ("output_norm.weight", (256,))]
+    with open(path, "wb") as file:
+        file.write(b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata)))
+        for key, value_type, value in metadata:
+            file.write(_string(key) + struct.pack("<I", value_type) + value)
+        for name, dims in tensors:
+            file.write(_string(name) + struct.pack("<I", len(dims)) + struct.pack(f"<{len(dims)}Q", *dims))
+            file.write(struct.pack("<IQ", 0, 0))
+        file.write(b"\0" * padding)
+
+
+class TestGGUFMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.directory.name, "tiny.gguf")
+        write_gguf(self.model_path, padding=1000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_header_is_parsed(self):
+        metadata = read_gguf_metadata(self.model_path)
+
+        self.assertEqual(metadata["architecture"], "llama")
+        self.assertEqual(metadata["file_type"], "Q4_K_M")
+        self.assertEqual(metadata["n_layers"], 4)
+        self.assertEqual(metadata["context_length"], 4096)
+        self.assertEqual(metadata["head_count_kv"], 2)
+        self.assertEqual(metadata["key_length"], 32)
+        self.assertEqual(metadata["parameters"], 256 * 32 + 256)
+        self.assertEqual(metadata["n_vocab"], 3)
+
+    def test_kv_cache_estimate(self):
+        metadata = read_gguf_metadata(self.model_path)
+        # layers * tokens * kv heads * (key + value length) * 2 bytes
+        self.assertEqual(estimate_kv_cache_bytes(metadata, 1024), 4 * 1024 * 2 * 64 * 2)
+        self.assertEqual(estimate_kv_cache_bytes({}, 1024), 0)
+
+    def test_logits_estimate(self):
+        metadata = read_gguf_metadata(self.model_path)
+        # tokens * vocabulary * 4 bytes
+        self.assertEqual(estimate_logits_bytes(metadata, 1024), 1024 * 3 * 4)
+        self.assertEqual(estimate_logits_bytes({}, 1024), 0)
+
+    def test_non_gguf_file_is_rejected(self):
+        with open(self.model_path, "wb") as file:
+            file.write(b"not a model")
+        with self.assertRaises(ValueError):
+            read_gguf_metadata(self.model_path)
+
+    def test_index_is_reused_across_restarts_and_invalidated_by_mtime(self):
+        index_path = os.path.join(self.directory.name, "cache", "index.json")
+        GGUFIndex(index_path).refresh([self.model_path], wait=True)
+
+        with patch("models.gguf_index.read_gguf_metadata") as read:
+            restarted = GGUFIndex(index_path)
+            self.assertEqual(restarted.lookup(self.model_path)["n_layers"], 4)
+            restarted.refresh([self.model_path], wait=True)
+            read.assert_not_called()
+
+        write_gguf(self.model_path, n_layers=8)
+        os.utime(self.model_path, ns=(1, 1))
+        self.assertIsNone(restarted.lookup(self.model_path))
+        restarted.refresh([self.model_path], wait=True)
+        self.assertEqual(GGUFIndex(index_path).lookup(self.model_path)["n_layers"], 8)
+
+    def test_model_manager_estimates_weights_plus_kv_cache(self):
+        index = GGUFIndex()
+        model_configs = {"tiny": {"type": "llama", "path": self.model_path, "n_context": 1024}}
+        manager = ModelManager(model_configs, memory_budget=10**9, model_index=index)
+        file_size = os.path.getsize(self.model_path)
+
+        # Until the header is indexed the file size is used, and not remembered.
+        self.assertEqual(manager.estimate_model_memory("tiny"), file_size)
+        index.refresh([self.model_path], wait=True)
+        self.assertEqual(manager.estimate_model_memory("tiny"), file_size + 4 * 1024 * 2 * 64 * 2)
+
+        model_configs["tiny"]["speculative"] = {"method": "prompt_lookup"}
+        manager.model_footprints.clear()
+        self.assertEqual(manager.estimate_model_memory("tiny"), file_size + 4 * 1024 * 2 * 64 * 2 + 1024 * 3 * 4)
+
+        metadata = manager.get_model_metadata("tiny")
+        self.assertEqual(metadata["architecture"], "llama")
+        self.assertEqual(metadata["file_size"], file_size)
+        self.assertEqual(metadata["estimated_memory"], manager.estimate_model_memory("tiny"))
+
+
+if __name__ == "__main__":
+    unittest.main()
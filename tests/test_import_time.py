@@ -0,0 +1,16 @@
+import unittest
+from benchmarks.import_time import measure_import
+
+
+class TestStartupImports(unittest.TestCase):
+
+    def test_service_import_leaves_backends_unloaded(self):
+        _, cumulative, imported = measure_import("service")
+
+        self.assertEqual(imported, [])
+        self.assertIn("models.wrapper_factory", cumulative)
+        self.assertNotIn("models.llama", cumulative)
+
+
+if __name__ == "__main__":
+    unittest.main()
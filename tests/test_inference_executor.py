@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+import unittest
+from utils.inference_executor import InferenceExecutor
+
+
+class TestInferenceExecutor(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.executor = InferenceExecutor(max_workers=2, stream_queue_size=2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    async def test_run_does_not_block_event_loop(self):
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(self.executor.run(time.sleep, 0.2), ticker())
+
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(ticks[-1] - ticks[0], 0.15)
+
+    async def test_management_is_not_queued_behind_busy_workers(self):
+        release = threading.Event()
+        busy = [asyncio.ensure_future(self.executor.run(release.wait)) for _ in range(2)]
+
+        self.assertEqual(await asyncio.wait_for(self.executor.manage(lambda: "leased"), timeout=1), "leased")
+        release.set()
+        await asyncio.gather(*busy)
+
+    async def test_iterate_yields_items_in_order(self):
+        items = [item async for item in self.executor.iterate(lambda n: iter(range(n)), 10)]
+        self.assertEqual(items, list(range(10)))
+
+    async def test_iterate_applies_backpressure(self):
+        produced = []
+
+        def generate():
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        stream = self.executor.iterate(generate)
+        self.assertEqual(await stream.__anext__(), 0)
+        await asyncio.sleep(0.2)
+
+        # One item consumed plus at most the queue size buffered, plus one pending in the producer.
+        self.assertLessEqual(len(produced), 4)
+        await stream.aclose()
+
+    async def test_iterate_propagates_errors(self):
+        def failing():
+            yield 1
+            raise RuntimeError("generation failed")
+
+        received = []
+        with self.assertRaises(RuntimeError):
+            async for item in self.executor.iterate(failing):
+                received.append(item)
+        self.assertEqual(received, [1])
+
+    async def test_early_exit_closes_generator(self):
+        closed = threading.Event()
+
+        def generate():
+            try:
+                for i in range(100):
+                    yield i
+            finally:
+                closed.set()
+
+        stream = self.executor.iterate(generate)
+        await stream.__anext__()
+        await stream.aclose()
+
+        self.assertTrue(await self.executor.run(closed.wait, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch
+from utils import memory_probe
+
+GiB = 1024**3
+
+
+class TestWaitForReclaim(unittest.TestCase):
+
+    def _wait(self, rss_samples, expected_bytes=10 * GiB):
+        with patch.object(memory_probe, "process_rss", side_effect=rss_samples) as rss:
+            reclaimed = memory_probe.wait_for_reclaim(12 * GiB, expected_bytes, poll_secs=0)
+        return reclaimed, rss.call_count
+
+    def test_returns_once_memory_is_given_back(self):
+        reclaimed, polls = self._wait([8 * GiB, 2 * GiB, 2 * GiB])
+        self.assertEqual(reclaimed, 10 * GiB)
+        self.assertEqual(polls, 2)
+
+    def test_gives_up_when_rss_stops_falling(self):
+        reclaimed, polls = self._wait([9 * GiB, 9 * GiB, 9 * GiB, 1 * GiB])
+        self.assertEqual(reclaimed, 3 * GiB)
+        self.assertEqual(polls, 3)
+
+    def test_timeout(self):
+        with patch.object(memory_probe, "process_rss", side_effect=[12 * GiB - i for i in range(1, 1000)]):
+            reclaimed = memory_probe.wait_for_reclaim(12 * GiB, 10 * GiB, timeout_secs=0, poll_secs=0)
+        self.assertEqual(reclaimed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from models.memory_watchdog import MemoryWatchdog
+
+GiB = 1024**3
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+
+    def setUp(self):
+        self.model_manager = MagicMock()
+        self.model_manager.shrink_caches.return_value = GiB
+        self.model_manager.unload_idle_model.return_value = "a"
+        self.response_cache = MagicMock()
+        self.metrics = MagicMock()
+        self.watchdog = MemoryWatchdog(
+            self.model_manager, min_available=2 * GiB, response_cache=self.response_cache, metrics=self.metrics
+        )
+
+    @patch("models.memory_watchdog.available_memory", return_value=8 * GiB)
+    def test_no_action_without_pressure(self, _):
+        self.assertIsNone(self.watchdog.check())
+
+        self.model_manager.shrink_caches.assert_not_called()
+        self.model_manager.unload_idle_model.assert_not_called()
+        self.metrics.set_available_memory.assert_called_once_with(8 * GiB)
+
+    @patch("models.memory_watchdog.available_memory", return_value=GiB)
+    def test_caches_are_dropped_before_models_are_unloaded(self, _):
+        self.assertEqual(self.watchdog.check(), "shrink_caches")
+        self.response_cache.clear.assert_called_once()
+        self.model_manager.unload_idle_model.assert_not_called()
+
+        self.assertEqual(self.watchdog.check(), "unload_model")
+        self.assertEqual(self.watchdog.check(), "unload_model")
+        self.model_manager.shrink_caches.assert_called_once()
+        self.assertEqual(self.model_manager.unload_idle_model.call_count, 2)
+        self.metrics.record_pressure_action.assert_called_with("unload_model")
+
+    def test_caches_are_dropped_again_after_pressure_subsides(self):
+        with patch("models.memory_watchdog.available_memory", side_effect=[GiB, 8 * GiB, GiB]):
+            self.assertEqual(self.watchdog.check(), "shrink_caches")
+            self.assertIsNone(self.watchdog.check())
+            self.assertEqual(self.watchdog.check(), "shrink_caches")
+
+    @patch("models.memory_watchdog.available_memory", return_value=GiB)
+    def test_nothing_to_unload(self, _):
+        self.model_manager.unload_idle_model.return_value = None
+        self.watchdog.check()
+
+        self.assertIsNone(self.watchdog.check())
+        self.assertEqual(self.watchdog.get_stats()["unloads"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
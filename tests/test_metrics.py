@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+from prometheus_client import CollectorRegistry
+from models.model_manager import ModelManager
+from models.scheduler import RequestScheduler
+from utils.metrics import RequestMetrics, ServiceMetrics
+
+
+class TestServiceMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = CollectorRegistry()
+        self.metrics = ServiceMetrics(registry=self.registry)
+
+    def _value(self, name, **labels):
+        return self.registry.get_sample_value(f"bentoswitch_{name}", labels)
+
+    def test_streamed_request_timings(self):
+        with patch("utils.metrics.time.perf_counter", side_effect=[10.0, 10.5, 11.0, 12.0]):
+            request = RequestMetrics(self.metrics, "m")
+            request.start_generation()
+            for _ in range(3):
+                request.token()
+            request.finish()
+
+        self.assertEqual(self._value("time_to_first_token_seconds_sum", model="m"), 1.0)
+        self.assertEqual(self._value("prompt_eval_seconds_sum", model="m"), 0.5)
+        self.assertEqual(self._value("request_latency_seconds_sum", model="m"), 2.0)
+        self.assertEqual(self._value("tokens_per_second_sum", model="m"), 2.0)
+
+    def test_non_streaming_request_timings(self):
+        with patch("utils.metrics.time.perf_counter", side_effect=[0.0, 1.0, 3.0]):
+            request = RequestMetrics(self.metrics, "m")
+            request.start_generation()
+            request.finish(completion_tokens=40)
+
+        self.assertEqual(self._value("tokens_per_second_sum", model="m"), 20.0)
+        self.assertEqual(self._value("time_to_first_token_seconds_sum", model="m"), 3.0)
+        self.assertIsNone(self._value("prompt_eval_seconds_count", model="m"))
+
+    def test_speculative_decoding_is_published_by_decoding_mode(self):
+        request = RequestMetrics(self.metrics, "m")
+        request.record_speculation(
+            {"enabled": True, "tokens_per_sec": 12.0, "drafted_tokens": 20, "accepted_tokens": 15}
+        )
+        request.finish()
+        request = RequestMetrics(self.metrics, "m")
+        request.record_speculation({"enabled": False, "tokens_per_sec": 8.0})
+        request.finish()
+
+        self.assertEqual(self._value("effective_tokens_per_second_sum", model="m", decoding="speculative"), 12.0)
+        self.assertEqual(self._value("effective_tokens_per_second_sum", model="m", decoding="plain"), 8.0)
+        self.assertEqual(self._value("speculative_tokens_total", model="m", result="drafted"), 20)
+        self.assertEqual(self._value("speculative_tokens_total", model="m", result="accepted"), 15)
+
+    def test_model_manager_and_scheduler_events(self):
+        with patch("models.model_manager.WrapperFactory.get_wrapper", side_effect=lambda name, config: MagicMock()):
+            manager = ModelManager({"m": {"type": "llama", "path": "/m.gguf"}}, mode="keep_loaded", metrics=self.metrics)
+            manager.switch_model("m")
+            manager.loaded_models["m"].on_prefix_lookup(True, 30)
+            manager.loaded_models["m"].on_prefix_lookup(False, 0)
+            manager._unload_model("m")
+
+        scheduler = RequestScheduler(metrics=self.metrics)
+
+        async def schedule():
+            async with scheduler.slot("m"):
+                pass
+
+        asyncio.run(schedule())
+
+        self.assertEqual(self._value("model_loads_total", model="m"), 1)
+        self.assertEqual(self._value("model_load_duration_seconds_count", model="m"), 1)
+        self.assertEqual(self._value("model_unloads_total", model="m"), 1)
+        self.assertEqual(self._value("model_switches_total", model="m"), 1)
+        self.assertEqual(self._value("admission_decisions_total", model="m", decision="admitted"), 1)
+        self.assertEqual(self._value("queue_depth", model="m"), 0)
+        self.assertEqual(self._value("cache_lookups_total", cache="prefix", result="hit"), 1)
+        self.assertEqual(self._value("cache_lookups_total", cache="prefix", result="miss"), 1)
+        self.assertEqual(self._value("prefix_cache_tokens_saved_total", model="m"), 30)
+
+    def test_token_updates_do_not_touch_prometheus(self):
+        metrics = MagicMock()
+        request = RequestMetrics(metrics, "m")
+        for _ in range(100):
+            request.token()
+
+        self.assertEqual(metrics.mock_calls, [])
+        request.finish()
+        self.assertNotEqual(metrics.mock_calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
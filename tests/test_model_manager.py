@@ -0,0 +1,488 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from models.model_manager import ModelManager
+from models.exceptions import ModelNotFoundException, ModelLoadException, ModelAdmissionException
+from models.load_state import LoadState
+
+GiB = 1024**3
+
+
+def make_wrapper(model_name, model_config):
+    wrapper = MagicMock()
+    wrapper.model_name = model_name
+    return wrapper
+
+
+class TestModelManagerPool(unittest.TestCase):
+
+    def setUp(self):
+        patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=make_wrapper
+        ).start()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi"},
+            "b": {"type": "llama", "path": "/b.gguf", "memory": "10Gi"},
+            "c": {"type": "llama", "path": "/c.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(self.model_configs, mode="keep_loaded", memory_budget=25 * GiB)
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_switch_back_to_resident_model_does_not_reload(self):
+        self.manager.switch_model("a")
+        wrapper_a = self.manager.get_current_model()
+        self.manager.switch_model("b")
+        self.manager.switch_model("a")
+
+        self.assertIs(self.manager.get_current_model(), wrapper_a)
+        self.assertEqual(self.manager.get_loaded_model_names(), ["b", "a"])
+        self.assertEqual(self.manager.stats["loads"], 2)
+        self.assertEqual(self.manager.stats["resident_hits"], 1)
+        wrapper_a.cleanup.assert_not_called()
+
+    def test_least_recently_used_model_is_evicted(self):
+        self.manager.switch_model("a")
+        self.manager.switch_model("b")
+        self.manager.switch_model("a")
+        self.manager.switch_model("c")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), ["a", "c"])
+        self.assertEqual(self.manager.get_current_model_name(), "c")
+        self.assertEqual(self.manager.stats["evictions"], 1)
+
+    def test_pinned_model_is_not_evicted(self):
+        self.model_configs["a"]["pinned"] = True
+        self.manager.switch_model("a")
+        self.manager.switch_model("b")
+        self.manager.switch_model("c")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), ["a", "c"])
+
+    def test_zero_budget_keeps_single_model(self):
+        manager = ModelManager(self.model_configs, mode="keep_loaded", memory_budget=0)
+        manager.switch_model("a")
+        manager.switch_model("b")
+
+        self.assertEqual(manager.get_loaded_model_names(), ["b"])
+
+    def test_status_does_not_wait_for_the_lock(self):
+        self.manager.switch_model("a")
+        held = threading.Event()
+        release = threading.Event()
+        released = []
+
+        def hold_lock():
+            with self.manager._lock:
+                held.set()
+                released.append(release.wait(2))
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        held.wait(2)
+        try:
+            self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.READY})
+            self.assertEqual(self.manager.get_pool_info()["loaded_models"], ["a"])
+        finally:
+            release.set()
+            thread.join()
+        # The lock was still held when both calls returned.
+        self.assertEqual(released, [True])
+
+    def test_fits_without_eviction(self):
+        self.manager.switch_model("a")
+
+        self.assertTrue(self.manager.fits_without_eviction("a"))
+        self.assertTrue(self.manager.fits_without_eviction("b"))
+        self.manager.switch_model("b")
+        # c only fits the 25Gi budget by evicting a.
+        self.assertFalse(self.manager.fits_without_eviction("c"))
+
+    def test_unknown_model_raises(self):
+        with self.assertRaises(ModelNotFoundException):
+            self.manager.switch_model("missing")
+
+    def test_off_mode_unloads_everything(self):
+        self.manager.switch_model("a")
+        self.manager.switch_model("b")
+        self.manager.set_mode("off")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), [])
+        self.assertIsNone(self.manager.get_current_model())
+
+    def test_pool_info(self):
+        self.manager.switch_model("a")
+        info = self.manager.get_pool_info()
+
+        self.assertEqual(info["loaded_models"], ["a"])
+        self.assertEqual(info["memory_used"], 10 * GiB)
+        self.assertEqual(info["memory_budget"], 25 * GiB)
+
+
+class TestModelManagerLeases(unittest.TestCase):
+
+    def setUp(self):
+        patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=make_wrapper
+        ).start()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi"},
+            "b": {"type": "llama", "path": "/b.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(self.model_configs, mode="dynamic", memory_budget=15 * GiB)
+
+    def tearDown(self):
+        self.manager._cancel_unload_timer()
+        patch.stopall()
+
+    def test_leases_on_same_model_are_concurrent(self):
+        first = self.manager.acquire_model("a")
+        second = self.manager.acquire_model("a")
+
+        self.assertIs(first.wrapper, second.wrapper)
+        self.assertEqual(self.manager.get_lease_count("a"), 2)
+        first.release()
+        second.release()
+        self.assertEqual(self.manager.get_lease_count("a"), 0)
+
+    def test_eviction_waits_for_leases_to_drain(self):
+        lease = self.manager.acquire_model("a")
+        wrapper_a = lease.wrapper
+
+        switched = threading.Event()
+
+        def switch():
+            self.manager.switch_model("b")
+            switched.set()
+
+        thread = threading.Thread(target=switch)
+        thread.start()
+
+        self.assertFalse(switched.wait(0.2))
+        wrapper_a.cleanup.assert_not_called()
+
+        lease.release()
+        thread.join(timeout=2)
+        self.assertTrue(switched.is_set())
+        wrapper_a.cleanup.assert_called_once()
+        self.assertEqual(self.manager.get_loaded_model_names(), ["b"])
+
+    def test_off_mode_waits_for_leases_without_the_lock(self):
+        lease = self.manager.acquire_model("a")
+        thread = threading.Thread(target=self.manager.set_mode, args=("off",))
+        thread.start()
+        deadline = time.monotonic() + 2
+        while self.manager.is_model_loaded("a") and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertTrue(self.manager._lock.acquire(timeout=1))
+        self.manager._lock.release()
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.UNLOADING})
+        lease.wrapper.cleanup.assert_not_called()
+
+        lease.release()
+        thread.join(timeout=2)
+        lease.wrapper.cleanup.assert_called_once()
+        self.assertEqual(self.manager.get_loaded_model_names(), [])
+
+    def test_idle_unload_skips_leased_models(self):
+        self.manager.model_unload_delay_secs = 0
+        with self.manager.acquire_model("a") as wrapper:
+            self.manager._unload_idle_models()
+            self.assertTrue(self.manager.is_model_loaded("a"))
+            wrapper.cleanup.assert_not_called()
+
+        self.manager._unload_idle_models()
+        self.assertFalse(self.manager.is_model_loaded("a"))
+
+    def test_idle_unload_tears_down_without_the_lock(self):
+        self.manager.model_unload_delay_secs = 0
+        self.manager.switch_model("a")
+        wrapper_a = self.manager.get_current_model()
+        release = threading.Event()
+        finished = threading.Event()
+        wrapper_a.cleanup.side_effect = lambda: (release.wait(2), finished.set())
+
+        self.manager._unload_idle_models()
+        # The teardown is still running, yet other models can be loaded.
+        self.assertFalse(finished.is_set())
+        self.manager.switch_model("b")
+        self.assertEqual(self.manager.get_loaded_model_names(), ["b"])
+        release.set()
+        self.assertTrue(finished.wait(2))
+
+    @patch("models.model_manager.available_memory", return_value=100 * GiB)
+    def test_load_overlaps_teardown_when_memory_is_free(self, _):
+        self.manager.memory_budget = 0
+        lease = self.manager.acquire_model("a")
+
+        # b loads while a is still leased and waiting to be torn down.
+        self.manager.switch_model("b")
+        self.assertEqual(self.manager.get_loaded_model_names(), ["b"])
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.UNLOADING})
+        self.assertEqual(self.manager.stats["overlapped_loads"], 1)
+        lease.wrapper.cleanup.assert_not_called()
+
+        lease.release()
+        with self.manager._memory_released:
+            self.assertTrue(self.manager._memory_released.wait_for(lambda: not self.manager._unloading, timeout=2))
+        lease.wrapper.cleanup.assert_called_once()
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.COLD})
+
+
+class TestModelManagerBackgroundLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.release_load = threading.Event()
+        self.get_wrapper = patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=self._slow_wrapper
+        ).start()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi"},
+            "broken": {"type": "llama", "path": "/broken.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(self.model_configs, mode="keep_loaded", memory_budget=25 * GiB)
+
+    def tearDown(self):
+        self.release_load.set()
+        patch.stopall()
+
+    def _slow_wrapper(self, model_name, model_config):
+        self.release_load.wait(2)
+        if model_name == "broken":
+            raise RuntimeError("bad gguf")
+        return make_wrapper(model_name, model_config)
+
+    def test_switch_without_wait_returns_while_loading(self):
+        state = self.manager.switch_model("a", wait=False)
+
+        self.assertEqual(state["state"], LoadState.LOADING)
+        self.assertEqual(self.manager.get_model_state("a")["state"], LoadState.LOADING)
+        self.release_load.set()
+        self.manager.start_load("a").result(timeout=2)
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.READY})
+        self.assertEqual(self.manager.get_current_model_name(), "a")
+
+    def test_concurrent_requests_share_one_load(self):
+        futures = [self.manager.start_load("a") for _ in range(5)]
+        self.release_load.set()
+
+        wrappers = {id(future.result(timeout=2)) for future in futures}
+        self.assertEqual(len(wrappers), 1)
+        self.assertEqual(self.get_wrapper.call_count, 1)
+        self.assertEqual(self.manager.stats["loads"], 1)
+
+    def test_failed_load_is_reported(self):
+        self.release_load.set()
+        with self.assertRaises(ModelLoadException):
+            self.manager.acquire_model("broken")
+
+        state = self.manager.get_model_state("broken")
+        self.assertEqual(state["state"], LoadState.FAILED)
+        self.assertIn("bad gguf", state["error"])
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.COLD})
+
+
+class TestModelManagerConfigReload(unittest.TestCase):
+
+    def setUp(self):
+        self.get_wrapper = patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=make_wrapper
+        ).start()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi", "default_params": {"temperature": 0.7}},
+            "b": {"type": "llama", "path": "/b.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(dict(self.model_configs), mode="keep_loaded", memory_budget=25 * GiB)
+        self.manager.switch_model("b")
+        self.manager.switch_model("a")
+
+    def tearDown(self):
+        patch.stopall()
+
+    def _wait_for_teardowns(self):
+        with self.manager._memory_released:
+            self.assertTrue(self.manager._memory_released.wait_for(lambda: not self.manager._unloading, timeout=2))
+
+    def test_sampling_change_applies_in_place(self):
+        wrapper_a = self.manager.get_current_model()
+        changes = self.manager.apply_configs(
+            {**self.model_configs, "a": {**self.model_configs["a"], "default_params": {"temperature": 0.1}}}
+        )
+
+        self.assertEqual(changes["updated"], ["a"])
+        self.assertEqual(changes["unchanged"], ["b"])
+        self.assertIs(self.manager.get_current_model(), wrapper_a)
+        self.assertEqual(wrapper_a.default_params, {"temperature": 0.1})
+        wrapper_a.compile_templates.assert_called()
+        self.assertEqual(self.manager.stats["loads"], 2)
+
+    def test_path_change_reloads_only_that_model(self):
+        wrapper_a = self.manager.loaded_models["a"]
+        wrapper_b = self.manager.loaded_models["b"]
+        changes = self.manager.apply_configs({**self.model_configs, "a": {**self.model_configs["a"], "path": "/a2.gguf"}})
+        self.manager.start_load("a").result(timeout=2)
+        self._wait_for_teardowns()
+
+        self.assertEqual(changes["reloaded"], ["a"])
+        self.assertIsNot(self.manager.loaded_models["a"], wrapper_a)
+        self.assertIs(self.manager.loaded_models["b"], wrapper_b)
+        wrapper_a.cleanup.assert_called_once()
+        wrapper_b.cleanup.assert_not_called()
+        self.assertEqual(self.get_wrapper.call_args.args[1]["path"], "/a2.gguf")
+
+    def test_added_and_removed_models(self):
+        wrapper_b = self.manager.loaded_models["b"]
+        changes = self.manager.apply_configs(
+            {"a": self.model_configs["a"], "c": {"type": "llama", "path": "/c.gguf", "memory": "10Gi"}}
+        )
+        self._wait_for_teardowns()
+
+        self.assertEqual(changes["added"], ["c"])
+        self.assertEqual(changes["removed"], ["b"])
+        self.assertEqual(self.manager.get_loaded_model_names(), ["a"])
+        wrapper_b.cleanup.assert_called_once()
+        with self.assertRaises(ModelNotFoundException):
+            self.manager.switch_model("b")
+
+    def test_invalid_config_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.manager.apply_configs({**self.model_configs, "c": {"type": "unknown", "path": "/c.bin"}})
+
+        self.assertEqual(set(self.manager.get_model_configs()), {"a", "b"})
+
+    def test_model_loading_during_reload_is_loaded_again(self):
+        self.manager._unload_all_models()
+        release_load = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_wrapper(model_name, model_config):
+            started.release()
+            release_load.wait(2)
+            return make_wrapper(model_name, model_config)
+
+        self.get_wrapper.reset_mock()
+        self.get_wrapper.side_effect = slow_wrapper
+        future = self.manager.start_load("a")
+        self.assertTrue(started.acquire(timeout=2))
+        self.manager.apply_configs({**self.model_configs, "a": {**self.model_configs["a"], "n_context": 4096}})
+        release_load.set()
+
+        future.result(timeout=2)
+        self.assertEqual(self.get_wrapper.call_count, 2)
+        self.assertEqual(self.get_wrapper.call_args.args[1]["n_context"], 4096)
+        self.assertEqual(self.manager.get_model_state("a"), {"state": LoadState.READY})
+
+    def test_sampling_change_during_load_applies_to_the_loaded_model(self):
+        self.manager._unload_all_models()
+        release_load = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_wrapper(model_name, model_config):
+            started.release()
+            release_load.wait(2)
+            return make_wrapper(model_name, model_config)
+
+        self.get_wrapper.reset_mock()
+        self.get_wrapper.side_effect = slow_wrapper
+        future = self.manager.start_load("a")
+        self.assertTrue(started.acquire(timeout=2))
+        changes = self.manager.apply_configs(
+            {**self.model_configs, "a": {**self.model_configs["a"], "default_params": {"temperature": 0.1}}}
+        )
+        release_load.set()
+
+        wrapper = future.result(timeout=2)
+        self.assertEqual(changes["updated"], ["a"])
+        self.assertEqual(self.get_wrapper.call_count, 1)
+        self.assertEqual(wrapper.default_params, {"temperature": 0.1})
+
+
+class TestModelManagerAdmission(unittest.TestCase):
+
+    def setUp(self):
+        patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=make_wrapper
+        ).start()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi", "pinned": True},
+            "b": {"type": "llama", "path": "/b.gguf", "memory": "10Gi", "pinned": True},
+            "c": {"type": "llama", "path": "/c.gguf", "memory": "10Gi"},
+            "huge": {"type": "llama", "path": "/huge.gguf", "memory": "40Gi"},
+        }
+        self.metrics = MagicMock()
+        self.manager = ModelManager(
+            self.model_configs, mode="keep_loaded", memory_budget=25 * GiB,
+            metrics=self.metrics, admission_timeout_secs=0.1,
+        )
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_model_larger_than_budget_is_refused(self):
+        with self.assertRaises(ModelAdmissionException):
+            self.manager.switch_model("huge")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), [])
+        self.assertEqual(self.manager.stats["admission_refusals"], 1)
+        self.metrics.record_admission.assert_called_with("huge", "refused")
+        self.metrics.record_load_failure.assert_not_called()
+
+    def test_load_waits_for_pinned_model_to_be_unloaded(self):
+        self.manager.admission_timeout_secs = 2
+        self.manager.switch_model("a")
+        self.manager.switch_model("b")
+
+        thread = threading.Thread(target=self.manager.switch_model, args=("c",))
+        thread.start()
+        thread.join(timeout=0.2)
+        self.assertTrue(thread.is_alive())
+
+        self.manager._unload_model("a")
+        thread.join(timeout=2)
+        self.assertEqual(self.manager.get_loaded_model_names(), ["b", "c"])
+        self.assertEqual(self.manager.stats["admission_waits"], 1)
+        self.metrics.record_admission.assert_any_call("c", "queued")
+        self.metrics.record_admission.assert_called_with("c", "admitted")
+
+    def test_queued_load_is_refused_after_timeout(self):
+        self.manager.switch_model("a")
+        self.manager.switch_model("b")
+
+        with self.assertRaises(ModelAdmissionException):
+            self.manager.switch_model("c")
+        self.assertEqual(self.manager.get_loaded_model_names(), ["a", "b"])
+
+    @patch("models.model_manager.available_memory", return_value=5 * GiB)
+    def test_load_is_refused_when_the_system_lacks_memory(self, _):
+        self.manager.check_available_memory = True
+
+        with self.assertRaises(ModelAdmissionException):
+            self.manager.switch_model("c")
+        self.metrics.record_admission.assert_any_call("c", "queued")
+
+    @patch("models.model_manager.available_memory", return_value=12 * GiB)
+    def test_admission_keeps_the_watchdog_floor_free(self, _):
+        self.manager.check_available_memory = True
+        self.manager.min_available_memory = 4 * GiB
+
+        with self.assertRaises(ModelAdmissionException):
+            self.manager.switch_model("c")
+
+        self.manager.min_available_memory = 2 * GiB
+        self.manager.switch_model("c")
+        self.assertEqual(self.manager.get_loaded_model_names(), ["c"])
+
+    def test_unload_idle_model_skips_pinned_and_leased_models(self):
+        self.manager.switch_model("a")
+        lease = self.manager.acquire_model("c")
+
+        self.assertIsNone(self.manager.unload_idle_model())
+        lease.release()
+        self.assertEqual(self.manager.unload_idle_model(), "c")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from models.model_manager import ModelManager
+from models.page_cache import PageCacheWarmer, resident_bytes
+
+GiB = 1024**3
+
+
+class TestPageCacheWarmer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.directory.name, "model.gguf")
+        with open(self.model_path, "wb") as file:
+            file.write(os.urandom(64 * mmap.PAGESIZE))
+        self.metrics = MagicMock()
+        self.warmer = PageCacheWarmer(max_bytes_per_sec=0, chunk_bytes=8 * mmap.PAGESIZE, metrics=self.metrics)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resident_bytes_is_measured(self):
+        resident = resident_bytes(self.model_path)
+        if resident is None:
+            self.skipTest("mincore is not available")
+        self.assertGreaterEqual(resident, 0)
+        self.assertLessEqual(resident, 64 * mmap.PAGESIZE)
+        self.assertIsNone(resident_bytes(os.path.join(self.directory.name, "missing.gguf")))
+
+    @patch("models.page_cache.page_residency", return_value=None)
+    def test_whole_file_is_read_without_residency_information(self, _):
+        self.assertEqual(self.warmer.warm_file("m", self.model_path), 64 * mmap.PAGESIZE)
+        self.assertEqual(self.warmer.files["m"]["state"], "warm")
+        self.metrics.record_prewarm.assert_called_once_with("m", 64 * mmap.PAGESIZE)
+
+    def test_resident_chunks_are_skipped(self):
+        # The first two chunks are cached, the third only partly.
+        residency = bytearray([1] * 20 + [0] * 44)
+        with patch("models.page_cache.page_residency", return_value=residency):
+            read_bytes = self.warmer.warm_file("m", self.model_path)
+        self.assertEqual(read_bytes, 6 * 8 * mmap.PAGESIZE)
+
+    @patch("models.page_cache.page_residency", return_value=None)
+    def test_reads_are_paced_to_the_bandwidth_cap(self, _):
+        self.warmer.max_bytes_per_sec = 64 * mmap.PAGESIZE
+        with patch("models.page_cache.time.monotonic", return_value=0.0), patch("models.page_cache.time.sleep") as sleep:
+            self.warmer.warm_file("m", self.model_path)
+        # After each of the 8 chunks the warmer is an eighth of a second further ahead.
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [i / 8 for i in range(1, 9)])
+
+    @patch("models.page_cache.available_memory", return_value=mmap.PAGESIZE)
+    def test_file_larger_than_available_memory_is_skipped(self, _):
+        self.assertEqual(self.warmer.warm_file("m", self.model_path), 0)
+        self.assertEqual(self.warmer.files["m"]["state"], "skipped")
+
+    @patch("models.page_cache.threading.Thread")
+    def test_queued_file_is_not_queued_twice(self, _):
+        self.assertTrue(self.warmer.warm("m", self.model_path, "hot"))
+        self.assertFalse(self.warmer.warm("m", self.model_path, "evicted"))
+        self.assertFalse(self.warmer.warm("n", os.path.join(self.directory.name, "missing.gguf"), "hot"))
+
+        stats = self.warmer.get_stats({"m": self.model_path})
+        self.assertEqual(stats["m"]["size_bytes"], 64 * mmap.PAGESIZE)
+        self.assertEqual(stats["m"]["prewarm"], {"reason": "hot", "state": "queued", "read_bytes": 0})
+
+
+class TestModelManagerPrewarm(unittest.TestCase):
+
+    def setUp(self):
+        patch(
+            "models.model_manager.WrapperFactory.get_wrapper", side_effect=lambda name, config: MagicMock()
+        ).start()
+        self.warmer = MagicMock()
+        self.model_configs = {
+            "a": {"type": "llama", "path": "/a.gguf", "memory": "10Gi", "prewarm": True},
+            "b": {"type": "llama", "path": "/b.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(
+            self.model_configs, mode="keep_loaded", memory_budget=15 * GiB, page_cache_warmer=self.warmer
+        )
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_hot_and_evicted_models_are_warmed(self):
+        self.warmer.warm.assert_called_once_with("a", "/a.gguf", "hot")
+
+        self.manager.switch_model("b")
+        self.manager._unload_model("b")
+        self.warmer.warm.assert_called_with("b", "/b.gguf", "evicted")
+
+    def test_predicted_model_that_does_not_fit_is_warmed(self):
+        self.manager.transition_tracker = MagicMock()
+        self.manager.transition_tracker.predict.return_value = "b"
+
+        self.manager.switch_model("a")
+        self.warmer.warm.assert_called_with("b", "/b.gguf", "predicted")
+        self.assertFalse(self.manager.is_model_loaded("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
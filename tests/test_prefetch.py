@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from models.prefetch import TransitionTracker
+from models.model_manager import ModelManager
+
+GiB = 1024**3
+
+
+class TestTransitionTracker(unittest.TestCase):
+
+    def test_predicts_most_frequent_successor(self):
+        tracker = TransitionTracker(min_observations=2, min_probability=0.5)
+        for model_name in ["code", "chat", "code", "chat", "code", "other", "code"]:
+            tracker.record(model_name)
+
+        self.assertEqual(tracker.predict("code"), "chat")
+        self.assertEqual(tracker.get_transitions()["code"], {"chat": 2, "other": 1})
+
+    def test_no_prediction_without_enough_observations(self):
+        tracker = TransitionTracker(min_observations=3)
+        for model_name in ["code", "chat", "code"]:
+            tracker.record(model_name)
+
+        self.assertIsNone(tracker.predict("code"))
+        self.assertIsNone(tracker.predict("unknown"))
+
+    def test_repeated_requests_are_not_transitions(self):
+        tracker = TransitionTracker(min_observations=1)
+        for model_name in ["code", "code", "code"]:
+            tracker.record(model_name)
+
+        self.assertIsNone(tracker.predict("code"))
+
+
+class TestModelManagerPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.get_wrapper = patch(
+            "models.model_manager.WrapperFactory.get_wrapper",
+            side_effect=lambda name, config: MagicMock(model_name=name),
+        ).start()
+        self.model_configs = {
+            "code": {"type": "llama", "path": "/code.gguf", "memory": "10Gi"},
+            "chat": {"type": "llama", "path": "/chat.gguf", "memory": "10Gi"},
+            "other": {"type": "llama", "path": "/other.gguf", "memory": "10Gi"},
+        }
+        self.manager = ModelManager(
+            self.model_configs, mode="keep_loaded", memory_budget=25 * GiB, prefetch=True
+        )
+        self.manager.transition_tracker.min_observations = 1
+
+    def tearDown(self):
+        patch.stopall()
+
+    def _prefetch_synchronously(self):
+        return patch(
+            "models.model_manager.threading.Thread",
+            side_effect=lambda target, args, daemon: MagicMock(start=lambda: target(*args)),
+        )
+
+    def test_predicted_model_is_prefetched_and_counted_as_hit(self):
+        with self._prefetch_synchronously():
+            self.manager.switch_model("code")
+            self.manager.switch_model("chat")
+            self.manager.switch_model("code")
+
+        self.assertIn("chat", self.manager.loaded_models)
+        self.assertNotIn("chat", self.manager.prefetched_models)
+
+        self.manager._unload_model("chat")
+        with self._prefetch_synchronously():
+            self.manager.switch_model("code")
+        self.assertIn("chat", self.manager.prefetched_models)
+
+        self.manager.switch_model("chat")
+        self.assertEqual(self.manager.stats["prefetch_hits"], 1)
+
+    def test_unused_prefetch_is_evicted_first_and_counted_as_miss(self):
+        with self._prefetch_synchronously():
+            self.manager.switch_model("code")
+            self.manager.switch_model("chat")
+            self.manager._unload_model("chat")
+            self.manager.switch_model("code")
+        self.assertIn("chat", self.manager.prefetched_models)
+
+        self.manager.switch_model("other")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), ["code", "other"])
+        self.assertEqual(self.manager.stats["prefetch_misses"], 1)
+
+    def test_no_prefetch_when_budget_is_full(self):
+        self.manager.memory_budget = 15 * GiB
+        with self._prefetch_synchronously():
+            self.manager.switch_model("code")
+            self.manager.switch_model("chat")
+            self.manager.switch_model("code")
+
+        self.assertEqual(self.manager.get_loaded_model_names(), ["code"])
+        self.assertEqual(self.manager.prefetched_models, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from api.raw_completion import _generate_raw_completion
+from api.schemas import RawCompletionRequest
+from models.base import BaseModelWrapper
+from models.model_manager import ModelManager
+from utils.inference_executor import InferenceExecutor
+
+
+class EchoWrapper(BaseModelWrapper):
+    def load_model(self):
+        return None
+
+    def create_prompt(self, messages, max_tokens=None):
+        return messages[-1].content
+
+    def get_response(self, prompt, **kwargs):
+        if kwargs.get("stream"):
+            return ({"choices": [{"text": prompt}]} for _ in range(1))
+        return {"choices": [{"text": prompt}], "usage": {"completion_tokens": 1}}
+
+    def format_output(self, raw_output):
+        return raw_output
+
+    def cleanup(self):
+        pass
+
+
+class TestRawCompletion(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = InferenceExecutor(max_workers=2)
+        wrapper = EchoWrapper("m", "/m.gguf", {"stream": True})
+        with patch("models.model_manager.WrapperFactory.get_wrapper", return_value=wrapper):
+            self.manager = ModelManager({"m": {"type": "llama", "path": "/m.gguf"}}, mode="keep_loaded")
+            self.manager.switch_model("m")
+        self.service = SimpleNamespace(model_manager=self.manager, executor=self.executor, response_cache=None, metrics=None)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def test_streaming_requests_get_the_whole_completion(self):
+        request = RawCompletionRequest(messages=[{"role": "user", "content": "hi"}], stream=True)
+
+        response = await _generate_raw_completion(self.service, "m", request)
+
+        self.assertEqual(response.raw_output["choices"][0]["text"], "hi")
+        self.assertEqual(self.manager.model_leases["m"].count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
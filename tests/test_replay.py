@@ -0,0 +1,99 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmarks.replay import load_requests, parse_model_mix, percentile, plan_arrivals, replay
+
+
+def make_app():
+    app = FastAPI()
+    state = {"switches": 0, "model": None}
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        if body.get("model") == "broken":
+            return JSONResponse({"detail": "bad gguf"}, status_code=500)
+        if body.get("model") != state["model"]:
+            state["model"] = body.get("model")
+            state["switches"] += 1
+        if not body.get("stream", True):
+            return {"choices": [{"message": {"content": "done"}}], "usage": {"completion_tokens": 5}}
+
+        async def frames():
+            for text in ("abcd", "efgh"):
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    @app.get("/service-info")
+    async def service_info():
+        return {"scheduler": {"switches": state["switches"]}}
+
+    return app
+
+
+class TestReplay(unittest.IsolatedAsyncioTestCase):
+
+    async def test_summary_counts_latency_tokens_switches_and_errors(self):
+        planned = plan_arrivals(
+            [
+                {"model": "a", "messages": []},
+                {"model": "a", "messages": [], "stream": False},
+                {"model": "b", "messages": []},
+                {"model": "broken", "messages": []},
+            ]
+        )
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            summary = await replay(client, planned, concurrency=1)
+
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["completed"], 3)
+        self.assertEqual(summary["error_rate"], 0.25)
+        self.assertEqual(summary["errors"], {"http_500": 1})
+        # Two streams of 8 characters (3 estimated tokens each) and 5 reported tokens.
+        self.assertEqual(summary["completion_tokens"], 11)
+        self.assertEqual(summary["model_switches"], {"arrival_order": 2, "service": 2})
+        self.assertEqual(summary["models"]["a"]["requests"], 2)
+        self.assertIsNotNone(summary["latency"]["p99"])
+        self.assertIsNotNone(summary["ttft"]["p50"])
+
+    def test_load_requests_accepts_prompt_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "requests.jsonl")
+            with open(path, "w") as file:
+                file.write(json.dumps({"model": "a", "messages": [{"role": "user", "content": "hi"}], "at": 1.5}) + "\n")
+                file.write("\n" + json.dumps({"request_id": "r1", "body": "summarise this"}) + "\n")
+                file.write(json.dumps({"request_id": "r2"}) + "\n")
+            requests = load_requests(path)
+
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(requests[1]["messages"], [{"role": "user", "content": "summarise this"}])
+        self.assertEqual([offset for offset, _ in plan_arrivals(requests)], [1.5, None])
+
+    def test_poisson_arrivals_are_seeded_and_increasing(self):
+        requests = [{"messages": []}] * 50
+        first = plan_arrivals(requests, rate=10, rng=random.Random(1))
+        second = plan_arrivals(requests, rate=10, rng=random.Random(1))
+
+        offsets = [offset for offset, _ in first]
+        self.assertEqual(offsets, [offset for offset, _ in second])
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertAlmostEqual(offsets[-1] / 49, 0.1, delta=0.05)
+
+    def test_percentiles_and_model_mix(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertIsNone(percentile([], 95))
+        self.assertEqual(parse_model_mix("a=3, b"), {"a": 3.0, "b": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.generation import generate, lookup_response
+from utils.response_cache import ResponseCache
+
+MODEL_CONFIG = {"type": "llama", "path": "/missing.gguf", "default_params": {"temperature": 0.7}}
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def _key(self, prompt="Hello", config=MODEL_CONFIG, **params):
+        params = {"temperature": 0, "max_tokens": 10, **params}
+        return ResponseCache.make_key("model", config, prompt, params)
+
+    def test_only_deterministic_requests_are_cacheable(self):
+        self.assertTrue(ResponseCache.is_cacheable({"temperature": 0}))
+        self.assertTrue(ResponseCache.is_cacheable({"temperature": 0.8, "seed": 42}))
+        self.assertFalse(ResponseCache.is_cacheable({"temperature": 0.8}))
+
+    def test_key_depends_on_prompt_params_and_config(self):
+        key = self._key()
+        self.assertEqual(key, self._key())
+        self.assertNotEqual(key, self._key(prompt="Bye"))
+        self.assertNotEqual(key, self._key(max_tokens=20))
+        self.assertNotEqual(key, self._key(config={**MODEL_CONFIG, "n_context": 4096}))
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("model", "a", 1)
+        cache.put("model", "b", 2)
+        cache.get("model", "a")
+        cache.put("model", "c", 3)
+
+        self.assertEqual(cache.get("model", "a"), 1)
+        self.assertIsNone(cache.get("model", "b"))
+        self.assertEqual(cache.get_stats()["hits"], 2)
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl_secs=10)
+        with patch("utils.response_cache.time.time", return_value=1000):
+            cache.put("model", "a", 1)
+        with patch("utils.response_cache.time.time", return_value=1011):
+            self.assertIsNone(cache.get("model", "a"))
+
+    def test_disk_tier_and_invalidation(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            ResponseCache(disk_dir=disk_dir).put("model", "a", {"choices": [{"text": "hi"}]})
+
+            cache = ResponseCache(disk_dir=disk_dir)
+            self.assertEqual(cache.get("model", "a"), {"choices": [{"text": "hi"}]})
+
+            cache.invalidate_model("model")
+            self.assertIsNone(cache.get("model", "a"))
+            self.assertIsNone(ResponseCache(disk_dir=disk_dir).get("model", "a"))
+
+    def test_disk_tier_is_swept_least_recently_used_first(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            cache = ResponseCache(max_entries=1, disk_dir=disk_dir, max_disk_entries=4)
+            for i, key in enumerate("abcd"):
+                cache.put("model", key, key)
+                written_at = time.time() - 100 + i
+                os.utime(cache._disk_path("model", key), (written_at, written_at))
+            cache.clear()
+            self.assertEqual(cache.get("model", "a"), "a")  # Read from disk, so recently used again.
+
+            cache.put("model", "e", "e")
+
+            self.assertEqual(cache.get_stats()["disk_entries"], 3)
+            cache.clear()
+            self.assertEqual([cache.get("model", key) for key in "abcde"], ["a", None, None, "d", "e"])
+
+    def test_expired_disk_entries_are_swept_on_start(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            ResponseCache(ttl_secs=60, disk_dir=disk_dir).put("model", "a", "a")
+
+            with patch("utils.response_cache.time.time", return_value=time.time() + 61):
+                cache = ResponseCache(ttl_secs=60, disk_dir=disk_dir)
+
+            self.assertEqual(cache.get_stats()["disk_entries"], 0)
+            self.assertEqual(os.listdir(os.path.dirname(cache._disk_path("model", "a"))), [])
+
+
+class TestResponseCacheStreaming(unittest.IsolatedAsyncioTestCase):
+
+    async def test_stream_is_recorded_and_replayed(self):
+        cache = ResponseCache()
+        chunks = [{"choices": [{"text": "Hel"}]}, {"choices": [{"text": "lo"}]}]
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        passed_through = [c async for c in cache.record_stream("model", "key", stream())]
+        replayed = [c async for c in ResponseCache.replay_stream(cache.get("model", "key"))]
+
+        self.assertEqual(passed_through, chunks)
+        self.assertEqual(replayed, chunks)
+
+
+class TestResponseLookup(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        model_manager = MagicMock()
+        model_manager.get_model_configs.return_value = {"model": MODEL_CONFIG}
+        executor = SimpleNamespace(run=AsyncMock(side_effect=lambda fn, *args, **kwargs: fn(*args, **kwargs)))
+        self.service = SimpleNamespace(
+            response_cache=ResponseCache(), model_manager=model_manager, executor=executor, metrics=None
+        )
+        self.messages = [{"role": "user", "content": "Hello"}]
+        self.params = {"temperature": 0, "max_tokens": 10, "stream": False}
+
+    async def _generate(self, cache_key):
+        wrapper = MagicMock(model_name="model")
+        wrapper.get_response.return_value = {"choices": [{"text": "Hi"}], "usage": {"completion_tokens": 1}}
+        return await generate(self.service, wrapper, "prompt", cache_key=cache_key, **self.params)
+
+    async def test_miss_then_hit_finishes_metrics(self):
+        cache_key, cached = await lookup_response(self.service, "model", self.messages, self.params)
+        self.assertIsNone(cached)
+        response = await self._generate(cache_key)
+
+        request_metrics = MagicMock()
+        _, cached = await lookup_response(self.service, "model", self.messages, self.params, request_metrics)
+        self.assertEqual(cached, response)
+        request_metrics.finish.assert_called_once_with(completion_tokens=1)
+
+    async def test_unknown_model_and_sampled_requests_are_not_looked_up(self):
+        self.assertEqual(await lookup_response(self.service, "missing", self.messages, self.params), (None, None))
+        sampled = {**self.params, "temperature": 0.7}
+        self.assertEqual(await lookup_response(self.service, "model", self.messages, sampled), (None, None))
+
+    async def test_disk_tier_is_read_and_written_on_the_executor(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            cache = self.service.response_cache = ResponseCache(disk_dir=disk_dir)
+            cache_key, _ = await lookup_response(self.service, "model", self.messages, self.params)
+            await self._generate(cache_key)
+
+            calls = [call.args[0] for call in self.service.executor.run.call_args_list]
+            self.assertEqual((calls[0], calls[-1]), (cache.get, cache.put))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from models.scheduler import RequestScheduler
+
+
+class TestRequestScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def _run(self, scheduler, model_name, order, hold=0.01):
+        async with scheduler.slot(model_name):
+            order.append(model_name)
+            await asyncio.sleep(hold)
+
+    async def test_interleaved_requests_are_grouped_by_model(self):
+        scheduler = RequestScheduler(max_batch=10, max_wait_secs=60)
+        order = []
+        tasks = []
+        for model_name in ["a", "b", "a", "b", "a", "b"]:
+            tasks.append(asyncio.create_task(self._run(scheduler, model_name, order)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["a", "a", "a", "b", "b", "b"])
+        self.assertEqual(scheduler.switches, 2)
+        self.assertEqual(scheduler.switches_avoided, 2)
+
+    async def test_max_batch_bounds_starvation(self):
+        scheduler = RequestScheduler(max_batch=2, max_wait_secs=60)
+        order = []
+        tasks = []
+        for model_name in ["a", "b", "a", "a", "a"]:
+            tasks.append(asyncio.create_task(self._run(scheduler, model_name, order)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["a", "a", "b", "a", "a"])
+
+    async def test_max_wait_bounds_starvation(self):
+        scheduler = RequestScheduler(max_batch=100, max_wait_secs=0)
+        order = []
+        tasks = []
+        for model_name in ["a", "b", "a"]:
+            tasks.append(asyncio.create_task(self._run(scheduler, model_name, order)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, ["a", "b", "a"])
+
+    async def test_resident_models_run_concurrently(self):
+        scheduler = RequestScheduler(max_batch=10, max_wait_secs=60, fits_without_eviction=lambda name: True)
+        running = []
+        peak = []
+
+        async def run(model_name):
+            async with scheduler.slot(model_name):
+                running.append(model_name)
+                peak.append(set(running))
+                await asyncio.sleep(0.01)
+                running.remove(model_name)
+
+        await asyncio.gather(*(run(model_name) for model_name in ["a", "b", "a", "b"]))
+
+        self.assertIn({"a", "b"}, peak)
+        self.assertEqual(scheduler.switches, 0)
+
+    async def test_switch_holds_back_resident_requests_once_overdue(self):
+        resident = {"a"}
+        scheduler = RequestScheduler(max_batch=100, max_wait_secs=0, fits_without_eviction=resident.__contains__)
+        order = []
+        tasks = []
+        for model_name in ["a", "b", "a"]:
+            tasks.append(asyncio.create_task(self._run(scheduler, model_name, order)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        # b needs a switch and has waited too long, so the second a waits for it.
+        self.assertEqual(order, ["a", "b", "a"])
+
+    async def test_queue_depth_per_model(self):
+        scheduler = RequestScheduler()
+        await scheduler.acquire("a")
+        waiting = [asyncio.create_task(scheduler.acquire(name)) for name in ["b", "b", "c"]]
+        await asyncio.sleep(0)
+
+        self.assertEqual(scheduler.get_stats()["queue_depth"], {"b": 2, "c": 1})
+
+        await scheduler.release()
+        await asyncio.sleep(0)
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
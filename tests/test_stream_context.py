@@ -0,0 +1,73 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from api.chat_completion import _complete
+from models.base import BaseModelWrapper
+from response_formatters.openAI import OpenAIResponseFormatter
+from utils.inference_executor import InferenceExecutor
+
+N_STREAMS = 64
+N_CHUNKS = 20
+
+
+class StreamingWrapper(BaseModelWrapper):
+    def load_model(self):
+        return None
+
+    def create_prompt(self, messages, max_tokens=None):
+        return messages[-1]["content"]
+
+    def get_response(self, prompt, **kwargs):
+        return ({"choices": [{"text": f"{prompt}:{i} "}]} for i in range(N_CHUNKS))
+
+    def format_output(self, raw_output):
+        return raw_output
+
+    def cleanup(self):
+        pass
+
+
+class TestConcurrentStreams(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executor = InferenceExecutor(max_workers=8, stream_queue_size=4)
+        model_manager = MagicMock()
+        model_manager.get_model_configs.return_value = {
+            "streaming": {"stream_flush": {"max_chars": 1, "flush_first": False}}
+        }
+        # One formatter shared by every request, as in the service.
+        self.service = SimpleNamespace(
+            formatter=OpenAIResponseFormatter(),
+            model_manager=model_manager,
+            executor=self.executor,
+            response_cache=None,
+            metrics=None,
+        )
+        self.wrapper = StreamingWrapper("streaming", "/path/to/model", {"stream": True})
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def _stream(self, n: int):
+        request = {"messages": [{"role": "user", "content": f"stream{n}"}], "stream": True}
+        frames = [frame async for frame in _complete(self.service, self.wrapper, request)]
+        self.assertEqual(frames[-1], b"data: [DONE]\n\n")
+        return [json.loads(frame[len(b"data: "):]) for frame in frames[:-1]]
+
+    async def test_stream_ids_stay_consistent(self):
+        streams = await asyncio.gather(*(self._stream(n) for n in range(N_STREAMS)))
+
+        ids = set()
+        for n, chunks in enumerate(streams):
+            self.assertEqual(len({chunk["id"] for chunk in chunks}), 1)
+            self.assertEqual(len({chunk["created"] for chunk in chunks}), 1)
+            text = "".join(chunk["choices"][0]["delta"]["content"] for chunk in chunks)
+            self.assertEqual(text, "".join(f"stream{n}:{i} " for i in range(N_CHUNKS)))
+            ids.add(chunks[0]["id"])
+        self.assertEqual(len(ids), N_STREAMS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from utils.stream_flush import StreamFlushPolicy, flush_batches
+
+
+async def chunks(texts, delay=0.0):
+    for text in texts:
+        if delay:
+            await asyncio.sleep(delay)
+        yield text
+
+
+class TestFlushBatches(unittest.IsolatedAsyncioTestCase):
+
+    async def _collect(self, source, policy):
+        return [batch async for batch in flush_batches(source, policy)]
+
+    async def test_first_chunk_is_sent_immediately(self):
+        policy = StreamFlushPolicy(max_chars=4, max_hold_ms=10_000)
+        batches = await self._collect(chunks(["a", "bb", "cc", "d"]), policy)
+        self.assertEqual(batches, ["a", "bbcc", "d"])
+
+    async def test_without_flush_first_chunks_are_batched_by_size(self):
+        policy = StreamFlushPolicy(max_chars=4, max_hold_ms=10_000, flush_first=False)
+        batches = await self._collect(chunks(["a", "bb", "cc", "d"]), policy)
+        self.assertEqual(batches, ["abbcc", "d"])
+
+    async def test_slow_stream_is_flushed_after_the_hold_time(self):
+        policy = StreamFlushPolicy(max_chars=1000, max_hold_ms=20)
+        batches = await self._collect(chunks(["a", "b", "c"], delay=0.05), policy)
+        self.assertEqual(batches, ["a", "b", "c"])
+
+    async def test_closing_early_closes_the_source(self):
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+                yield "b"
+            finally:
+                closed.set()
+
+        policy = StreamFlushPolicy(max_chars=1000, max_hold_ms=10, flush_first=False)
+        batches = flush_batches(source(), policy)
+        # "a" is flushed while the next chunk is still being fetched.
+        self.assertEqual(await batches.__anext__(), "a")
+        await batches.aclose()
+        self.assertTrue(closed.is_set())
+
+    async def test_stalled_source_is_not_cancelled_by_a_flush(self):
+        async def source():
+            yield "a"
+            await asyncio.sleep(0.05)
+            yield "b"
+
+        policy = StreamFlushPolicy(max_chars=1000, max_hold_ms=10, flush_first=False)
+        batches = await self._collect(source(), policy)
+        self.assertEqual(batches, ["a", "b"])
+
+    async def test_unknown_config_key_is_rejected(self):
+        with self.assertRaises(ValueError):
+            StreamFlushPolicy.from_config({"max_char": 8})
+
+    async def test_policy_from_config(self):
+        policy = StreamFlushPolicy.from_config({"max_chars": 8, "max_hold_ms": 250})
+        self.assertEqual((policy.max_chars, policy.max_hold_secs, policy.flush_first), (8, 0.25, True))
+        self.assertEqual(StreamFlushPolicy.from_config(None).max_chars, StreamFlushPolicy().max_chars)
+
+
+if __name__ == "__main__":
+    unittest.main()
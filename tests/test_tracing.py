@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from models.scheduler import RequestScheduler
+from utils.inference_executor import InferenceExecutor
+from utils.tracing import NOOP_SPAN, Tracer, current_trace, span
+
+
+class TestTracer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.exported = []
+        self.tracer = Tracer(enabled=True, exporter=self.exported.append)
+
+    async def test_untraced_request_uses_noop_span(self):
+        tracer = Tracer(enabled=False, exporter=self.exported.append)
+        trace = tracer.start_trace("chat_completion")
+
+        self.assertIsNone(trace)
+        self.assertIs(span("schedule"), NOOP_SPAN)
+        Tracer.end_trace(trace)
+        self.assertEqual(self.exported, [])
+
+    async def test_sample_rate_zero_traces_nothing(self):
+        self.tracer.sample_rate = 0.0
+        self.assertIsNone(self.tracer.start_trace("chat_completion"))
+
+    async def test_spans_are_recorded_across_executor_and_scheduler(self):
+        executor = InferenceExecutor(max_workers=1)
+        scheduler = RequestScheduler()
+
+        def load():
+            with span("load_weights", model="a"):
+                pass
+
+        try:
+            trace = self.tracer.start_trace("chat_completion")
+            async with scheduler.slot("a"):
+                await executor.run(load)
+            Tracer.end_trace(trace)
+        finally:
+            executor.shutdown()
+
+        self.assertIsNone(current_trace())
+        [exported] = self.exported
+        self.assertEqual(exported["name"], "chat_completion")
+        self.assertEqual(len(exported["trace_id"]), 32)
+        self.assertEqual([s["name"] for s in exported["spans"]], ["schedule", "load_weights"])
+        self.assertEqual(exported["spans"][1]["model"], "a")
+
+    async def test_span_records_errors(self):
+        trace = self.tracer.start_trace("raw_completion")
+        with self.assertRaises(ValueError):
+            with span("create_prompt"):
+                raise ValueError("too long")
+        Tracer.end_trace(trace)
+
+        self.assertEqual(self.exported[0]["spans"][0]["error"], "ValueError")
+
+    async def test_traces_are_exported_as_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces", "traces.jsonl")
+            tracer = Tracer(enabled=True, export_path=path)
+            for name in ("chat_completion", "raw_completion"):
+                trace = tracer.start_trace(name)
+                with span("generate"):
+                    await asyncio.sleep(0)
+                Tracer.end_trace(trace)
+
+            with open(path) as file:
+                traces = [json.loads(line) for line in file]
+        self.assertEqual([t["name"] for t in traces], ["chat_completion", "raw_completion"])
+        self.assertEqual(traces[0]["spans"][0]["name"], "generate")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -90,5 +90,36 @@ class TestWrapperFactory(unittest.TestCase):
         self.assertIsInstance(wrapper, DummyWrapper)
 
 
+class TestLazyWrapperRegistry(unittest.TestCase):
+
+    @patch.dict("models.wrapper_factory.WrapperFactory._wrappers", {"fake": "models.synthetic:SyntheticWrapper"})
+    def test_dotted_path_is_imported_on_first_use(self):
+        from models.synthetic import SyntheticWrapper
+
+        self.assertTrue(WrapperFactory.is_supported("fake"))
+        self.assertIs(WrapperFactory.get_wrapper_class("FAKE"), SyntheticWrapper)
+        self.assertIs(WrapperFactory._wrappers["fake"], SyntheticWrapper)
+
+    @patch("models.wrapper_factory.entry_points")
+    def test_unregistered_type_is_loaded_from_entry_point(self, mock_entry_points):
+        from models.synthetic import SyntheticWrapper
+
+        entry_point = MagicMock()
+        entry_point.load.return_value = SyntheticWrapper
+        mock_entry_points.side_effect = lambda group, name: [entry_point] if name == "plugin" else []
+
+        with patch.dict("models.wrapper_factory.WrapperFactory._wrappers"):
+            self.assertTrue(WrapperFactory.is_supported("plugin"))
+            entry_point.load.assert_not_called()
+            wrapper = WrapperFactory.get_wrapper("p", {"type": "plugin"})
+        self.assertIsInstance(wrapper, SyntheticWrapper)
+        mock_entry_points.assert_called_with(group="bentoswitch.wrappers", name="plugin")
+
+    def test_unknown_type_is_not_supported(self):
+        self.assertFalse(WrapperFactory.is_supported("no-such-backend"))
+        with self.assertRaises(ValueError):
+            WrapperFactory.get_wrapper_class("no-such-backend")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from types import SimpleNamespace
+from models.prefix_cache import PrefixStateCache
+
+
+def make_state(size):
+    return SimpleNamespace(llama_state_size=size)
+
+
+class TestPrefixStateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = PrefixStateCache(capacity_bytes=100, min_prefix_tokens=3)
+
+    def test_longest_prefix_is_restored(self):
+        short_state, long_state = make_state(10), make_state(10)
+        self.cache[(1, 2, 3, 4)] = short_state
+        self.cache[(1, 2, 3, 4, 5, 6, 7)] = long_state
+
+        self.assertIs(self.cache[(1, 2, 3, 4, 5, 6, 9, 9)], long_state)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["tokens_saved"], 6)
+
+    def test_state_not_restored_by_the_model_is_a_miss(self):
+        evaluated = [1, 2, 3, 4, 5]
+        self.cache.evaluated_tokens = lambda: evaluated
+        self.cache[(1, 2, 3, 4)] = make_state(10)
+        self.cache[(1, 2, 3, 4, 5, 6, 7)] = make_state(10)
+
+        # The model has evaluated more of the prompt than the best state shares.
+        with self.assertRaises(KeyError):
+            self.cache[(1, 2, 3, 4, 5, 9)]
+        self.cache[(1, 2, 3, 4, 5, 6, 7, 8)]
+
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["lookups"], stats["hits"]), (2, 1))
+        self.assertEqual(stats["tokens_saved"], 2)
+
+    def test_short_prefix_is_a_miss(self):
+        self.cache[(1, 2, 3, 4)] = make_state(10)
+
+        with self.assertRaises(KeyError):
+            self.cache[(1, 2, 9, 9)]
+        self.assertNotIn((1, 9), self.cache)
+        self.assertEqual(self.cache.get_stats()["hit_rate"], 0.0)
+
+    def test_lookups_are_reported(self):
+        lookups = []
+        self.cache.on_lookup = lambda hit, tokens_saved: lookups.append((hit, tokens_saved))
+        self.cache[(1, 2, 3, 4)] = make_state(10)
+
+        self.cache[(1, 2, 3, 4, 5)]
+        with self.assertRaises(KeyError):
+            self.cache[(9, 9, 9, 9)]
+
+        self.assertEqual(lookups, [(True, 4), (False, 0)])
+
+    def test_least_recently_used_state_is_evicted(self):
+        self.cache[(1, 1, 1, 1)] = make_state(40)
+        self.cache[(2, 2, 2, 2)] = make_state(40)
+        self.cache[(1, 1, 1, 1, 5)]  # touch the first entry
+        self.cache[(3, 3, 3, 3)] = make_state(40)
+
+        self.assertIn((1, 1, 1, 1), self.cache)
+        self.assertNotIn((2, 2, 2, 2), self.cache)
+        self.assertEqual(self.cache.get_stats()["size_bytes"], 80)
+
+    def test_clear_returns_freed_bytes(self):
+        self.cache[(1, 1, 1, 1)] = make_state(40)
+        self.cache[(2, 2, 2, 2)] = make_state(30)
+
+        self.assertEqual(self.cache.clear(), 70)
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
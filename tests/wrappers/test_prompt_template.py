@@ -0,0 +1,46 @@
+import unittest
+from models.prompt_template import CompiledTemplate, FragmentCache
+
+
+class TestCompiledTemplate(unittest.TestCase):
+
+    def test_matches_str_format(self):
+        templates = [
+            "<s> [INST]{system_prompt}{conversation_history} [/INST] </s>",
+            "<<SYS>>\n{system_prompt}\n<</SYS>>\n\n",
+            "{{literal braces}} {role}: {content}",
+            "no fields at all",
+            "{content}{content}",
+        ]
+        values = {"system_prompt": "Be brief.", "conversation_history": "user: hi", "role": "user", "content": "hi"}
+        for template in templates:
+            self.assertEqual(CompiledTemplate(template).render(**values), template.format(**values))
+
+    def test_format_specs_fall_back_to_str_format(self):
+        template = CompiledTemplate("{role!r}: {content:>5}")
+        self.assertEqual(template.render(role="user", content="hi"), "'user':    hi")
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_reuses_fragments_by_role_and_content(self):
+        cache = FragmentCache()
+        self.assertIsNone(cache.get("user", "hello"))
+        cache.put("user", "hello", "user: hello")
+
+        self.assertEqual(cache.get("user", "".join(["hel", "lo"])), "user: hello")
+        self.assertIsNone(cache.get("assistant", "hello"))
+        self.assertEqual(cache.get_stats(), {"entries": 1, "hits": 1, "misses": 2})
+
+    def test_oldest_entries_are_dropped(self):
+        cache = FragmentCache(max_entries=2)
+        cache.put("user", "a", "A")
+        cache.put("user", "b", "B")
+        cache.put("user", "c", "C")
+
+        self.assertIsNone(cache.get("user", "a"))
+        self.assertEqual(cache.get("user", "c"), "C")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+from models.llama import LLaMAWrapper
+from models.speculative import CountingDraftModel, build_draft_model
+
+
+class FixedDraftModel:
+    """Proposes the queued drafts in order."""
+
+    def __init__(self, drafts):
+        self.drafts = [np.array(draft, dtype=np.intc) for draft in drafts]
+
+    def __call__(self, input_ids, **kwargs):
+        return self.drafts.pop(0)
+
+
+class TestCountingDraftModel(unittest.TestCase):
+
+    def test_accepted_prefix_of_each_draft_is_counted(self):
+        draft_model = CountingDraftModel(FixedDraftModel([[5, 6, 7], [9, 9], [1]]), "prompt_lookup")
+
+        draft_model(np.array([1, 2, 3, 4], dtype=np.intc))
+        # 5 and 6 accepted, 8 sampled instead of 7.
+        draft_model(np.array([1, 2, 3, 4, 5, 6, 8], dtype=np.intc))
+        # Both accepted, plus the token sampled after them.
+        draft_model(np.array([1, 2, 3, 4, 5, 6, 8, 9, 9, 3], dtype=np.intc))
+
+        stats = draft_model.get_stats()
+        self.assertEqual(stats["drafted_tokens"], 5)
+        self.assertEqual(stats["accepted_tokens"], 4)
+        self.assertEqual(stats["acceptance_rate"], 0.8)
+
+        draft_model.reset()
+        self.assertEqual(draft_model.get_stats()["acceptance_rate"], 0.0)
+
+    def test_build_draft_model(self):
+        draft_model = build_draft_model({"method": "prompt_lookup", "num_pred_tokens": 4}, n_context=512)
+        self.assertIsInstance(draft_model.draft_model, LlamaPromptLookupDecoding)
+        self.assertEqual(draft_model.draft_model.num_pred_tokens, 4)
+
+        with self.assertRaises(ValueError):
+            build_draft_model({"method": "draft_model"}, n_context=512)
+        with self.assertRaises(ValueError):
+            build_draft_model({"method": "medusa"}, n_context=512)
+
+
+class TestLLaMAWrapperSpeculation(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_llama = patch("models.llama.Llama").start()
+        self.mock_model = MagicMock()
+        self.mock_llama.return_value = self.mock_model
+        self.wrapper = LLaMAWrapper(
+            model_name="coder",
+            model_path="/coder.gguf",
+            n_context=2048,
+            n_gpu_layers=0,
+            speculative={"method": "prompt_lookup"},
+        )
+        self.wrapper.load_model()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_draft_model_is_passed_to_llama(self):
+        kwargs = self.mock_llama.call_args.kwargs
+        self.assertIs(kwargs["draft_model"], self.wrapper.draft_model)
+        # Scores must be sized for the whole context, not one batch.
+        self.assertIs(kwargs["logits_all"], True)
+        self.assertEqual(kwargs["n_ctx"], 2048)
+
+    def test_speculation_is_switchable_per_request(self):
+        self.mock_model.return_value = {"choices": [{"text": "ok"}], "usage": {"completion_tokens": 2}}
+
+        output = self.wrapper.get_response("prompt", speculative=False)
+        self.assertIsNone(self.mock_model.draft_model)
+        self.assertFalse(output["speculative"]["enabled"])
+        self.assertNotIn("speculative", self.mock_model.call_args.kwargs)
+
+        output = self.wrapper.get_response("prompt")
+        self.assertIs(self.mock_model.draft_model, self.wrapper.draft_model)
+        self.assertTrue(output["speculative"]["enabled"])
+        self.assertEqual(output["speculative"]["method"], "prompt_lookup")
+        self.assertEqual(output["speculative"]["completion_tokens"], 2)
+
+    def test_stream_reports_on_its_final_chunk(self):
+        self.mock_model.return_value = iter([
+            {"choices": [{"text": "a", "finish_reason": None}]},
+            {"choices": [{"text": "b", "finish_reason": None}]},
+            {"choices": [{"text": "", "finish_reason": "stop"}]},
+        ])
+
+        chunks = list(self.wrapper.get_response("prompt", stream=True))
+        self.assertNotIn("speculative", chunks[0])
+        self.assertEqual(chunks[-1]["speculative"]["completion_tokens"], 2)
+
+    def test_models_without_speculation_report_nothing(self):
+        wrapper = LLaMAWrapper(model_name="plain", model_path="/plain.gguf", n_context=2048, n_gpu_layers=0)
+        wrapper.load_model()
+        self.mock_model.return_value = {"choices": [{"text": "ok"}], "usage": {"completion_tokens": 2}}
+
+        self.assertNotIn("speculative", wrapper.get_response("prompt", speculative=True))
+        self.assertIsNone(self.mock_llama.call_args.kwargs["draft_model"])
+        self.assertIs(self.mock_llama.call_args.kwargs["logits_all"], False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from models.prefix_cache import PrefixStateCache
+from models.state_spill import StateSpillStore
+
+
+def make_state(size, marker=None):
+    return SimpleNamespace(llama_state_size=size, marker=marker)
+
+
+class TestStateSpillStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_states_survive_reopening(self):
+        store = StateSpillStore(self.directory, capacity_bytes=1 << 20, fingerprint="model-a")
+        store.save((1, 2, 3), make_state(10, marker="abc"))
+
+        reopened = StateSpillStore(self.directory, capacity_bytes=1 << 20, fingerprint="model-a")
+        self.assertEqual(reopened.keys(), [(1, 2, 3)])
+        self.assertEqual(reopened.load((1, 2, 3)).marker, "abc")
+
+    def test_changed_fingerprint_discards_states(self):
+        store = StateSpillStore(self.directory, capacity_bytes=1 << 20, fingerprint="model-a")
+        store.save((1, 2, 3), make_state(10))
+
+        reopened = StateSpillStore(self.directory, capacity_bytes=1 << 20, fingerprint="model-b")
+        self.assertEqual(reopened.keys(), [])
+
+    def test_capacity_evicts_least_recently_used(self):
+        store = StateSpillStore(self.directory, capacity_bytes=1 << 20, fingerprint="model-a")
+        store.save((1,), make_state(10, marker="x" * 1000))
+        store.capacity_bytes = store.size_bytes * 2 - 1
+        store.save((2,), make_state(10, marker="y" * 1000))
+
+        self.assertEqual(store.keys(), [(2,)])
+
+
+class TestPrefixStateCacheSpilling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = StateSpillStore(self.tmp_dir.name, capacity_bytes=1 << 20, fingerprint="model-a")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_spilled_state_is_restored_lazily(self):
+        cache = PrefixStateCache(capacity_bytes=100, min_prefix_tokens=2, spill_store=self.store)
+        cache[(5, 6, 7, 8)] = make_state(10, marker="older")
+        cache[(1, 2, 3, 4)] = make_state(10, marker="recent")
+        cache.spill(max_states=1)
+
+        restored = PrefixStateCache(capacity_bytes=100, min_prefix_tokens=2, spill_store=self.store)
+        self.assertEqual(len(restored.cache_state), 0)
+
+        state = restored[(1, 2, 3, 9)]
+        self.assertEqual(state.marker, "recent")
+        self.assertIn((1, 2, 3, 4), restored.cache_state)
+        self.assertEqual(restored.get_stats()["disk_hits"], 1)
+        with self.assertRaises(KeyError):
+            restored[(5, 6, 7, 8)]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import unittest
+from api.schemas import Message
+from models import WrapperFactory
+from models.model_manager import ModelManager
+from models.synthetic import SyntheticWrapper
+
+
+class TestSyntheticWrapper(unittest.TestCase):
+
+    def setUp(self):
+        self.model_config = {
+            "type": "synthetic",
+            "memory": "1Mi",
+            "synthetic": {"tokens_per_sec": 200, "allocate_memory": True, "seed": 7},
+        }
+
+    def test_factory_builds_synthetic_wrapper(self):
+        wrapper = WrapperFactory.get_wrapper("fake", self.model_config)
+
+        self.assertIsInstance(wrapper, SyntheticWrapper)
+        self.assertEqual(wrapper.memory_bytes, 1024**2)
+        self.assertEqual(wrapper.tokens_per_sec, 200)
+        self.assertEqual(wrapper.seed, 7)
+
+    def test_unknown_synthetic_option_is_rejected(self):
+        self.model_config["synthetic"]["tokens_per_minute"] = 5
+        with self.assertRaises(TypeError):
+            WrapperFactory.get_wrapper("fake", self.model_config)
+
+    def test_load_holds_memory_until_cleanup(self):
+        wrapper = WrapperFactory.get_wrapper("fake", self.model_config)
+        wrapper.initialize_model()
+        self.assertEqual(len(wrapper.model), 1024**2)
+
+        wrapper.cleanup()
+        self.assertIsNone(wrapper.model)
+
+    def test_responses_are_deterministic(self):
+        wrapper = SyntheticWrapper("fake", seed=3)
+        prompt = wrapper.create_prompt(
+            [Message(role="system", content="Be brief."), Message(role="user", content="hello")]
+        )
+
+        first = wrapper.get_response(prompt, max_tokens=10)
+        second = wrapper.get_response(prompt, max_tokens=10)
+        streamed = "".join(chunk["choices"][0]["text"] for chunk in wrapper.get_response(prompt, max_tokens=10, stream=True))
+
+        self.assertEqual(first["choices"][0]["text"], second["choices"][0]["text"])
+        self.assertEqual(streamed, first["choices"][0]["text"])
+        self.assertEqual(first["usage"]["completion_tokens"], 10)
+        self.assertNotEqual(wrapper.get_response(prompt + "!", max_tokens=10)["choices"][0]["text"], streamed)
+
+    def test_generation_is_paced(self):
+        wrapper = SyntheticWrapper("fake", tokens_per_sec=100)
+        started = time.perf_counter()
+        chunks = list(wrapper.get_response("prompt", max_tokens=10, stream=True))
+
+        self.assertEqual(len(chunks), 10)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.09)
+
+    def test_model_manager_switches_between_synthetic_models(self):
+        model_configs = {
+            "a": {"type": "synthetic", "memory": "10Mi", "synthetic": {"load_secs": 0.01}},
+            "b": {"type": "synthetic", "memory": "10Mi"},
+        }
+        manager = ModelManager(model_configs, mode="keep_loaded", memory_budget=15 * 1024**2)
+        manager.switch_model("a")
+        manager.switch_model("b")
+
+        self.assertEqual(manager.get_loaded_model_names(), ["b"])
+        self.assertEqual(manager.stats["loads"], 2)
+        self.assertEqual(manager.stats["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import MagicMock
+from models.llama import LLaMAWrapper
+from api.schemas import Message
+
+
+class TestHistoryTruncation(unittest.TestCase):
+
+    def setUp(self):
+        self.wrapper = LLaMAWrapper(
+            model_name="llama-7b",
+            model_path="/mock/path/to/llama/model",
+            n_context=64,
+            n_gpu_layers=0,
+            prompt_template="{system_prompt}{conversation_history}",
+            system_message_template="{system_prompt}",
+            conversation_message_template="{content}",
+        )
+        self.wrapper.model = MagicMock()
+        # One token per character keeps the budget arithmetic readable.
+        self.wrapper.model.tokenize.side_effect = lambda text, **kwargs: list(text)
+
+    def _messages(self, *contents):
+        roles = ["user", "assistant"]
+        return [Message(role=roles[i % 2], content=c) for i, c in enumerate(contents)]
+
+    def test_whole_history_kept_when_it_fits(self):
+        prompt = self.wrapper.create_prompt(self._messages("a" * 10, "b" * 10), max_tokens=16)
+        self.assertEqual(prompt, "a" * 10 + "\n" + "b" * 10)
+
+    def test_oldest_messages_dropped_first(self):
+        messages = [Message(role="system", content="s" * 8)] + self._messages("a" * 15, "b" * 15, "c" * 15)
+        # 64 - 16 reserved - 8 system = 40 tokens: two messages of 15 + 1 separator fit, three do not.
+        prompt = self.wrapper.create_prompt(messages, max_tokens=16)
+        self.assertEqual(prompt, "s" * 8 + "b" * 15 + "\n" + "c" * 15)
+
+    def test_message_too_long_for_context_raises(self):
+        with self.assertRaises(ValueError):
+            self.wrapper.create_prompt(self._messages("a" * 60), max_tokens=16)
+
+    def test_fragment_counts_are_cached(self):
+        messages = self._messages("a" * 10, "b" * 10)
+        self.wrapper.create_prompt(messages, max_tokens=16)
+        calls = self.wrapper.model.tokenize.call_count
+        self.wrapper.create_prompt(messages + self._messages("c" * 10), max_tokens=16)
+        # Only the new message is tokenized; the scaffold and older fragments are reused.
+        self.assertEqual(self.wrapper.model.tokenize.call_count, calls + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,70 @@
+import re
 import yaml
 import logging
+from utils.constants import (
+    SERVICE_MEMORY,
+    DEFAULT_MEMORY_BUDGET_FRACTION,
+    DEFAULT_PREFETCH,
+    DEFAULT_SCHEDULER_MAX_BATCH,
+    DEFAULT_SCHEDULER_MAX_WAIT_SECS,
+    DEFAULT_INFERENCE_WORKERS,
+    DEFAULT_MANAGEMENT_WORKERS,
+    DEFAULT_STREAM_QUEUE_SIZE,
+    DEFAULT_RESPONSE_CACHE_MAX_ENTRIES,
+    DEFAULT_RESPONSE_CACHE_TTL_SECS,
+    DEFAULT_RESPONSE_CACHE_MAX_DISK_ENTRIES,
+    DEFAULT_TRACING_SAMPLE_RATE,
+    MODEL_CONFIG_PATH,
+    DEFAULT_CONFIG_RELOAD_POLL_SECS,
+    DEFAULT_ADMISSION_TIMEOUT_SECS,
+    DEFAULT_WATCHDOG_POLL_SECS,
+    DEFAULT_WATCHDOG_MIN_AVAILABLE,
+    DEFAULT_PREWARM_MAX_BYTES_PER_SEC,
+    DEFAULT_PREWARM_CHUNK_BYTES,
+)
+from utils.stream_flush import StreamFlushPolicy
 
 logger = logging.getLogger(__name__)
 
+_MEMORY_UNITS = {
+    "": 1,
+    "k": 1000,
+    "m": 1000**2,
+    "g": 1000**3,
+    "t": 1000**4,
+    "ki": 1024,
+    "mi": 1024**2,
+    "gi": 1024**3,
+    "ti": 1024**4,
+}
+_MEMORY_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]i?)?b?\s*$", re.IGNORECASE)
 
-def load_model_configs(config_path="model_configs.yaml"):
+
+def parse_memory_size(value, total_bytes: int = None) -> int:
+    """
+    Convert a memory size to bytes.
+
+    Accepts a byte count, a Kubernetes-style string such as "40Gi" or "512M", or a
+    number between 0 and 1 interpreted as a fraction of ``total_bytes``; ``1`` means
+    all of it, not one byte, whether written as an integer or a float.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)) and 0 < value <= 1:
+        if total_bytes is None:
+            raise ValueError(f"Cannot resolve memory fraction {value} without a total")
+        return int(total_bytes * value)
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    match = _MEMORY_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid memory size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * _MEMORY_UNITS[(unit or "").lower()])
+
+
+def load_model_configs(config_path=MODEL_CONFIG_PATH):
     with open(config_path, "r") as file:
         config = yaml.safe_load(file)
 
@@ -33,5 +93,71 @@ def load_model_configs(config_path="model_configs.yaml"):
                 raise ValueError("No models found in the configuration file.")
 
         model_configs = config["models"]
+        for model_name, model_config in model_configs.items():
+            # Rejected here rather than by the first streamed request to the model.
+            try:
+                StreamFlushPolicy.from_config((model_config or {}).get("stream_flush"))
+            except ValueError as e:
+                raise ValueError(f"Invalid config for model '{model_name}': {e}") from e
+
+        service_memory = parse_memory_size(SERVICE_MEMORY)
+        memory_watchdog = {
+            "enabled": True,
+            "poll_secs": DEFAULT_WATCHDOG_POLL_SECS,
+            "min_available": DEFAULT_WATCHDOG_MIN_AVAILABLE,
+            **(config.get("memory_watchdog") or {}),
+        }
+        memory_watchdog["min_available"] = parse_memory_size(memory_watchdog["min_available"], service_memory)
+        page_cache_prewarm = {
+            "enabled": True,
+            "max_bytes_per_sec": DEFAULT_PREWARM_MAX_BYTES_PER_SEC,
+            "chunk_bytes": DEFAULT_PREWARM_CHUNK_BYTES,
+            **(config.get("page_cache_prewarm") or {}),
+        }
+        for key in ("max_bytes_per_sec", "chunk_bytes"):
+            page_cache_prewarm[key] = parse_memory_size(page_cache_prewarm[key])
+        service_settings = {
+            "memory_budget": parse_memory_size(
+                config.get("memory_budget", DEFAULT_MEMORY_BUDGET_FRACTION), service_memory
+            ),
+            "prefetch": bool(config.get("prefetch", DEFAULT_PREFETCH)),
+            "scheduler": {
+                "max_batch": DEFAULT_SCHEDULER_MAX_BATCH,
+                "max_wait_secs": DEFAULT_SCHEDULER_MAX_WAIT_SECS,
+                **(config.get("scheduler") or {}),
+            },
+            "executor": {
+                "max_workers": DEFAULT_INFERENCE_WORKERS,
+                "stream_queue_size": DEFAULT_STREAM_QUEUE_SIZE,
+                "management_workers": DEFAULT_MANAGEMENT_WORKERS,
+                **(config.get("executor") or {}),
+            },
+            "response_cache": {
+                "enabled": False,
+                "max_entries": DEFAULT_RESPONSE_CACHE_MAX_ENTRIES,
+                "ttl_secs": DEFAULT_RESPONSE_CACHE_TTL_SECS,
+                "disk_dir": None,
+                "max_disk_entries": DEFAULT_RESPONSE_CACHE_MAX_DISK_ENTRIES,
+                **(config.get("response_cache") or {}),
+            },
+            "tracing": {
+                "enabled": False,
+                "sample_rate": DEFAULT_TRACING_SAMPLE_RATE,
+                "export_path": None,
+                **(config.get("tracing") or {}),
+            },
+            "config_reload": {
+                "watch": False,
+                "poll_secs": DEFAULT_CONFIG_RELOAD_POLL_SECS,
+                **(config.get("config_reload") or {}),
+            },
+            "admission": {
+                "timeout_secs": DEFAULT_ADMISSION_TIMEOUT_SECS,
+                "check_available": False,
+                **(config.get("admission") or {}),
+            },
+            "memory_watchdog": memory_watchdog,
+            "page_cache_prewarm": page_cache_prewarm,
+        }
 
-        return default_model_name, model_configs, model_mode, model_unload_delay_secs
+        return default_model_name, model_configs, model_mode, model_unload_delay_secs, service_settings
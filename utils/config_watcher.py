@@ -0,0 +1,57 @@
+from typing import Callable, Optional, Tuple
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """
+    Calls ``on_change`` from a background thread whenever the file at ``path`` changes.
+
+    The file's modification time and size are polled every ``poll_secs``. A failing
+    ``on_change``, for example on an invalid config, is logged and the file is only
+    retried once it changes again.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], object], poll_secs: float = 5.0):
+        self.path = path
+        self.on_change = on_change
+        self.poll_secs = poll_secs
+        self._signature = self._read_signature()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> bool:
+        """Call ``on_change`` if the file changed since the last check; returns whether it did."""
+        signature = self._read_signature()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        logger.info(f"{self.path} changed, reloading")
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Failed to reload {self.path}; keeping the running config: {e}")
+        return True
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_secs):
+            self.check()
@@ -5,4 +5,32 @@ DEFAULT_TOP_K = 50
 DEFAULT_STREAM = True
 DEFAULT_N_CONTEXT = 2048
 DEFAULT_N_GPU_LAYERS = -1
-DEFAULT_BATCH_SIZE = 50
\ No newline at end of file
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_STREAM_FLUSH_MAX_HOLD_MS = 100
+SERVICE_MEMORY = "48Gi"
+DEFAULT_MEMORY_BUDGET_FRACTION = 0.85
+DEFAULT_PREFETCH = True
+DEFAULT_RECLAIM_TIMEOUT_SECS = 10
+RECLAIM_POLL_SECS = 0.05
+DEFAULT_SCHEDULER_MAX_BATCH = 16
+DEFAULT_SCHEDULER_MAX_WAIT_SECS = 30
+DEFAULT_INFERENCE_WORKERS = 4
+DEFAULT_MANAGEMENT_WORKERS = 4
+DEFAULT_STREAM_QUEUE_SIZE = 32
+DEFAULT_STATE_SPILL_CAPACITY = "4Gi"
+DEFAULT_STATE_SPILL_MAX_STATES = 4
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 256
+DEFAULT_RESPONSE_CACHE_TTL_SECS = 3600
+DEFAULT_RESPONSE_CACHE_MAX_DISK_ENTRIES = 4096
+DEFAULT_TRACING_SAMPLE_RATE = 0.1
+MODEL_CONFIG_PATH = "model_configs.yaml"
+DEFAULT_CONFIG_RELOAD_POLL_SECS = 5
+GGUF_INDEX_PATH = ".cache/gguf_index.json"
+DEFAULT_ADMISSION_TIMEOUT_SECS = 60
+ADMISSION_POLL_SECS = 0.5
+DEFAULT_WATCHDOG_POLL_SECS = 2
+DEFAULT_WATCHDOG_MIN_AVAILABLE = "2Gi"
+DEFAULT_PREWARM_MAX_BYTES_PER_SEC = "200Mi"
+DEFAULT_PREWARM_CHUNK_BYTES = 8 * 1024**2
+DEFAULT_SPECULATIVE_DRAFT_TOKENS = 10
+DEFAULT_PROMPT_LOOKUP_MAX_NGRAM = 2
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_ITEM = "item"
+_ERROR = "error"
+_DONE = "done"
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model loads and generations on dedicated worker threads.
+
+    ``run`` awaits a single blocking call. ``iterate`` runs a call that returns an
+    iterator (such as a streaming ``Llama.__call__``) on a worker thread and hands its
+    items to the event loop through a bounded queue: once ``stream_queue_size`` items
+    are waiting, the worker blocks until the consumer catches up. If the consumer
+    stops early, the worker stops pulling from the iterator and closes it.
+
+    ``manage`` runs model management calls (leasing, loading, switching) on a pool of
+    their own: a generation waiting for its model's inference lock parks an inference
+    worker, and with every worker parked, requests for other models could not even
+    lease theirs.
+    """
+
+    def __init__(self, max_workers: int = 4, stream_queue_size: int = 32, management_workers: int = 4):
+        self.stream_queue_size = stream_queue_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._management_executor = ThreadPoolExecutor(max_workers=management_workers, thread_name_prefix="model-management")
+
+    @staticmethod
+    async def _run_on(executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self._run_on(self._executor, fn, *args, **kwargs)
+
+    async def manage(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self._run_on(self._management_executor, fn, *args, **kwargs)
+
+    async def iterate(self, fn: Callable, *args, **kwargs) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(self.stream_queue_size)
+        cancelled = threading.Event()
+
+        def produce():
+            iterator = None
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                for item in iterator:
+                    while not slots.acquire(timeout=0.1):
+                        if cancelled.is_set():
+                            return
+                    if cancelled.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, (_ITEM, item))
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (_ERROR, e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, (_DONE, None))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        context = contextvars.copy_context()
+        loop.run_in_executor(self._executor, functools.partial(context.run, produce))
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == _ITEM:
+                    slots.release()
+                    yield value
+                elif kind == _ERROR:
+                    raise value
+                else:
+                    break
+        finally:
+            cancelled.set()
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._management_executor.shutdown(wait=wait, cancel_futures=True)
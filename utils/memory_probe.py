@@ -0,0 +1,106 @@
+from typing import Optional
+import logging
+import time
+
+import psutil
+
+from .constants import DEFAULT_RECLAIM_TIMEOUT_SECS, RECLAIM_POLL_SECS
+
+logger = logging.getLogger(__name__)
+
+# Unified (v2) and legacy (v1) cgroup memory usage and limit files.
+CGROUP_MEMORY_FILES = (
+    "/sys/fs/cgroup/memory.current",
+    "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+)
+CGROUP_LIMIT_FILES = (
+    "/sys/fs/cgroup/memory.max",
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+)
+CGROUP_STAT_FILES = (
+    "/sys/fs/cgroup/memory.stat",
+    "/sys/fs/cgroup/memory/memory.stat",
+)
+# Share of a model's estimated footprint that must be returned for the unload to count as reclaimed.
+RECLAIM_FRACTION = 0.9
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes."""
+    return psutil.Process().memory_info().rss
+
+
+def _read_first_int(paths) -> Optional[int]:
+    for path in paths:
+        try:
+            with open(path) as file:
+                return int(file.read().strip())
+        except (OSError, ValueError):
+            # Missing file, or "max" for an unlimited cgroup v2.
+            continue
+    return None
+
+
+def cgroup_memory_usage() -> Optional[int]:
+    """Memory charged to this process's cgroup, or None outside a cgroup."""
+    return _read_first_int(CGROUP_MEMORY_FILES)
+
+
+def _cgroup_inactive_file() -> int:
+    """Page cache the kernel can drop before the cgroup runs out of memory."""
+    for path in CGROUP_STAT_FILES:
+        try:
+            with open(path) as file:
+                stats = dict(line.split() for line in file if line.strip())
+        except (OSError, ValueError):
+            continue
+        return int(stats.get("inactive_file", stats.get("total_inactive_file", 0)))
+    return 0
+
+
+def available_memory() -> int:
+    """Memory that can still be allocated: free system memory, capped by the cgroup limit."""
+    available = psutil.virtual_memory().available
+    limit = _read_first_int(CGROUP_LIMIT_FILES)
+    usage = cgroup_memory_usage()
+    if limit is not None and usage is not None:
+        # Like the kernel's working set, don't count page cache that would be reclaimed first.
+        usage = max(0, usage - _cgroup_inactive_file())
+        available = min(available, max(0, limit - usage))
+    return available
+
+
+def wait_for_reclaim(
+    rss_before: int,
+    expected_bytes: int,
+    timeout_secs: float = DEFAULT_RECLAIM_TIMEOUT_SECS,
+    poll_secs: float = RECLAIM_POLL_SECS,
+) -> int:
+    """
+    Wait until the process has given back the memory of an unloaded model.
+
+    Polls the RSS until it has dropped by most of ``expected_bytes``, stops falling, or
+    ``timeout_secs`` pass. Measured with RSS rather than cgroup usage, which keeps
+    counting the model file's pages while they stay in the page cache.
+
+    Returns:
+        int: Bytes reclaimed since ``rss_before``.
+    """
+    target = rss_before - expected_bytes * RECLAIM_FRACTION
+    deadline = time.monotonic() + timeout_secs
+    previous = rss_before
+    stalled = 0
+    while True:
+        rss = process_rss()
+        if rss <= target or time.monotonic() >= deadline:
+            break
+        # Memory freed by another thread can lag behind cleanup; give up after two flat polls.
+        stalled = stalled + 1 if rss >= previous else 0
+        if stalled >= 2:
+            break
+        previous = rss
+        time.sleep(poll_secs)
+    reclaimed = max(0, rss_before - rss)
+    if reclaimed < expected_bytes * RECLAIM_FRACTION:
+        logger.debug(f"Reclaimed {reclaimed} of an expected {expected_bytes} bytes")
+    return reclaimed
@@ -0,0 +1,193 @@
+from typing import AsyncIterator, Any, Dict, Optional
+import time
+
+# Seconds; from a cached prefix on a small model up to a cold load of a large one.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LOAD_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+
+
+class ServiceMetrics:
+    """
+    Prometheus metrics published on BentoML's ``/metrics`` endpoint.
+
+    ``prometheus_client`` is imported when the metrics are created, inside the BentoML
+    worker, so it picks up the multiprocess directory the worker sets after importing
+    the service module. Pass a ``registry`` to keep metrics out of the default one.
+    """
+
+    def __init__(self, namespace: str = "bentoswitch", registry=None):
+        import prometheus_client
+
+        options = {"namespace": namespace}
+        if registry is not None:
+            options["registry"] = registry
+
+        def histogram(name, documentation, buckets, labels=("model",)):
+            return prometheus_client.Histogram(name, documentation, labels, buckets=buckets, **options)
+
+        def counter(name, documentation, labels=("model",)):
+            return prometheus_client.Counter(name, documentation, labels, **options)
+
+        self.time_to_first_token = histogram(
+            "time_to_first_token_seconds", "Time from request arrival to the first generated token", LATENCY_BUCKETS
+        )
+        self.request_latency = histogram(
+            "request_latency_seconds", "Time from request arrival to the end of the response", LATENCY_BUCKETS
+        )
+        self.prompt_eval = histogram(
+            "prompt_eval_seconds", "Time from the start of generation to the first token", LATENCY_BUCKETS
+        )
+        self.tokens_per_second = histogram(
+            "tokens_per_second", "Generation speed after the first token", TOKENS_PER_SECOND_BUCKETS
+        )
+        self.effective_tokens_per_second = histogram(
+            "effective_tokens_per_second",
+            "Completion tokens per second of generation, prompt evaluation included, by decoding mode",
+            TOKENS_PER_SECOND_BUCKETS,
+            labels=("model", "decoding"),
+        )
+        self.speculative_tokens = counter(
+            "speculative_tokens", "Tokens proposed by the draft model, and those of them accepted", ("model", "result")
+        )
+        self.model_load_duration = histogram("model_load_duration_seconds", "Time to load a model", LOAD_BUCKETS)
+        self.model_loads = counter("model_loads", "Models loaded")
+        self.model_load_failures = counter("model_load_failures", "Model loads that failed")
+        self.model_unloads = counter("model_unloads", "Models unloaded")
+        self.model_switches = counter("model_switches", "Times the scheduler switched to a model")
+        self.cache_lookups = counter("cache_lookups", "Cache lookups by cache and result", ("cache", "result"))
+        self.prefix_cache_tokens_saved = counter(
+            "prefix_cache_tokens_saved", "Prompt tokens not evaluated thanks to a restored prefix state"
+        )
+        self.queue_depth = prometheus_client.Gauge(
+            "queue_depth", "Requests waiting for a scheduling slot", ["model"], multiprocess_mode="livesum", **options
+        )
+        self.admission_decisions = counter(
+            "admission_decisions", "Model load admission decisions by result", ("model", "decision")
+        )
+        self.memory_pressure_actions = counter(
+            "memory_pressure_actions", "Actions taken by the memory watchdog", ("action",)
+        )
+        self.page_cache_prewarm_bytes = counter(
+            "page_cache_prewarm_bytes", "Bytes of model files read into the page cache ahead of a load"
+        )
+        self.memory_available = prometheus_client.Gauge(
+            "memory_available_bytes", "Memory that can still be allocated", multiprocess_mode="livemin", **options
+        )
+
+    def record_load(self, model_name: str, duration_secs: float):
+        self.model_loads.labels(model_name).inc()
+        self.model_load_duration.labels(model_name).observe(duration_secs)
+
+    def record_load_failure(self, model_name: str):
+        self.model_load_failures.labels(model_name).inc()
+
+    def record_unload(self, model_name: str):
+        self.model_unloads.labels(model_name).inc()
+
+    def record_switch(self, model_name: str):
+        self.model_switches.labels(model_name).inc()
+
+    def record_cache_lookup(self, cache: str, hit: bool):
+        self.cache_lookups.labels(cache, "hit" if hit else "miss").inc()
+
+    def record_prefix_lookup(self, model_name: str, hit: bool, tokens_saved: int):
+        self.record_cache_lookup("prefix", hit)
+        if tokens_saved:
+            self.prefix_cache_tokens_saved.labels(model_name).inc(tokens_saved)
+
+    def record_admission(self, model_name: str, decision: str):
+        self.admission_decisions.labels(model_name, decision).inc()
+
+    def record_pressure_action(self, action: str):
+        self.memory_pressure_actions.labels(action).inc()
+
+    def record_prewarm(self, model_name: str, read_bytes: int):
+        self.page_cache_prewarm_bytes.labels(model_name).inc(read_bytes)
+
+    def set_available_memory(self, available_bytes: int):
+        self.memory_available.set(available_bytes)
+
+
+class RequestMetrics:
+    """
+    Timings of one completion request, published once the request has finished.
+
+    ``token`` runs once per generated token and only stores a timestamp and a count;
+    Prometheus is updated in ``finish``. With ``metrics`` None nothing is published.
+    """
+
+    __slots__ = (
+        "metrics", "model_name", "started_at", "generation_started_at", "first_token_at", "tokens", "speculation",
+    )
+
+    def __init__(self, metrics: Optional[ServiceMetrics], model_name: str):
+        self.metrics = metrics
+        self.model_name = model_name
+        self.started_at = time.perf_counter()
+        self.generation_started_at = None
+        self.first_token_at = None
+        self.tokens = 0
+        self.speculation = None
+
+    def start_generation(self):
+        self.generation_started_at = time.perf_counter()
+
+    def token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+
+    def record_speculation(self, stats: Optional[Dict]):
+        """Keep the speculative decoding stats a model reported for this request's generation."""
+        if stats is not None:
+            self.speculation = stats
+
+    async def track_stream(self, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Pass streamed chunks through, counting each as a token, and finish at the end."""
+        async for chunk in chunks:
+            self.token()
+            if isinstance(chunk, dict) and "speculative" in chunk:
+                self.record_speculation(chunk["speculative"])
+            yield chunk
+        self.finish()
+
+    def finish(self, completion_tokens: int = None):
+        """
+        Publish the request's timings.
+
+        Args:
+            completion_tokens (int): Tokens generated by a non-streaming request, which
+                are not counted one by one.
+        """
+        if self.metrics is None:
+            return
+        now = time.perf_counter()
+        model_name = self.model_name
+        self.metrics.request_latency.labels(model_name).observe(now - self.started_at)
+        if self.speculation is not None:
+            self._publish_speculation()
+        if completion_tokens is not None and self.first_token_at is None:
+            # A non-streaming response arrives all at once.
+            self.tokens = completion_tokens
+            self.first_token_at = now
+            if self.generation_started_at is not None and now > self.generation_started_at:
+                self.metrics.tokens_per_second.labels(model_name).observe(
+                    completion_tokens / (now - self.generation_started_at)
+                )
+        if self.first_token_at is None:
+            return
+        self.metrics.time_to_first_token.labels(model_name).observe(self.first_token_at - self.started_at)
+        if completion_tokens is None:
+            if self.generation_started_at is not None:
+                self.metrics.prompt_eval.labels(model_name).observe(self.first_token_at - self.generation_started_at)
+            if self.tokens > 1 and now > self.first_token_at:
+                self.metrics.tokens_per_second.labels(model_name).observe((self.tokens - 1) / (now - self.first_token_at))
+
+    def _publish_speculation(self):
+        stats = self.speculation
+        decoding = "speculative" if stats["enabled"] else "plain"
+        self.metrics.effective_tokens_per_second.labels(self.model_name, decoding).observe(stats["tokens_per_sec"])
+        if stats["enabled"]:
+            self.metrics.speculative_tokens.labels(self.model_name, "drafted").inc(stats["drafted_tokens"])
+            self.metrics.speculative_tokens.labels(self.model_name, "accepted").inc(stats["accepted_tokens"])
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+
+from .constants import DEFAULT_RESPONSE_CACHE_MAX_DISK_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+def model_fingerprint(model_config: Dict) -> str:
+    """Identify a model's configuration and weights file so cached responses go stale with them."""
+    try:
+        stat = os.stat(model_config.get("path", ""))
+        file_id = f"{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        file_id = "missing"
+    config_id = json.dumps(model_config, sort_keys=True, default=str)
+    return hashlib.sha256(f"{config_id}|{file_id}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache of completions for requests that always produce the same output.
+
+    Only requests at temperature 0 or with a fixed seed are cacheable. Entries are
+    keyed by a hash of the model, its configuration fingerprint, the request messages
+    and the generation parameters, and expire after ``ttl_secs``. The in-memory tier keeps
+    ``max_entries`` entries in LRU order; with ``disk_dir`` set, entries are also
+    pickled to disk and survive restarts. Streaming responses are stored as their
+    list of chunks and replayed chunk by chunk.
+
+    The disk tier holds at most ``max_disk_entries`` files. Once a write goes past
+    that, ``sweep_disk`` removes the expired files, then the least recently used ones
+    down to 90% of the limit; a file's modification time is its last write or read.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_secs: float = 3600,
+        disk_dir: str = None,
+        max_disk_entries: int = DEFAULT_RESPONSE_CACHE_MAX_DISK_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_entries = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.sweep_disk()
+
+    @staticmethod
+    def is_cacheable(params: Dict) -> bool:
+        return params.get("temperature") == 0 or params.get("seed") is not None
+
+    @staticmethod
+    def make_key(model_name: str, model_config: Dict, messages: Any, params: Dict) -> str:
+        # The fingerprint covers the templates that turn the messages into the prompt.
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "fingerprint": model_fingerprint(model_config),
+                "messages": messages,
+                "params": params,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _disk_path(self, model_name: str, key: str) -> str:
+        model_dir = hashlib.sha1(model_name.encode()).hexdigest()[:16]
+        return os.path.join(self.disk_dir, model_dir, f"{key}.pickle")
+
+    def get(self, model_name: str, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                del self._entries[key]
+
+        value = self._read_disk(model_name, key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _read_disk(self, model_name: str, key: str, now: float) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(model_name, key)
+        try:
+            with open(path, "rb") as file:
+                expires_at, value = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if expires_at <= now:
+            self._remove_file(path)
+            return None
+        try:
+            os.utime(path)  # Recently used, so the last to be swept.
+        except OSError:
+            pass
+        self._store_in_memory(key, expires_at, model_name, value)
+        return value
+
+    def put(self, model_name: str, key: str, value: Any):
+        expires_at = time.time() + self.ttl_secs
+        self._store_in_memory(key, expires_at, model_name, value)
+        if self.disk_dir:
+            path = self._disk_path(model_name, key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as file:
+                    pickle.dump((expires_at, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                logger.warning(f"Failed to write response cache entry to disk: {e}")
+                return
+            with self._lock:
+                self._disk_entries += 1
+                over_limit = self._disk_entries > self.max_disk_entries
+            if over_limit:
+                self.sweep_disk()
+
+    def sweep_disk(self) -> int:
+        """Remove expired disk entries, then the least recently used beyond the limit; returns the count removed."""
+        files = []
+        for directory, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".pickle"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        files.sort()
+        expired_before = time.time() - self.ttl_secs
+        keep = int(self.max_disk_entries * 0.9)
+        removed = 0
+        for mtime, path in files:
+            if mtime > expired_before and len(files) - removed <= keep:
+                break
+            self._remove_file(path)
+            removed += 1
+        with self._lock:
+            self._disk_entries = len(files) - removed
+        if removed:
+            logger.info(f"Swept {removed} response cache entries from disk")
+        return removed
+
+    def _store_in_memory(self, key: str, expires_at: float, model_name: str, value: Any):
+        with self._lock:
+            self._entries[key] = (expires_at, model_name, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate_model(self, model_name: str):
+        """Drop every cached response for ``model_name``."""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[1] == model_name]:
+                del self._entries[key]
+        if self.disk_dir:
+            shutil.rmtree(os.path.dirname(self._disk_path(model_name, "_")), ignore_errors=True)
+            self.sweep_disk()
+        logger.info(f"Invalidated cached responses for {model_name}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    async def record_stream(
+        self,
+        model_name: str,
+        key: str,
+        chunks: AsyncIterator[Any],
+        run: Optional[Callable[..., Awaitable]] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Pass ``chunks`` through and cache them once the stream completes.
+
+        With ``run`` the entry is stored through it, e.g. on an executor so that
+        writing it to disk does not block the event loop.
+        """
+        recorded: List[Any] = []
+        async for chunk in chunks:
+            recorded.append(chunk)
+            yield chunk
+        if run is None:
+            self.put(model_name, key, recorded)
+        else:
+            await run(self.put, model_name, key, recorded)
+
+    @staticmethod
+    async def replay_stream(chunks: List[Any]) -> AsyncIterator[Any]:
+        for chunk in chunks:
+            yield chunk
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "disk_entries": self._disk_entries if self.disk_dir else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
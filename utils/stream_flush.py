@@ -0,0 +1,98 @@
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+
+from .constants import DEFAULT_BATCH_SIZE, DEFAULT_STREAM_FLUSH_MAX_HOLD_MS
+
+
+class StreamFlushPolicy:
+    """
+    When buffered stream text is sent to the client.
+
+    A batch is flushed once it holds ``max_chars`` characters or its oldest text has
+    waited ``max_hold_ms``, whichever comes first. With ``flush_first`` the first text
+    of a stream is sent immediately so time-to-first-token is not held back.
+    """
+
+    __slots__ = ("max_chars", "max_hold_secs", "flush_first")
+    CONFIG_KEYS = ("max_chars", "max_hold_ms", "flush_first")
+
+    def __init__(self, max_chars: int = DEFAULT_BATCH_SIZE, max_hold_ms: float = DEFAULT_STREAM_FLUSH_MAX_HOLD_MS,
+                 flush_first: bool = True):
+        self.max_chars = max_chars
+        self.max_hold_secs = max_hold_ms / 1000
+        self.flush_first = flush_first
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> "StreamFlushPolicy":
+        """
+        Build a policy from a model's ``stream_flush`` config section.
+
+        Raises:
+            ValueError: If the section has settings other than ``CONFIG_KEYS``.
+        """
+        config = config or {}
+        unknown = sorted(set(config) - set(cls.CONFIG_KEYS))
+        if unknown:
+            raise ValueError(f"Unknown stream_flush settings {unknown}; expected some of {list(cls.CONFIG_KEYS)}")
+        return cls(**config)
+
+
+async def flush_batches(texts: AsyncIterator[str], policy: StreamFlushPolicy) -> AsyncIterator[str]:
+    """Group the text chunks of a stream into batches according to ``policy``."""
+    loop = asyncio.get_running_loop()
+    iterator = texts.__aiter__()
+    buffer: List[str] = []
+    size = 0
+    deadline = 0.0
+    first = policy.flush_first
+    # A chunk still being fetched when the buffered text came due; it is not cancelled,
+    # which would close the stream, but picked up on the next round.
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            try:
+                if buffer:
+                    # Wait for the next chunk only until the buffered text is due.
+                    if pending is None:
+                        pending = asyncio.ensure_future(iterator.__anext__())
+                    try:
+                        text = await asyncio.wait_for(asyncio.shield(pending), max(0.0, deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        yield "".join(buffer)
+                        buffer.clear()
+                        size = 0
+                        continue
+                    pending = None
+                elif pending is not None:
+                    fetch, pending = pending, None
+                    text = await fetch
+                else:
+                    text = await iterator.__anext__()
+            except StopAsyncIteration:
+                pending = None
+                break
+            if not text:
+                continue
+            if first:
+                first = False
+                yield text
+                continue
+            if not buffer:
+                deadline = loop.time() + policy.max_hold_secs
+            buffer.append(text)
+            size += len(text)
+            if size >= policy.max_chars:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            # The generator cannot be closed while it is still producing a chunk.
+            pending.cancel()
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                pending.exception()
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
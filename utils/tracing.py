@@ -0,0 +1,182 @@
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("bentoswitch_trace", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    """The OpenTelemetry trace id of the current request, formatted as in BentoML's access log."""
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    trace_id = trace.get_current_span().get_span_context().trace_id
+    return f"{trace_id:032x}" if trace_id else None
+
+
+class Span:
+    """A timed phase of a traced request; use as a context manager."""
+
+    __slots__ = ("trace", "name", "attributes", "start", "end")
+
+    def __init__(self, trace: "Trace", name: str, attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.end = 0.0
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.spans.append(self)
+
+
+class _NoopSpan:
+    """Stands in for a span when the request is not traced."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The spans recorded for one sampled request."""
+
+    __slots__ = ("tracer", "trace_id", "name", "started_at", "start", "spans")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def span(self, name: str, **attributes) -> Span:
+        return Span(self, name, attributes)
+
+    def add_span(self, name: str, start: float, end: float, **attributes):
+        """Record a phase timed elsewhere, with ``time.perf_counter`` timestamps."""
+        recorded = Span(self, name, attributes)
+        recorded.start = start
+        recorded.end = end
+        self.spans.append(recorded)
+
+    def finish(self):
+        self.tracer.export(self.to_dict(time.perf_counter()))
+
+    def to_dict(self, end: float) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.started_at,
+            "duration_ms": (end - self.start) * 1000,
+            "spans": [
+                {
+                    "name": span.name,
+                    "offset_ms": (span.start - self.start) * 1000,
+                    "duration_ms": (span.end - span.start) * 1000,
+                    **span.attributes,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+        }
+
+
+class JsonLinesExporter:
+    """Appends each finished trace as one JSON line to ``path``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, trace: Dict):
+        line = json.dumps(trace, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a") as file:
+                file.write(line)
+
+
+class Tracer:
+    """
+    Opt-in tracing of request phases.
+
+    ``start_trace`` samples ``sample_rate`` of requests. Within a sampled request,
+    ``span`` anywhere in the call stack (including code run through the inference
+    executor, which copies the context) records a phase; elsewhere it returns a shared
+    no-op span, so untraced requests only pay for a context variable lookup. Finished
+    traces carry the request's OpenTelemetry trace id, so they can be matched with
+    BentoML's access log, and are passed to ``exporter``.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0, export_path: str = None,
+                 exporter: Callable[[Dict], None] = None):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter or (JsonLinesExporter(export_path) if enabled and export_path else None)
+        self.exported = 0
+
+    def start_trace(self, name: str) -> Optional[Trace]:
+        """Start tracing the current request if it is sampled; finish it with ``end_trace``."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(self, name, current_trace_id() or f"{random.getrandbits(128):032x}")
+        _current_trace.set(trace)
+        return trace
+
+    @staticmethod
+    def end_trace(trace: Optional[Trace]):
+        if trace is not None:
+            _current_trace.set(None)
+            trace.finish()
+
+    def export(self, trace: Dict):
+        self.exported += 1
+        if self.exporter is None:
+            return
+        try:
+            self.exporter(trace)
+        except Exception as e:
+            logger.warning(f"Failed to export trace {trace['trace_id']}: {e}")
+
+
+def span(name: str, **attributes):
+    """A span of the current request's trace, or a no-op span if it is not traced."""
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return trace.span(name, **attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()